@@ -1,5 +1,7 @@
 import asyncio
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
 import logging
 import sys
@@ -8,13 +10,24 @@ import time
 from datetime import datetime
 
 # Импортируем необходимые зависимости
-from app.settings import BOT_TOKEN, BOT_ADMINS, POLLING_INTERVAL
+from app.settings import BOT_TOKEN, BOT_ADMINS, TELEGRAM_API_URL, POLLING_INTERVAL, METRICS_HOST, METRICS_PORT, SLOW_CALLBACK_MS
 from app.handlers import routers
 from app.services.token_alert_service import TokenAlertService
-from app.migrate import migrate_add_last_alert_time
+from app.services.delivery_service import DeliveryService
+from app.services.broadcast_service import BroadcastService
+from app.services.alert_scheduler import alert_scheduler
+from app.services.report_service import ReportService
+from app.models.token_alert import format_price, format_window
+from app.migrate import migrate_add_last_alert_time, migrate_add_columns
+from app.utils.metrics import ALERTS_SENT, ALERTS_FAILED, start_metrics_server, monitor_event_loop_lag
+from app.utils.profiler import install_profile_signal_handler, enable_slow_callback_logging
 
 # Global bot instance for access from other modules
-bot = Bot(token=BOT_TOKEN)
+# TELEGRAM_API_URL позволяет направить бота на локальный Bot API сервер или тестовую заглушку
+if TELEGRAM_API_URL:
+    bot = Bot(token=BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)))
+else:
+    bot = Bot(token=BOT_TOKEN)
 
 # Функция для форматирования временных интервалов
 def format_time_interval(seconds):
@@ -54,65 +67,245 @@ def format_time_interval(seconds):
     # Если ничего не сработало, возвращаем просто секунды
     return f"{total_seconds}s"
 
+def format_level_message(alert_data: dict) -> str:
+    """Notification text for a crossed price level."""
+    alert = alert_data["alert"]
+    current_price = alert_data["current_price"]
+    direction = "🟢" if alert.direction == "above" else "🔴"
+    
+    if alert.rearm:
+        opposite = "below" if alert.direction == "above" else "above"
+        footer = f"The alert re-arms when the price goes back {opposite} ${alert.threshold:g}."
+    else:
+        footer = "The alert is now disabled, enable it again in My Alerts."
+    
+    return (
+        f"{direction} <b>{alert.market}</b> is {alert.direction} ${alert.threshold:g}\n\n"
+        f"Price: ${current_price:,.2f}\n\n"
+        f"{footer}"
+    )
+
+def format_percent_message(alert_data: dict) -> str:
+    """Notification text for a percent move within a time window."""
+    alert = alert_data["alert"]
+    change = alert_data["change_pct"]
+    direction = "🟢" if change >= 0 else "🔴"
+    reference = "low" if change >= 0 else "high"
+    window = format_window(alert.window_seconds)
+    
+    return (
+        f"{direction} <b>{alert.market}</b> {change:+.2f}% in {window}\n\n"
+        f"Price: ${alert_data['current_price']:,.2f}\n"
+        f"{window} {reference}: ${alert_data['reference_price']:,.2f}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_funding_message(alert_data: dict) -> str:
+    """Notification text for a funding rate beyond the alert threshold."""
+    alert = alert_data["alert"]
+    rate = alert_data["funding_rate"]
+    # Положительная ставка: лонги платят шортам
+    payer = "longs pay shorts" if rate >= 0 else "shorts pay longs"
+    next_funding = alert_data.get("next_funding_time")
+    next_line = f"Next funding in {format_time_interval(next_funding - time.time())}\n" if next_funding else ""
+    
+    return (
+        f"💸 <b>{alert.market}</b> funding rate {rate:+.4f}%\n\n"
+        f"{payer.capitalize()}\n"
+        f"{next_line}"
+        f"Price: ${alert_data['current_price']:,.2f}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_open_interest_message(alert_data: dict) -> str:
+    """Notification text for an open interest move within a time window."""
+    alert = alert_data["alert"]
+    change = alert_data["change_pct"]
+    direction = "🟢" if change >= 0 else "🔴"
+    reference = "low" if change >= 0 else "high"
+    window = format_window(alert.window_seconds)
+    
+    return (
+        f"{direction} <b>{alert.market}</b> open interest {change:+.2f}% in {window}\n\n"
+        f"Open interest: ${alert_data['open_interest_value']:,.0f}\n"
+        f"{window} {reference}: ${alert_data['reference_value']:,.0f}\n"
+        f"Price: ${alert_data['current_price']:,.2f}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_breakout_message(alert_data: dict) -> str:
+    """Notification text for a price breaking its 24h high or low."""
+    alert = alert_data["alert"]
+    above = alert_data["direction"] == "above"
+    
+    return (
+        f"{'🚀' if above else '🔻'} <b>{alert.market}</b> new 24h {'high' if above else 'low'}\n\n"
+        f"Price: ${alert_data['current_price']:,.2f}\n"
+        f"Previous 24h {'high' if above else 'low'}: ${alert_data['level']:,.2f}\n"
+        f"24h range: ${alert_data['low_24h']:,.2f} - ${alert_data['high_24h']:,.2f}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_turnover_message(alert_data: dict) -> str:
+    """Notification text for a 24h turnover spike above its baseline."""
+    alert = alert_data["alert"]
+    
+    return (
+        f"🔥 <b>{alert.market}</b> turnover {alert_data['change_pct']:+.1f}%\n\n"
+        f"24h turnover: ${alert_data['turnover_24h']:,.0f}\n"
+        f"{format_window(alert.window_seconds)} average: ${alert_data['baseline']:,.0f}\n"
+        f"Price: ${alert_data['current_price']:,.2f}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_book_message(alert_data: dict) -> str:
+    """Notification text for a wide bid/ask spread or a thin top of book."""
+    alert = alert_data["alert"]
+    depth = alert_data["depth"]
+    if alert.alert_type == "book_spread":
+        title = f"📖 <b>{alert.market}</b> spread {alert_data['spread_pct']:.3f}%"
+    else:
+        title = f"💧 <b>{alert.market}</b> thin book: ${depth:,.0f} at the top"
+    depth_line = f"Top of book: ${depth:,.0f}\n" if depth is not None else ""
+    
+    return (
+        f"{title}\n\n"
+        f"Bid: ${alert_data['bid_price']:,.2f} | Ask: ${alert_data['ask_price']:,.2f}\n"
+        f"Spread: {alert_data['spread_pct']:.3f}%\n"
+        f"{depth_line}"
+        f"Price: ${alert_data['current_price']:,.2f}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_pair_message(alert_data: dict) -> str:
+    """Notification text for a step, grid or level alert on a pair of markets."""
+    alert = alert_data["alert"]
+    current = alert_data["current_price"]
+    previous = alert_data["previous_price"]
+    direction = "🟢" if previous is None or current >= previous else "🔴"
+    
+    if alert_data.get("kind") == "level":
+        change_line = f"Crossed {alert.direction} {alert.threshold:g}"
+    elif alert_data.get("kind") == "grid":
+        change_line = f"Crossed: {alert_data['crossed_level']:,g}"
+    else:
+        change_line = f"Prev: {format_price(alert.market, previous)}" if previous is not None else ""
+    
+    legs = " | ".join(f"{leg}: ${price:,.2f}" for leg, price in zip(alert.legs, alert_data.get("leg_prices", ())))
+    
+    return (
+        f"{direction} <b>{alert.market}</b> {format_price(alert.market, current)}\n\n"
+        f"{change_line}\n"
+        f"{legs}\n\n"
+        f"Alert: {alert.describe()}"
+    )
+
+def format_alert_message(alert_data: dict) -> str:
+    """Build the HTML notification text for a triggered alert."""
+    if alert_data["alert"].is_pair:
+        return format_pair_message(alert_data)
+    if alert_data.get("kind") == "level":
+        return format_level_message(alert_data)
+    if alert_data.get("kind") == "percent":
+        return format_percent_message(alert_data)
+    if alert_data.get("kind") == "funding":
+        return format_funding_message(alert_data)
+    if alert_data.get("kind") == "open_interest":
+        return format_open_interest_message(alert_data)
+    if alert_data.get("kind") == "breakout":
+        return format_breakout_message(alert_data)
+    if alert_data.get("kind") == "turnover":
+        return format_turnover_message(alert_data)
+    if alert_data.get("kind") == "book":
+        return format_book_message(alert_data)
+    
+    alert = alert_data["alert"]
+    current_price = alert_data["current_price"]
+    previous_price = alert_data["previous_price"]
+    old_alert_time = alert_data.get("old_alert_time")  # Получаем старое время
+    
+    # Calculate price change percentage
+    if previous_price > 0:
+        price_diff = current_price - previous_price
+        change_pct = price_diff / previous_price * 100
+        direction = "🟢" if price_diff >= 0 else "🔴"
+        
+        # Добавляем знаки "+" и "-" перед изменением
+        sign = "+" if price_diff >= 0 else "-"
+        abs_diff = abs(price_diff)
+        formatted_change = f"{sign}${abs_diff:,.2f} ({sign}{abs(change_pct):.2f}%)"
+    else:
+        direction = "🟢"
+        formatted_change = "$0.00 (0.00%)"
+    
+    # Format previous price with date/time and time since last update
+    current_time = time.time()
+    
+    # Используем СТАРОЕ время для расчета интервала
+    if old_alert_time:
+        # Convert timestamp to datetime
+        last_update_dt = datetime.fromtimestamp(old_alert_time)
+        formatted_date = last_update_dt.strftime("%d.%m.%Y %H:%M")
+        
+        # Calculate time since last update (используем старое время!)
+        time_since_update = current_time - old_alert_time
+        time_interval_str = format_time_interval(time_since_update)
+        
+        prev_line = f"Prev: ${previous_price:,.2f} ({formatted_date}, {time_interval_str} ago)"
+    else:
+        # Fallback for old alerts without timestamp
+        prev_line = f"Prev: ${previous_price:,.2f}"
+    
+    step_line = f"Alert Step: ${alert.price_multiplier:g}"
+    if alert_data.get("kind") == "grid":
+        step_line = f"Crossed: ${alert_data['crossed_level']:,g}\nGrid Step: ${alert.price_multiplier:g}"
+    
+    # Format message with new compact format
+    message = (
+        f"{direction} <b>{alert.market}</b>\n\n"
+        f"Price: ${current_price:,.2f}\n"
+        f"{prev_line}\n"
+        f"Change: {formatted_change}\n\n"
+        f"{step_line}"
+    )
+    return message
+
+def _delivery_callback(alert, current_price):
+    def _done(ok: bool):
+        if ok:
+            ALERTS_SENT.inc()
+            logger.info(f"Sent price alert to user {alert.user_id} for {alert.market} (${current_price:,.2f})")
+        else:
+            ALERTS_FAILED.inc()
+            logger.error(f"Failed to send alert to user {alert.user_id}")
+    return _done
+
+async def run_alert_cycle() -> int:
+    """Check all alerts once and queue notifications for the triggered ones. Returns the number queued."""
+    # Сначала включаем алерты после snooze и удаляем истёкшие
+    alert_scheduler.tick()
+    # Алерты пользователей в тихих часах не проверяются: иначе они сработали бы без уведомления
+    alerts = await TokenAlertService.check_price_alerts(skip_users=alert_scheduler.quiet_users)
+    
+    queued = 0
+    for alert_data in alerts:
+        alert = alert_data["alert"]
+        message = format_alert_message(alert_data)
+        DeliveryService.enqueue(
+            alert.user_id, message, callback=_delivery_callback(alert, alert_data["current_price"]), parse_mode="HTML"
+        )
+        queued += 1
+    
+    # Отчёты рендерятся из тех же снимков, что и проверка алертов
+    await ReportService.send_due_reports()
+    
+    return queued
+
 async def alert_worker():
     """Separate worker to check prices and send alerts."""
     while True:
         try:
-            alerts = await TokenAlertService.check_price_alerts()
-            
-            for alert_data in alerts:
-                alert = alert_data["alert"]
-                current_price = alert_data["current_price"]
-                previous_price = alert_data["previous_price"]
-                old_alert_time = alert_data.get("old_alert_time")  # Получаем старое время
-                
-                # Calculate price change percentage
-                if previous_price > 0:
-                    price_diff = current_price - previous_price
-                    change_pct = price_diff / previous_price * 100
-                    direction = "🟢" if price_diff >= 0 else "🔴"
-                    
-                    # Добавляем знаки "+" и "-" перед изменением
-                    sign = "+" if price_diff >= 0 else "-"
-                    abs_diff = abs(price_diff)
-                    formatted_change = f"{sign}${abs_diff:,.2f} ({sign}{abs(change_pct):.2f}%)"
-                else:
-                    direction = "🟢"
-                    formatted_change = "$0.00 (0.00%)"
-                
-                # Format previous price with date/time and time since last update
-                current_time = time.time()
-                
-                # Используем СТАРОЕ время для расчета интервала
-                if old_alert_time:
-                    # Convert timestamp to datetime
-                    last_update_dt = datetime.fromtimestamp(old_alert_time)
-                    formatted_date = last_update_dt.strftime("%d.%m.%Y %H:%M")
-                    
-                    # Calculate time since last update (используем старое время!)
-                    time_since_update = current_time - old_alert_time
-                    time_interval_str = format_time_interval(time_since_update)
-                    
-                    prev_line = f"Prev: ${previous_price:,.2f} ({formatted_date}, {time_interval_str} ago)"
-                else:
-                    # Fallback for old alerts without timestamp
-                    prev_line = f"Prev: ${previous_price:,.2f}"
-                
-                # Format message with new compact format
-                message = (
-                    f"{direction} <b>{alert.symbol}</b>\n\n"
-                    f"Price: ${current_price:,.2f}\n"
-                    f"{prev_line}\n"
-                    f"Change: {formatted_change}\n\n"
-                    f"Alert Step: ${alert.price_multiplier:g}"
-                )
-                
-                try:
-                    await bot.send_message(chat_id=alert.user_id, text=message, parse_mode="HTML")
-                    logger.info(f"Sent price alert to user {alert.user_id} for {alert.symbol} (${current_price:,.2f})")
-                except Exception as e:
-                    logger.error(f"Failed to send alert to user {alert.user_id}: {e}")
-            
+            await run_alert_cycle()
         except Exception as e:
             logger.error(f"Error in alert worker: {e}")
         
@@ -124,7 +317,7 @@ async def main():
     """Main function to start the bot."""
     # Configure logger
     from app.utils.logger import setup_logger
-    setup_logger()
+    setup_logger(enqueue=True)
     logger.info("Starting Bybit Alert Bot")
     
     # Initialize database from app.db module
@@ -133,19 +326,28 @@ async def main():
     logger.info("Database initialized")
     
     # Apply migrations
-    success = migrate_add_last_alert_time()
+    success = migrate_add_last_alert_time() and migrate_add_columns()
     if success:
         logger.info("Database migration completed successfully")
     else:
         logger.error("Database migration failed")
     
-    # Проверка и исправление last_alert_time для всех алертов
-    try:
-        from app.services.token_alert_service import TokenAlertService
-        await TokenAlertService.check_price_alerts()
-        logger.info("Initial price check completed, all alerts initialized")
-    except Exception as e:
-        logger.error(f"Error during initial price check: {e}")
+    # Snooze, expiry, quiet hours and report times are kept in memory and applied by the alert worker
+    alert_scheduler.load()
+    
+    # Profiling hooks
+    loop = asyncio.get_running_loop()
+    install_profile_signal_handler(loop)
+    if SLOW_CALLBACK_MS > 0:
+        enable_slow_callback_logging(loop, SLOW_CALLBACK_MS / 1000)
+    
+    # Start metrics endpoint
+    if METRICS_PORT:
+        try:
+            await start_metrics_server(METRICS_HOST, METRICS_PORT)
+            asyncio.create_task(monitor_event_loop_lag())
+        except OSError as e:
+            logger.error(f"Failed to start metrics server: {e}")
     
     # Initialize Dispatcher with memory storage
     dp = Dispatcher(storage=MemoryStorage())
@@ -154,10 +356,17 @@ async def main():
     for router in routers:
         dp.include_router(router)
     
-    # Start alert worker
+    # Start alert worker and the queue delivering its messages. The first cycle runs right away,
+    # so alerts crossed while the bot was down are sent, not just recorded
+    DeliveryService.start()
     asyncio.create_task(alert_worker())
     logger.info("Alert worker started")
     
+    # Resume broadcasts interrupted by a restart
+    resumed = await BroadcastService.resume_interrupted()
+    if resumed:
+        logger.info(f"Resumed {len(resumed)} interrupted broadcasts")
+    
     # Start polling
     logger.info("Starting bot")
     await dp.start_polling(bot)
@@ -1,13 +1,20 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 
-from app.services import UserService, TokenAlertService
+from app.services import UserService, TokenAlertService, BroadcastService
 from app.keyboards import AdminKeyboard, UserKeyboard
+from app.utils.profiler import capture_profile, is_profiling
+from app.settings import PROFILE_DEFAULT_SECONDS
 from loguru import logger
 
 router = Router()
 
+class BroadcastStates(StatesGroup):
+    waiting_for_text = State()
+
 @router.message(F.text.in_(["👥 User Management", "User Management"]))
 async def show_user_management(message: Message):
     """Show user management options for admin."""
@@ -346,8 +353,7 @@ async def view_user_alerts(callback: CallbackQuery):
         message_text = f"Alerts for {username}:\n\n"
         for alert in alerts:
             status = "✅ Active" if alert.is_active else "❌ Disabled"
-            price = f"${alert.price_multiplier:g}"
-            message_text += f"{status} | {alert.symbol} | Step: {price}\n"
+            message_text += f"{status} | {alert.market} | {alert.describe()}\n"
     
     await callback.message.edit_text(
         message_text,
@@ -384,4 +390,222 @@ async def back_to_management(callback: CallbackQuery):
         "User Management Panel",
         reply_markup=AdminKeyboard.user_management()
     )
-    await callback.answer() 
\ No newline at end of file
+    await callback.answer() 
+
+def broadcast_status_text(broadcast) -> str:
+    """Format broadcast progress for the admin panel."""
+    processed = (broadcast.sent_count or 0) + (broadcast.failed_count or 0)
+    preview = broadcast.text if len(broadcast.text) <= 200 else broadcast.text[:200] + "…"
+    return (
+        f"📢 Broadcast #{broadcast.id}\n"
+        f"Status: {broadcast.status}\n"
+        f"Progress: {processed}/{broadcast.total_count}\n"
+        f"Sent: {broadcast.sent_count or 0}\n"
+        f"Failed: {broadcast.failed_count or 0}\n\n"
+        f"{preview}"
+    )
+
+@router.callback_query(F.data == "admin_broadcast")
+async def show_broadcast_menu(callback: CallbackQuery, state: FSMContext):
+    """Show broadcast panel with recent broadcasts."""
+    admin_id = callback.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await callback.answer("You don't have admin privileges.")
+        return
+    
+    await state.clear()
+    broadcasts = await BroadcastService.get_recent_broadcasts()
+    
+    await callback.message.edit_text(
+        "Broadcast messages to all approved users.",
+        reply_markup=AdminKeyboard.broadcast_menu(broadcasts)
+    )
+    await callback.answer()
+
+@router.callback_query(F.data == "admin_broadcast_new")
+async def new_broadcast(callback: CallbackQuery, state: FSMContext):
+    """Ask admin for the broadcast text."""
+    admin_id = callback.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await callback.answer("You don't have admin privileges.")
+        return
+    
+    await state.set_state(BroadcastStates.waiting_for_text)
+    await callback.message.edit_text("Please send the message you want to broadcast to all users:")
+    await callback.answer()
+
+@router.message(BroadcastStates.waiting_for_text)
+async def process_broadcast_text(message: Message, state: FSMContext):
+    """Create a pending broadcast and ask for confirmation."""
+    admin_id = message.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await state.clear()
+        return
+    
+    if not message.text:
+        await message.answer("Only text messages can be broadcast. Please send text.")
+        return
+    
+    broadcast = await BroadcastService.create_broadcast(admin_id, message.text)
+    await state.clear()
+    
+    if not broadcast:
+        await message.answer("Failed to create broadcast. Please try again later.")
+        return
+    
+    logger.info(f"Admin {admin_id} created broadcast {broadcast.id} for {broadcast.total_count} users")
+    
+    await message.answer(
+        f"Send this message to {broadcast.total_count} users?\n\n{message.text}",
+        reply_markup=AdminKeyboard.broadcast_confirm(broadcast.id)
+    )
+
+@router.callback_query(F.data.startswith("admin_broadcast_send:"))
+async def send_broadcast(callback: CallbackQuery):
+    """Start or resume a broadcast."""
+    admin_id = callback.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await callback.answer("You don't have admin privileges.")
+        return
+    
+    broadcast_id = int(callback.data.split(":")[1])
+    broadcast = await BroadcastService.get_broadcast(broadcast_id)
+    
+    if not broadcast or broadcast.status in ("completed", "cancelled"):
+        await callback.answer("This broadcast can't be sent.")
+        return
+    
+    async def on_progress(updated):
+        await callback.message.edit_text(
+            broadcast_status_text(updated),
+            reply_markup=AdminKeyboard.broadcast_options(
+                updated.id, updated.status, updated.status == "running"
+            )
+        )
+    
+    if not BroadcastService.start(broadcast_id, on_progress):
+        await callback.answer("Broadcast is already running.")
+        return
+    
+    logger.info(f"Admin {admin_id} started broadcast {broadcast_id}")
+    
+    broadcast.status = "running"
+    await callback.message.edit_text(
+        broadcast_status_text(broadcast),
+        reply_markup=AdminKeyboard.broadcast_options(broadcast_id, broadcast.status, True)
+    )
+    await callback.answer("Broadcast started")
+
+@router.callback_query(F.data.startswith("admin_broadcast_discard:"))
+async def discard_broadcast(callback: CallbackQuery):
+    """Discard a broadcast before it was sent."""
+    admin_id = callback.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await callback.answer("You don't have admin privileges.")
+        return
+    
+    broadcast_id = int(callback.data.split(":")[1])
+    await BroadcastService.cancel(broadcast_id)
+    
+    broadcasts = await BroadcastService.get_recent_broadcasts()
+    await callback.message.edit_text(
+        "Broadcast discarded.",
+        reply_markup=AdminKeyboard.broadcast_menu(broadcasts)
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("admin_broadcast_stop:"))
+async def stop_broadcast(callback: CallbackQuery):
+    """Pause a running broadcast."""
+    admin_id = callback.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await callback.answer("You don't have admin privileges.")
+        return
+    
+    broadcast_id = int(callback.data.split(":")[1])
+    
+    if await BroadcastService.stop(broadcast_id):
+        logger.info(f"Admin {admin_id} paused broadcast {broadcast_id}")
+    
+    # Refresh broadcast view
+    await view_broadcast(callback)
+
+@router.callback_query(F.data.startswith("admin_broadcast_view:"))
+async def view_broadcast(callback: CallbackQuery):
+    """Show broadcast progress."""
+    admin_id = callback.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await callback.answer("You don't have admin privileges.")
+        return
+    
+    broadcast_id = int(callback.data.split(":")[1])
+    broadcast = await BroadcastService.get_broadcast(broadcast_id)
+    
+    if not broadcast:
+        await callback.answer("Broadcast not found.")
+        return
+    
+    try:
+        await callback.message.edit_text(
+            broadcast_status_text(broadcast),
+            reply_markup=AdminKeyboard.broadcast_options(
+                broadcast.id, broadcast.status, BroadcastService.is_running(broadcast.id)
+            )
+        )
+    except Exception as e:
+        # Telegram rejects edits that don't change the message
+        logger.debug(f"Broadcast view not updated: {e}")
+    await callback.answer()
+
+@router.message(Command("profile"))
+async def profile_bot(message: Message, command: CommandObject):
+    """Capture a profile of the running bot: /profile [seconds] [pstats]."""
+    admin_id = message.from_user.id
+    admin = await UserService.get_user(admin_id)
+    
+    if not admin or not admin.is_admin:
+        await message.answer("You don't have admin privileges.")
+        return
+    
+    if is_profiling():
+        await message.answer("Profiling is already in progress.")
+        return
+    
+    # Parse arguments
+    seconds = PROFILE_DEFAULT_SECONDS
+    mode = "sampling"
+    for arg in (command.args or "").split():
+        if arg.isdigit():
+            seconds = max(1, min(int(arg), 600))
+        elif arg.lower() == "pstats":
+            mode = "pstats"
+    
+    logger.info(f"Admin {admin_id} requested a {seconds}s {mode} profile")
+    await message.answer(f"Profiling the bot for {seconds}s ({mode})...")
+    
+    try:
+        path, summary = await capture_profile(seconds, mode)
+    except Exception as e:
+        logger.error(f"Profiling failed: {e}")
+        await message.answer(f"Profiling failed: {e}")
+        return
+    
+    await message.answer(summary[:4000])
+    try:
+        await message.answer_document(FSInputFile(path))
+    except Exception as e:
+        logger.error(f"Failed to send profile {path} to admin {admin_id}: {e}")
\ No newline at end of file
@@ -3,7 +3,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 
-from app.services import UserService
+from app.services import UserService, MessageService
 from app.keyboards import UserKeyboard, AdminKeyboard
 from loguru import logger
 import re
@@ -106,17 +106,14 @@ async def noop_callback(callback: CallbackQuery):
 async def notify_admins_about_new_user(user_id: int, username: str):
     """Notify all admins about a new user registration."""
     from app.settings import BOT_ADMINS
-    from app.bot import bot
     
-    for admin_id in BOT_ADMINS:
-        try:
-            await bot.send_message(
-                admin_id,
-                f"New user registered:\nID: {user_id}\nUsername: {username}\n\n"
-                f"Use the User Management menu to approve this user."
-            )
-        except Exception as e:
-            logger.error(f"Failed to notify admin {admin_id}: {e}")
+    sent, failed = await MessageService.send_many(
+        BOT_ADMINS,
+        f"New user registered:\nID: {user_id}\nUsername: {username}\n\n"
+        f"Use the User Management menu to approve this user."
+    )
+    if failed:
+        logger.error(f"Failed to notify {failed} of {len(BOT_ADMINS)} admins about user {user_id}")
 
 @router.message(lambda message: not TOKEN_PATTERN.match(message.text.strip().upper()) and message.text.strip() not in ["🏠 My Dashboard", "My Dashboard", "👥 User Management", "User Management", "📞 Support", "Support"])
 async def echo(message: Message, state: FSMContext):
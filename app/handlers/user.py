@@ -1,24 +1,55 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, Message
-from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message, InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from app.services import UserService, TokenAlertService, BybitService
+from app.services import UserService, TokenAlertService, MarketDataService, ReportService
+from app.services.market_data import normalize_market
+from app.services.report_service import format_quote, render_report, render_top_movers
 from app.keyboards import UserKeyboard
+from app.settings import MAX_PERCENT_WINDOW_MINUTES, COOLDOWN_OPTIONS, HYSTERESIS_OPTIONS, EXPIRY_OPTIONS, TOP_MOVERS_COUNT
+from app.models.token_alert import ALERT_TYPE_BOOK_DEPTH, ALERT_TYPE_BOOK_SPREAD, BAND_ALERT_TYPES, MARKETS, format_duration, format_price, format_window, parse_pair
 from loguru import logger
 import re
+import time
+from html import escape
 
 router = Router()
 
-# Регулярное выражение для проверки, похоже ли сообщение на тикер криптовалюты
-TOKEN_PATTERN = re.compile(r'^[A-Z0-9]{2,10}$')
+# Регулярное выражение для проверки, похоже ли сообщение на тикер криптовалюты (BTC, BTC/USDC, BTC.P) или пару (ETH/BTC, BTC.P-BTC)
+MARKET_PATTERN = r'[A-Z0-9]{2,15}(/[A-Z]{3,4})?(\.P)?'
+TOKEN_PATTERN = re.compile(rf'^{MARKET_PATTERN}([/:÷-]{MARKET_PATTERN})?$')
+
+# Подсказка о формате рынков для сообщений с вводом тикера
+MARKET_HINT = (
+    "Spot USDT pairs by symbol (BTC), other quotes as BTC/USDC, perpetuals as BTC.P or BTC/USDC.P. "
+    "Ratio of two markets as ETH/BTC, spread as BTC.P-BTC."
+)
+
+def did_you_mean(markets: list) -> str:
+    """Did you mean BTC or BCH?"""
+    names = ", ".join(markets[:-1]) + f" or {markets[-1]}" if len(markets) > 1 else markets[0]
+    return f"Did you mean {names}?"
+
+def step_alert_created(market: str, step: float) -> str:
+    """Confirmation for a new step alert; grid crossings are switched on later in the alert options."""
+    return (
+        f"✅ Alert set for {market} with ${step:g} step.\n\n"
+        f"You will be notified when the price moves ${step:g} from the last alert. "
+        f"To be notified at multiples of ${step:g} instead, switch 📐 Mode to grid lines in the alert options."
+    )
 
 class AddAlertStates(StatesGroup):
     waiting_for_symbol = State()
     waiting_for_custom_token = State()
     waiting_for_custom_threshold = State()
     waiting_for_price_step = State()
+    waiting_for_level = State()
+    waiting_for_percent = State()
+    waiting_for_funding = State()
+    waiting_for_book = State()
+    waiting_for_search = State()
 
 @router.callback_query(F.data == "add_alert")
 async def add_alert_start(callback: CallbackQuery, state: FSMContext):
@@ -31,7 +62,8 @@ async def add_alert_start(callback: CallbackQuery, state: FSMContext):
         return
     
     await callback.message.edit_text(
-        "Please enter the token symbol you want to track (e.g. BTC, ETH, SOL):"
+        "Please enter the token symbol you want to track (e.g. BTC, ETH, SOL):\n"
+        f"{MARKET_HINT}"
     )
     await state.set_state(AddAlertStates.waiting_for_symbol)
     await callback.answer()
@@ -47,7 +79,8 @@ async def enter_custom_token(callback: CallbackQuery, state: FSMContext):
         return
     
     await callback.message.edit_text(
-        "Please enter the token symbol you want to track (e.g. BTC, ETH, SOL, TRUMP):"
+        "Please enter the token symbol you want to track (e.g. BTC, ETH, SOL, TRUMP):\n"
+        f"{MARKET_HINT}"
     )
     await state.set_state(AddAlertStates.waiting_for_custom_token)
     await callback.answer()
@@ -55,17 +88,24 @@ async def enter_custom_token(callback: CallbackQuery, state: FSMContext):
 @router.message(AddAlertStates.waiting_for_custom_token)
 async def process_custom_token_input(message: Message, state: FSMContext):
     """Process custom token input from user."""
-    symbol = message.text.strip().upper()
+    symbol = normalize_market(message.text) or message.text.strip().upper()
     
     # Check if token exists
-    is_valid = await BybitService.is_token_valid(symbol)
+    is_valid = await MarketDataService.is_valid(symbol)
     
     if not is_valid:
-        await message.answer(
-            f"Token {symbol} not found on Bybit. Please check the symbol and try again. "
-            f"You can try another custom token or go back to the token list.",
-            reply_markup=UserKeyboard.dashboard_menu()
-        )
+        suggestions = await MarketDataService.suggest_markets(symbol)
+        if suggestions:
+            await message.answer(
+                f"Token {symbol} not found on Bybit. {did_you_mean(suggestions)}",
+                reply_markup=UserKeyboard.token_suggestions(suggestions)
+            )
+        else:
+            await message.answer(
+                f"Token {symbol} not found on Bybit. Please check the symbol and try again. "
+                f"You can try another custom token or go back to the token list.",
+                reply_markup=UserKeyboard.dashboard_menu()
+            )
         await state.clear()
         return
     
@@ -81,25 +121,28 @@ async def process_custom_token_input(message: Message, state: FSMContext):
 @router.message(AddAlertStates.waiting_for_symbol)
 async def process_symbol_input(message: Message, state: FSMContext):
     """Handler for token input during alert creation."""
-    token = message.text.strip().upper()
+    token = normalize_market(message.text) or message.text.strip().upper()
     user_id = message.from_user.id
     logger.info(f"User {user_id} entered token: {token}")
     
     # First, validate the token
-    is_valid = await BybitService.is_token_valid(token)
+    is_valid = await MarketDataService.is_valid(token)
     if not is_valid:
         logger.warning(f"User {user_id} entered invalid token: {token}")
+        suggestions = await MarketDataService.suggest_markets(token)
         await message.answer(
             f"❌ Token '{token}' not found on Bybit.\n\n"
-            "Please enter a valid token symbol (e.g., BTC), or type /cancel to abort."
+            + (f"{did_you_mean(suggestions)}\n" if suggestions else "")
+            + "Please enter a valid token symbol (e.g., BTC), or type /cancel to abort.",
+            reply_markup=UserKeyboard.token_suggestions(suggestions) if suggestions else None
         )
         return
     
     logger.info(f"User {user_id} entered valid token: {token}")
     
     # Get current price for the token
-    current_price = await BybitService.get_token_price(token)
-    price_info = f"Current price: ${current_price:,.2f}" if current_price else ""
+    current_price = await MarketDataService.get_price(token)
+    price_info = f"Current price: {format_price(token, current_price)}" if current_price is not None else ""
     
     # Token exists, show price multiplier selection keyboard
     await message.answer(
@@ -147,8 +190,7 @@ async def process_price_step_input(message: Message, state: FSMContext):
         if alert:
             logger.info(f"Successfully created alert for {token} with step ${price_step:g} for user {user_id}")
             await message.answer(
-                f"✅ Alert set for {token} with ${price_step:g} step.\n\n"
-                f"You will be notified when the price crosses multiples of ${price_step:g}.",
+                step_alert_created(token, price_step),
                 reply_markup=UserKeyboard.dashboard_menu()
             )
         else:
@@ -168,7 +210,7 @@ async def process_price_step_input(message: Message, state: FSMContext):
     await state.clear()
 
 # Добавим обработчик для проверки, является ли сообщение токеном
-@router.message(lambda message: TOKEN_PATTERN.match(message.text.strip().upper()))
+@router.message(StateFilter(None), lambda message: TOKEN_PATTERN.match(message.text.strip().upper()))
 async def check_token_message(message: Message, state: FSMContext):
     """Check if a message might be a token and validate it."""
     # Пропускаем сообщения, которые совпадают с командами меню
@@ -181,7 +223,7 @@ async def check_token_message(message: Message, state: FSMContext):
     if current_state:
         return
     
-    symbol = message.text.strip().upper()
+    symbol = normalize_market(message.text) or message.text.strip().upper()
     user_id = message.from_user.id
     user = await UserService.get_user(user_id)
     
@@ -189,7 +231,7 @@ async def check_token_message(message: Message, state: FSMContext):
         return
     
     # Проверяем, существует ли токен
-    is_valid = await BybitService.is_token_valid(symbol)
+    is_valid = await MarketDataService.is_valid(symbol)
     
     if is_valid:
         await message.answer(
@@ -197,6 +239,13 @@ async def check_token_message(message: Message, state: FSMContext):
             reply_markup=UserKeyboard.price_multiplier_select(symbol)
         )
     else:
+        suggestions = await MarketDataService.suggest_markets(symbol)
+        if suggestions:
+            await message.answer(
+                f"Token {symbol} not found on Bybit. {did_you_mean(suggestions)}",
+                reply_markup=UserKeyboard.token_suggestions(suggestions)
+            )
+            return
         await message.answer(
             f"Token {symbol} not found on Bybit. Please check the symbol or select from the list of available tokens.",
             reply_markup=UserKeyboard.dashboard_menu()
@@ -219,8 +268,7 @@ async def set_price_multiplier(callback: CallbackQuery):
     if alert:
         logger.info(f"Successfully created alert for {symbol} (step: ${multiplier:g}) for user {user_id}")
         await callback.message.edit_text(
-            f"✅ Alert set for {symbol} with ${multiplier:g} step.\n\n"
-            f"You will be notified when the price crosses multiples of ${multiplier:g}.",
+            step_alert_created(symbol, multiplier),
             reply_markup=UserKeyboard.dashboard_menu()
         )
     else:
@@ -245,6 +293,808 @@ async def enter_custom_multiplier(callback: CallbackQuery, state: FSMContext):
     )
     await callback.answer()
 
+@router.callback_query(F.data.startswith("level_alert:"))
+async def enter_level_alert(callback: CallbackQuery, state: FSMContext):
+    """Ask for the price level of a new level alert."""
+    symbol = callback.data.split(":")[1]
+    current_price = await MarketDataService.get_price(symbol)
+    price_info = f"Current price: {format_price(symbol, current_price)}\n\n" if current_price is not None else ""
+    
+    await state.set_state(AddAlertStates.waiting_for_level)
+    await state.update_data(token=symbol)
+    
+    await callback.message.edit_text(
+        f"Enter the price level for {symbol}.\n"
+        f"{price_info}"
+        "You will be notified when the price reaches it, above or below the current price."
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("change_level:"))
+async def change_alert_level(callback: CallbackQuery, state: FSMContext):
+    """Ask for a new level for an existing level alert."""
+    alert_id = int(callback.data.split(":")[1])
+    
+    await state.set_state(AddAlertStates.waiting_for_level)
+    await state.update_data(alert_id=alert_id)
+    
+    await callback.message.edit_text("Enter the new price level:")
+    await callback.answer()
+
+@router.message(AddAlertStates.waiting_for_level)
+async def process_level_input(message: Message, state: FSMContext):
+    """Create or update a level alert from the entered price."""
+    state_data = await state.get_data()
+    alert_id = state_data.get("alert_id")
+    token = state_data.get("token")
+    user_id = message.from_user.id
+    
+    try:
+        level = float(message.text.strip().lstrip("$"))
+        if level <= 0:
+            raise ValueError("Level must be positive")
+    except ValueError as e:
+        logger.warning(f"Invalid level from user {user_id}: {message.text} - {e}")
+        await message.answer("Invalid price. Please enter a positive number (e.g. 200, 0.55).")
+        return
+    
+    if alert_id:
+        success = await TokenAlertService.update_level(alert_id, level)
+        alerts = await TokenAlertService.get_user_alerts(user_id)
+        alert = next((a for a in alerts if a.id == alert_id), None)
+        
+        if success and alert:
+            logger.info(f"User {user_id} moved level alert {alert_id} to ${level:g}")
+            await message.answer(
+                f"Level for {alert.market} alert updated.\n\n"
+                f"Alert options for {alert.market} ({alert.describe()}):\n"
+                f"Status: {alert_status(alert)}",
+                reply_markup=UserKeyboard.alert_options(alert)
+            )
+        else:
+            await message.answer(
+                "Failed to update the level. It must differ from the current price.",
+                reply_markup=UserKeyboard.dashboard_menu()
+            )
+    elif token:
+        alert = await TokenAlertService.add_level_alert(user_id, token, level)
+        
+        if alert:
+            logger.info(f"User {user_id} created level alert for {token} {alert.direction} ${level:g}")
+            await message.answer(
+                f"✅ Alert set: {token} {alert.describe()}.\n\n"
+                f"You will be notified once when the price goes {alert.direction} ${level:g}. "
+                "Turn on re-arming in My Alerts to be notified on every crossing.",
+                reply_markup=UserKeyboard.dashboard_menu()
+            )
+        else:
+            await message.answer(
+                f"❌ Failed to set alert for {token}. The level must differ from the current price.",
+                reply_markup=UserKeyboard.dashboard_menu()
+            )
+    else:
+        logger.error(f"Neither token nor alert_id available in state for user {user_id}")
+        await message.answer(
+            "An error occurred. Please try again from the beginning.",
+            reply_markup=UserKeyboard.dashboard_menu()
+        )
+    
+    await state.clear()
+
+@router.callback_query(F.data.startswith("toggle_rearm:"))
+async def toggle_alert_rearm(callback: CallbackQuery):
+    """Switch a level alert between disabling and re-arming after it fires."""
+    user_id = callback.from_user.id
+    alert_id = int(callback.data.split(":")[1])
+    
+    alerts = await TokenAlertService.get_user_alerts(user_id)
+    alert = next((a for a in alerts if a.id == alert_id), None)
+    
+    if not alert or not await TokenAlertService.set_rearm(alert_id, not alert.rearm):
+        await callback.answer("Failed to update alert")
+        return
+    
+    alert.rearm = not alert.rearm
+    await callback.message.edit_text(
+        f"Alert options for {alert.market} ({alert.describe()}):\n"
+        f"Status: {alert_status(alert)}",
+        reply_markup=UserKeyboard.alert_options(alert)
+    )
+    await callback.answer("Re-arming on" if alert.rearm else "Re-arming off")
+
+def alert_status(alert) -> str:
+    """Status line of the alert options: Active, Disabled or the time left of a snooze."""
+    if alert.snoozed_until:
+        return f"Snoozed, {format_duration(max(60, alert.snoozed_until - time.time()))} left"
+    return "Active" if alert.is_active else "Disabled"
+
+def next_option(options: list, current) -> float:
+    """Option after current in a cycled list; unknown values start over from the first."""
+    current = current or 0
+    return options[(options.index(current) + 1) % len(options)] if current in options else options[0]
+
+@router.callback_query(F.data.startswith("cycle_cooldown:") | F.data.startswith("cycle_band:"))
+async def cycle_alert_noise_filter(callback: CallbackQuery):
+    """Switch an alert to the next cooldown or hysteresis band option."""
+    user_id = callback.from_user.id
+    action, alert_id = callback.data.split(":")
+    alert_id = int(alert_id)
+    
+    alerts = await TokenAlertService.get_user_alerts(user_id)
+    alert = next((a for a in alerts if a.id == alert_id), None)
+    if not alert or (action == "cycle_band" and alert.alert_type not in BAND_ALERT_TYPES):
+        await callback.answer("Failed to update alert")
+        return
+    
+    if action == "cycle_cooldown":
+        alert.cooldown_seconds = next_option(COOLDOWN_OPTIONS, alert.cooldown_seconds) or None
+        notice = f"Cooldown {format_window(alert.cooldown_seconds)}" if alert.cooldown_seconds else "Cooldown off"
+    else:
+        alert.hysteresis = next_option(HYSTERESIS_OPTIONS, alert.hysteresis) or None
+        notice = f"Band {alert.hysteresis:g}%" if alert.hysteresis else "Band off"
+    
+    if not await TokenAlertService.set_noise_filter(alert_id, alert.cooldown_seconds, alert.hysteresis):
+        await callback.answer("Failed to update alert")
+        return
+    
+    await callback.message.edit_text(
+        f"Alert options for {alert.market} ({alert.describe()}):\n"
+        f"Status: {alert_status(alert)}",
+        reply_markup=UserKeyboard.alert_options(alert)
+    )
+    await callback.answer(notice)
+
+@router.callback_query(F.data.startswith("snooze:"))
+async def snooze_alert(callback: CallbackQuery):
+    """Disable an alert for the chosen time; it is enabled again automatically."""
+    user_id = callback.from_user.id
+    _, alert_id, seconds = callback.data.split(":")
+    alert_id = int(alert_id)
+    
+    alerts = await TokenAlertService.get_user_alerts(user_id)
+    alert = next((a for a in alerts if a.id == alert_id), None)
+    snoozed_until = await TokenAlertService.snooze_alert(alert_id, int(seconds)) if alert else None
+    if not snoozed_until:
+        await callback.answer("Failed to snooze alert")
+        return
+    
+    logger.info(f"User {user_id} snoozed alert {alert_id} for {seconds}s")
+    alert.is_active = False
+    alert.snoozed_until = snoozed_until
+    await callback.message.edit_text(
+        f"Alert options for {alert.market} ({alert.describe()}):\n"
+        f"Status: {alert_status(alert)}",
+        reply_markup=UserKeyboard.alert_options(alert)
+    )
+    await callback.answer(f"Snoozed for {format_window(int(seconds))}")
+
+@router.callback_query(F.data.startswith("cycle_expiry:"))
+async def cycle_alert_expiry(callback: CallbackQuery):
+    """Switch an alert to the next expiry option, counted from now."""
+    user_id = callback.from_user.id
+    alert_id = int(callback.data.split(":")[1])
+    
+    alerts = await TokenAlertService.get_user_alerts(user_id)
+    alert = next((a for a in alerts if a.id == alert_id), None)
+    if not alert:
+        await callback.answer("Failed to update alert")
+        return
+    
+    # Текущий вариант - наименьший, в который укладывается оставшееся время
+    remaining = alert.expires_at - time.time() if alert.expires_at else 0
+    current = next((option for option in EXPIRY_OPTIONS if option and remaining <= option), 0) if remaining > 0 else 0
+    seconds = next_option(EXPIRY_OPTIONS, current)
+    if not await TokenAlertService.set_expiry(alert_id, seconds):
+        await callback.answer("Failed to update alert")
+        return
+    
+    alert.expires_at = time.time() + seconds if seconds else None
+    await callback.message.edit_text(
+        f"Alert options for {alert.market} ({alert.describe()}):\n"
+        f"Status: {alert_status(alert)}",
+        reply_markup=UserKeyboard.alert_options(alert)
+    )
+    await callback.answer(f"Alert will be removed in {format_duration(seconds)}" if seconds else "Alert won't expire")
+
+LOCAL_TIME_PATTERN = re.compile(r'^(\d{1,2})(?::(\d{2}))?$')
+UTC_OFFSET_PATTERN = re.compile(r'^(?:UTC|GMT)?([+-])(\d{1,2})(?::?(\d{2}))?$', re.IGNORECASE)
+
+def parse_local_time(text: str) -> int:
+    """Minute of the day from 23:00 or 7, None if invalid."""
+    match = LOCAL_TIME_PATTERN.match(text)
+    if not match or int(match.group(1)) > 23 or int(match.group(2) or 0) > 59:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2) or 0)
+
+def parse_utc_offset(text: str) -> int:
+    """Offset in minutes from UTC+3, +5:30 or GMT-4, None if invalid."""
+    match = UTC_OFFSET_PATTERN.match(text)
+    if not match or int(match.group(2)) > 14:
+        return None
+    return (int(match.group(2)) * 60 + int(match.group(3) or 0)) * (-1 if match.group(1) == "-" else 1)
+
+def format_local_time(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def format_utc_offset(utc_offset: int) -> str:
+    sign = "-" if (utc_offset or 0) < 0 else "+"
+    hours, minutes = divmod(abs(utc_offset or 0), 60)
+    return f"UTC{sign}{hours}" + (f":{minutes:02d}" if minutes else "")
+
+def parse_quiet_hours(args: list) -> tuple:
+    """(start minute, end minute, UTC offset in minutes) from ["23:00", "07:00", "UTC+3"], None if invalid."""
+    if len(args) not in (2, 3):
+        return None
+    
+    start, end = parse_local_time(args[0]), parse_local_time(args[1])
+    offset = parse_utc_offset(args[2]) if len(args) == 3 else 0
+    if start is None or end is None or offset is None or start == end:
+        return None
+    return start, end, offset
+
+def format_quiet_hours(start: int, end: int, utc_offset: int) -> str:
+    return f"{format_local_time(start)}-{format_local_time(end)} {format_utc_offset(utc_offset)}"
+
+@router.message(Command("quiet"))
+async def set_quiet_hours(message: Message, command: CommandObject):
+    """Set quiet hours without notifications: /quiet 23:00 07:00 UTC+3, /quiet off."""
+    user_id = message.from_user.id
+    user = await UserService.get_user(user_id)
+    
+    if not user or not user.is_approved or user.is_blocked:
+        await message.answer("You don't have access to this bot.")
+        return
+    
+    args = (command.args or "").split()
+    if not args:
+        if user.quiet_start is None:
+            text = "Quiet hours are off."
+        else:
+            text = f"Quiet hours: {format_quiet_hours(user.quiet_start, user.quiet_end, user.utc_offset)}."
+        await message.answer(
+            f"{text}\n\n"
+            "Your alerts are paused during quiet hours and checked again when they end.\n"
+            "Set them with /quiet 23:00 07:00 UTC+3 or turn them off with /quiet off."
+        )
+        return
+    
+    if args[0].lower() == "off":
+        success = await UserService.set_quiet_hours(user_id, None, None, user.utc_offset or 0)
+        await message.answer("Quiet hours turned off." if success else "Failed to update quiet hours.")
+        return
+    
+    quiet_hours = parse_quiet_hours(args)
+    if not quiet_hours:
+        await message.answer("Invalid quiet hours. Example: /quiet 23:00 07:00 UTC+3")
+        return
+    
+    if not await UserService.set_quiet_hours(user_id, *quiet_hours):
+        await message.answer("Failed to update quiet hours.")
+        return
+    
+    logger.info(f"User {user_id} set quiet hours {format_quiet_hours(*quiet_hours)}")
+    await message.answer(f"🌙 Quiet hours set: {format_quiet_hours(*quiet_hours)}. Your alerts pause in this window and are checked again when it ends.")
+
+REPORT_INTERVAL_PATTERN = re.compile(r'^(\d{1,4})([mh])$', re.IGNORECASE)
+MIN_REPORT_INTERVAL = 900
+
+def report_text(subscription, utc_offset: int) -> str:
+    """Price reports view: the current schedule and how to change it."""
+    if not subscription:
+        schedule = "Price reports are off."
+    elif subscription.daily_minute is not None:
+        schedule = f"You get a price report {subscription.describe()} {format_utc_offset(utc_offset)}."
+    else:
+        schedule = f"You get a price report {subscription.describe()}."
+    return (
+        f"🗓 {schedule}\n\n"
+        "Reports list the prices of the tokens you have alerts for. "
+        "Choose a schedule below or send /report 08:30 UTC+3 for another time."
+    )
+
+async def show_report_options(callback: CallbackQuery, notice: str = None):
+    user_id = callback.from_user.id
+    user = await UserService.get_user(user_id)
+    subscription = await ReportService.get_subscription(user_id)
+    
+    await callback.message.edit_text(
+        report_text(subscription, user.utc_offset if user else 0),
+        reply_markup=UserKeyboard.report_options(
+            subscription.interval_seconds if subscription else None,
+            subscription.daily_minute if subscription else None,
+            subscription is not None
+        )
+    )
+    await callback.answer(notice)
+
+@router.callback_query(F.data == "price_reports")
+async def show_price_reports(callback: CallbackQuery):
+    """Show the price report schedule of the user."""
+    await show_report_options(callback)
+
+@router.callback_query(F.data.startswith("report:"))
+async def set_price_report(callback: CallbackQuery):
+    """Subscribe to a report schedule chosen with a button, or stop reports."""
+    user_id = callback.from_user.id
+    parts = callback.data.split(":")
+    
+    if parts[1] == "off":
+        success = await ReportService.unsubscribe(user_id)
+        notice = "Reports stopped"
+    elif parts[1] == "daily":
+        success = await ReportService.subscribe(user_id, daily_minute=int(parts[2])) is not None
+        notice = f"Daily report at {format_local_time(int(parts[2]))}"
+    else:
+        success = await ReportService.subscribe(user_id, interval_seconds=int(parts[2])) is not None
+        notice = f"Report every {format_window(int(parts[2]))}"
+    
+    await show_report_options(callback, notice if success else "Failed to update reports")
+
+@router.message(Command("report"))
+async def report_command(message: Message, command: CommandObject):
+    """Schedule price reports: /report 09:00 [UTC+3], /report 2h, /report off."""
+    user_id = message.from_user.id
+    user = await UserService.get_user(user_id)
+    
+    if not user or not user.is_approved or user.is_blocked:
+        await message.answer("You don't have access to this bot.")
+        return
+    
+    args = (command.args or "").split()
+    if not args:
+        subscription = await ReportService.get_subscription(user_id)
+        await message.answer(
+            report_text(subscription, user.utc_offset),
+            reply_markup=UserKeyboard.report_options(
+                subscription.interval_seconds if subscription else None,
+                subscription.daily_minute if subscription else None,
+                subscription is not None
+            )
+        )
+        return
+    
+    if args[0].lower() == "off":
+        success = await ReportService.unsubscribe(user_id)
+        await message.answer("Price reports stopped." if success else "Failed to update reports.")
+        return
+    
+    subscription = None
+    interval = REPORT_INTERVAL_PATTERN.match(args[0])
+    if interval and len(args) == 1:
+        seconds = int(interval.group(1)) * (3600 if interval.group(2).lower() == "h" else 60)
+        if MIN_REPORT_INTERVAL <= seconds <= 86400:
+            subscription = await ReportService.subscribe(user_id, interval_seconds=seconds)
+    elif len(args) <= 2:
+        minute = parse_local_time(args[0])
+        utc_offset = parse_utc_offset(args[1]) if len(args) == 2 else user.utc_offset
+        if minute is not None and utc_offset is not None:
+            subscription = await ReportService.subscribe(user_id, daily_minute=minute, utc_offset=utc_offset)
+            user.utc_offset = utc_offset
+    
+    if not subscription:
+        await message.answer("Invalid schedule. Examples: /report 09:00 UTC+3, /report 4h, /report off (intervals from 15m to 24h)")
+        return
+    await message.answer(report_text(subscription, user.utc_offset))
+
+@router.callback_query(F.data.startswith("percent_alert:"))
+async def select_percent_move(callback: CallbackQuery):
+    """Show percent move presets for a token."""
+    symbol = callback.data.split(":")[1]
+    
+    await callback.message.edit_text(
+        f"Choose the move for {symbol}. You will be notified when the price rises or falls "
+        "by this much within the time window:",
+        reply_markup=UserKeyboard.percent_move_select(symbol)
+    )
+    await callback.answer()
+
+async def create_percent_alert(user_id: int, symbol: str, percent: float, minutes: int, open_interest: bool = False) -> str:
+    """Create a percent move alert (of the price or the open interest) and return the reply text."""
+    if open_interest:
+        alert = await TokenAlertService.add_open_interest_alert(user_id, symbol, percent, minutes)
+    else:
+        alert = await TokenAlertService.add_percent_alert(user_id, symbol, percent, minutes)
+    
+    if not alert:
+        logger.error(f"Failed to create percent alert for {symbol} ({percent:g}%/{minutes}m, open interest: {open_interest}) for user {user_id}")
+        return f"❌ Failed to set alert for {symbol}. Please try again later."
+    
+    logger.info(f"User {user_id} created percent alert for {symbol}: {alert.describe()}")
+    subject = "open interest" if open_interest else "price"
+    return (
+        f"✅ Alert set for {symbol}: {alert.describe()}.\n\n"
+        f"You will be notified when the {subject} moves {percent:g}% up or down within {format_window(alert.window_seconds)}."
+    )
+
+@router.callback_query(F.data.startswith("set_percent:"))
+async def set_percent_move(callback: CallbackQuery):
+    """Create a percent move alert from a preset."""
+    _, symbol, percent, minutes = callback.data.split(":")
+    text = await create_percent_alert(callback.from_user.id, symbol, float(percent), int(minutes))
+    
+    await callback.message.edit_text(text, reply_markup=UserKeyboard.dashboard_menu())
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("custom_percent:"))
+async def enter_custom_percent(callback: CallbackQuery, state: FSMContext):
+    """Ask for a custom percent move and window."""
+    symbol = callback.data.split(":")[1]
+    
+    await state.set_state(AddAlertStates.waiting_for_percent)
+    await state.update_data(token=symbol)
+    
+    await callback.message.edit_text(
+        f"Enter the move in percent and the window in minutes for {symbol}, "
+        "separated by a space (e.g. 5 30 for 5% within 30 minutes):"
+    )
+    await callback.answer()
+
+@router.message(AddAlertStates.waiting_for_percent)
+async def process_percent_input(message: Message, state: FSMContext):
+    """Create a percent move alert from the entered values."""
+    state_data = await state.get_data()
+    token = state_data.get("token")
+    user_id = message.from_user.id
+    
+    try:
+        percent_text, minutes_text = message.text.replace("%", " ").split()
+        percent, minutes = float(percent_text), int(minutes_text)
+        if percent <= 0 or not 0 < minutes <= MAX_PERCENT_WINDOW_MINUTES:
+            raise ValueError("Out of range")
+    except ValueError as e:
+        logger.warning(f"Invalid percent move from user {user_id}: {message.text} - {e}")
+        await message.answer(
+            f"Invalid value. Enter a positive percent and a window of 1-{MAX_PERCENT_WINDOW_MINUTES} minutes (e.g. 5 30)."
+        )
+        return
+    
+    if not token:
+        await message.answer(
+            "An error occurred. Please try again from the beginning.",
+            reply_markup=UserKeyboard.dashboard_menu()
+        )
+    elif state_data.get("turnover"):
+        text = await create_turnover_alert(user_id, token, percent, minutes)
+        await message.answer(text, reply_markup=UserKeyboard.dashboard_menu())
+    else:
+        text = await create_percent_alert(user_id, token, percent, minutes, state_data.get("open_interest", False))
+        await message.answer(text, reply_markup=UserKeyboard.dashboard_menu())
+    
+    await state.clear()
+
+@router.callback_query(F.data.startswith("funding_alert:"))
+async def select_funding_threshold(callback: CallbackQuery):
+    """Show funding rate threshold presets for a perpetual."""
+    symbol = callback.data.split(":")[1]
+    ticker = await MarketDataService.get_ticker(symbol)
+    
+    if not ticker or ticker.funding_rate is None:
+        await callback.answer("Funding rate is not available for this market")
+        return
+    
+    await callback.message.edit_text(
+        f"Current funding rate of {symbol}: {ticker.funding_rate * 100:+.4f}%\n\n"
+        "Choose the threshold. You will be notified when the funding rate reaches it "
+        "in either direction, and again after it has returned below:",
+        reply_markup=UserKeyboard.funding_select(symbol)
+    )
+    await callback.answer()
+
+async def create_funding_alert(user_id: int, symbol: str, threshold: float) -> str:
+    """Create a funding rate alert and return the reply text."""
+    alert = await TokenAlertService.add_funding_alert(user_id, symbol, threshold)
+    
+    if not alert:
+        logger.error(f"Failed to create funding alert for {symbol} (±{threshold:g}%) for user {user_id}")
+        return f"❌ Failed to set alert for {symbol}. Please try again later."
+    
+    logger.info(f"User {user_id} created funding alert for {symbol}: {alert.describe()}")
+    return (
+        f"✅ Alert set for {symbol}: {alert.describe()}.\n\n"
+        f"You will be notified when the funding rate reaches +{threshold:g}% or -{threshold:g}%."
+    )
+
+@router.callback_query(F.data.startswith("set_funding:"))
+async def set_funding_threshold(callback: CallbackQuery):
+    """Create a funding rate alert from a preset."""
+    _, symbol, threshold = callback.data.split(":")
+    text = await create_funding_alert(callback.from_user.id, symbol, float(threshold))
+    
+    await callback.message.edit_text(text, reply_markup=UserKeyboard.dashboard_menu())
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("custom_funding:"))
+async def enter_custom_funding(callback: CallbackQuery, state: FSMContext):
+    """Ask for a custom funding rate threshold."""
+    symbol = callback.data.split(":")[1]
+    
+    await state.set_state(AddAlertStates.waiting_for_funding)
+    await state.update_data(token=symbol)
+    
+    await callback.message.edit_text(
+        f"Enter the funding rate threshold for {symbol} in percent (e.g. 0.075):"
+    )
+    await callback.answer()
+
+@router.message(AddAlertStates.waiting_for_funding)
+async def process_funding_input(message: Message, state: FSMContext):
+    """Create a funding rate alert from the entered threshold."""
+    state_data = await state.get_data()
+    token = state_data.get("token")
+    user_id = message.from_user.id
+    
+    try:
+        threshold = abs(float(message.text.strip().replace("%", "").lstrip("±")))
+        if threshold == 0:
+            raise ValueError("Threshold must be positive")
+    except ValueError as e:
+        logger.warning(f"Invalid funding threshold from user {user_id}: {message.text} - {e}")
+        await message.answer("Invalid value. Enter a positive percent (e.g. 0.075).")
+        return
+    
+    if not token:
+        await message.answer(
+            "An error occurred. Please try again from the beginning.",
+            reply_markup=UserKeyboard.dashboard_menu()
+        )
+    else:
+        text = await create_funding_alert(user_id, token, threshold)
+        await message.answer(text, reply_markup=UserKeyboard.dashboard_menu())
+    
+    await state.clear()
+
+@router.callback_query(F.data.startswith("oi_alert:"))
+async def select_open_interest_move(callback: CallbackQuery):
+    """Show open interest move presets for a perpetual."""
+    symbol = callback.data.split(":")[1]
+    ticker = await MarketDataService.get_ticker(symbol)
+    
+    if not ticker or not ticker.open_interest_value:
+        await callback.answer("Open interest is not available for this market")
+        return
+    
+    await callback.message.edit_text(
+        f"Current open interest of {symbol}: ${ticker.open_interest_value:,.0f}\n\n"
+        "Choose the move. You will be notified when the open interest rises or falls "
+        "by this much within the time window:",
+        reply_markup=UserKeyboard.open_interest_select(symbol)
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("set_oi:"))
+async def set_open_interest_move(callback: CallbackQuery):
+    """Create an open interest alert from a preset."""
+    _, symbol, percent, minutes = callback.data.split(":")
+    text = await create_percent_alert(callback.from_user.id, symbol, float(percent), int(minutes), open_interest=True)
+    
+    await callback.message.edit_text(text, reply_markup=UserKeyboard.dashboard_menu())
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("custom_oi:"))
+async def enter_custom_open_interest(callback: CallbackQuery, state: FSMContext):
+    """Ask for a custom open interest move and window."""
+    symbol = callback.data.split(":")[1]
+    
+    # Ввод обрабатывает process_percent_input, флаг выбирает алерт по открытому интересу
+    await state.set_state(AddAlertStates.waiting_for_percent)
+    await state.update_data(token=symbol, open_interest=True)
+    
+    await callback.message.edit_text(
+        f"Enter the open interest move in percent and the window in minutes for {symbol}, "
+        "separated by a space (e.g. 10 60 for 10% within an hour):"
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("breakout_alert:"))
+async def select_breakout_side(callback: CallbackQuery):
+    """Show 24h breakout options for a token."""
+    symbol = callback.data.split(":")[1]
+    ticker = await MarketDataService.get_ticker(symbol)
+    
+    if not ticker or ticker.high_24h is None or ticker.low_24h is None:
+        await callback.answer("24h statistics are not available for this market")
+        return
+    
+    await callback.message.edit_text(
+        f"24h range of {symbol}: ${ticker.low_24h:,.2f} - ${ticker.high_24h:,.2f}\n"
+        f"Current price: ${ticker.last_price:,.2f}\n\n"
+        "Choose the breakout. You will be notified when the price breaks "
+        "the 24h high or low after trading inside the range:",
+        reply_markup=UserKeyboard.breakout_select(symbol)
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("set_breakout:"))
+async def set_breakout_side(callback: CallbackQuery):
+    """Create a 24h breakout alert."""
+    _, symbol, side = callback.data.split(":")
+    user_id = callback.from_user.id
+    direction = None if side == "both" else side
+    
+    alert = await TokenAlertService.add_breakout_alert(user_id, symbol, direction)
+    if alert:
+        logger.info(f"User {user_id} created breakout alert for {symbol}: {alert.describe()}")
+        text = f"✅ Alert set for {symbol}: {alert.describe()}."
+    else:
+        logger.error(f"Failed to create breakout alert for {symbol} ({side}) for user {user_id}")
+        text = f"❌ Failed to set alert for {symbol}. Please try again later."
+    
+    await callback.message.edit_text(text, reply_markup=UserKeyboard.dashboard_menu())
+    await callback.answer()
+
+async def create_turnover_alert(user_id: int, symbol: str, percent: float, minutes: int) -> str:
+    """Create a volume spike alert and return the reply text."""
+    alert = await TokenAlertService.add_turnover_alert(user_id, symbol, percent, minutes)
+    
+    if not alert:
+        logger.error(f"Failed to create turnover alert for {symbol} (+{percent:g}%/{minutes}m) for user {user_id}")
+        return f"❌ Failed to set alert for {symbol}. Please try again later."
+    
+    logger.info(f"User {user_id} created turnover alert for {symbol}: {alert.describe()}")
+    return (
+        f"✅ Alert set for {symbol}: {alert.describe()}.\n\n"
+        f"You will be notified when the 24h turnover rises {percent:g}% above its "
+        f"average over the last {format_window(alert.window_seconds)}."
+    )
+
+@router.callback_query(F.data.startswith("turnover_alert:"))
+async def select_turnover_spike(callback: CallbackQuery):
+    """Show volume spike presets for a token."""
+    symbol = callback.data.split(":")[1]
+    ticker = await MarketDataService.get_ticker(symbol)
+    
+    if not ticker or not ticker.turnover_24h:
+        await callback.answer("Turnover is not available for this market")
+        return
+    
+    await callback.message.edit_text(
+        f"24h turnover of {symbol}: ${ticker.turnover_24h:,.0f}\n\n"
+        "Choose the spike. You will be notified when the 24h turnover rises this much "
+        "above its average over the time window:",
+        reply_markup=UserKeyboard.turnover_select(symbol)
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("set_turnover:"))
+async def set_turnover_spike(callback: CallbackQuery):
+    """Create a volume spike alert from a preset."""
+    _, symbol, percent, minutes = callback.data.split(":")
+    text = await create_turnover_alert(callback.from_user.id, symbol, float(percent), int(minutes))
+    
+    await callback.message.edit_text(text, reply_markup=UserKeyboard.dashboard_menu())
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("custom_turnover:"))
+async def enter_custom_turnover(callback: CallbackQuery, state: FSMContext):
+    """Ask for a custom volume spike and baseline window."""
+    symbol = callback.data.split(":")[1]
+    
+    # Ввод обрабатывает process_percent_input, флаг выбирает алерт по обороту
+    await state.set_state(AddAlertStates.waiting_for_percent)
+    await state.update_data(token=symbol, turnover=True)
+    
+    await callback.message.edit_text(
+        f"Enter the turnover rise in percent and the baseline window in minutes for {symbol}, "
+        "separated by a space (e.g. 50 60 for +50% vs the last hour):"
+    )
+    await callback.answer()
+
+# Вид алерта по стакану в callback-данных -> тип алерта
+BOOK_ALERT_TYPES = {"spread": ALERT_TYPE_BOOK_SPREAD, "depth": ALERT_TYPE_BOOK_DEPTH}
+
+@router.callback_query(F.data.startswith("book_alert:"))
+async def select_book_threshold(callback: CallbackQuery):
+    """Show order book alert presets for a token."""
+    symbol = callback.data.split(":")[1]
+    ticker = await MarketDataService.get_ticker(symbol)
+    
+    if not ticker or not ticker.bid_price or not ticker.ask_price:
+        await callback.answer("Order book is not available for this market")
+        return
+    
+    spread, depth = ticker.spread_pct, ticker.top_depth
+    depth_info = f"Top of book: ${depth:,.0f} on the thinner side\n" if depth is not None else ""
+    await callback.message.edit_text(
+        f"Order book of {symbol}:\n"
+        f"Bid ${ticker.bid_price:,.2f} / Ask ${ticker.ask_price:,.2f}, spread {spread:.4f}%\n"
+        f"{depth_info}\n"
+        "Choose when to be notified: the spread widens to the threshold, or the best bid "
+        "or ask holds less than the amount:",
+        reply_markup=UserKeyboard.book_select(symbol)
+    )
+    await callback.answer()
+
+async def create_book_alert(user_id: int, symbol: str, kind: str, threshold: float) -> str:
+    """Create an order book alert and return the reply text."""
+    alert = await TokenAlertService.add_book_alert(user_id, symbol, BOOK_ALERT_TYPES[kind], threshold)
+    
+    if not alert:
+        logger.error(f"Failed to create order book alert for {symbol} ({kind} {threshold:g}) for user {user_id}")
+        return f"❌ Failed to set alert for {symbol}. Please try again later."
+    
+    logger.info(f"User {user_id} created order book alert for {symbol}: {alert.describe()}")
+    return (
+        f"✅ Alert set for {symbol}: {alert.describe()}.\n\n"
+        "You will be notified once when the order book gets there, and again after it recovers and gets there again."
+    )
+
+@router.callback_query(F.data.startswith("set_book:"))
+async def set_book_threshold(callback: CallbackQuery):
+    """Create an order book alert from a preset."""
+    _, symbol, kind, threshold = callback.data.split(":")
+    text = await create_book_alert(callback.from_user.id, symbol, kind, float(threshold))
+    
+    await callback.message.edit_text(text, reply_markup=UserKeyboard.dashboard_menu())
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("custom_book:"))
+async def enter_custom_book(callback: CallbackQuery, state: FSMContext):
+    """Ask for a custom spread or depth threshold."""
+    _, symbol, kind = callback.data.split(":")
+    
+    await state.set_state(AddAlertStates.waiting_for_book)
+    await state.update_data(token=symbol, kind=kind)
+    
+    if kind == "spread":
+        prompt = f"Enter the bid/ask spread for {symbol} in percent of the price (e.g. 0.25):"
+    else:
+        prompt = f"Enter the minimum amount at the best bid and ask for {symbol} in USD (e.g. 20000):"
+    await callback.message.edit_text(prompt)
+    await callback.answer()
+
+@router.message(AddAlertStates.waiting_for_book)
+async def process_book_input(message: Message, state: FSMContext):
+    """Create an order book alert from the entered threshold."""
+    state_data = await state.get_data()
+    token = state_data.get("token")
+    kind = state_data.get("kind")
+    user_id = message.from_user.id
+    
+    try:
+        threshold = float(message.text.strip().replace("%", "").replace("$", "").replace(",", ""))
+        if threshold <= 0:
+            raise ValueError("Threshold must be positive")
+    except ValueError as e:
+        logger.warning(f"Invalid order book threshold from user {user_id}: {message.text} - {e}")
+        await message.answer("Invalid value. Enter a positive number (e.g. 0.25 or 20000).")
+        return
+    
+    if not token or kind not in BOOK_ALERT_TYPES:
+        await message.answer(
+            "An error occurred. Please try again from the beginning.",
+            reply_markup=UserKeyboard.dashboard_menu()
+        )
+    else:
+        text = await create_book_alert(user_id, token, kind, threshold)
+        await message.answer(text, reply_markup=UserKeyboard.dashboard_menu())
+    
+    await state.clear()
+
+@router.callback_query(F.data.startswith("toggle_grid:"))
+async def toggle_alert_grid(callback: CallbackQuery):
+    """Switch a step alert between grid lines and distance from the last alert."""
+    user_id = callback.from_user.id
+    alert_id = int(callback.data.split(":")[1])
+    
+    alerts = await TokenAlertService.get_user_alerts(user_id)
+    alert = next((a for a in alerts if a.id == alert_id), None)
+    
+    if not alert or not await TokenAlertService.set_step_mode(alert_id, not alert.is_grid):
+        await callback.answer("Failed to update alert")
+        return
+    
+    alerts = await TokenAlertService.get_user_alerts(user_id)
+    alert = next((a for a in alerts if a.id == alert_id), None)
+    await callback.message.edit_text(
+        f"Alert options for {alert.market} ({alert.describe()}):\n"
+        f"Status: {alert_status(alert)}",
+        reply_markup=UserKeyboard.alert_options(alert)
+    )
+    await callback.answer(
+        f"Notifying at multiples of ${alert.price_multiplier:g}" if alert.is_grid
+        else f"Notifying after every ${alert.price_multiplier:g} move"
+    )
+
 @router.callback_query(F.data == "my_alerts")
 async def show_user_alerts(callback: CallbackQuery):
     """Show user's configured alerts."""
@@ -258,9 +1108,8 @@ async def show_user_alerts(callback: CallbackQuery):
     else:
         message_text = "Your configured alerts:\n\n"
         for alert in alerts:
-            status = "✅ Active" if alert.is_active else "❌ Disabled"
-            price = f"${alert.price_multiplier:g}"
-            message_text += f"{status} | {alert.symbol} | Step: {price}\n"
+            status = "😴 Snoozed" if alert.snoozed_until else "✅ Active" if alert.is_active else "❌ Disabled"
+            message_text += f"{status} | {alert.market} | {alert.describe()}\n"
     
     await callback.message.edit_text(
         message_text,
@@ -268,6 +1117,121 @@ async def show_user_alerts(callback: CallbackQuery):
     )
     await callback.answer()
 
+@router.callback_query(F.data == "watchlist")
+async def show_watchlist(callback: CallbackQuery):
+    """Show the current price of every tracked market and how far each alert is from firing."""
+    user_id = callback.from_user.id
+    text = await ReportService.get_watchlist(user_id)
+    
+    if not text:
+        await callback.answer("Failed to load the watchlist")
+        return
+    
+    try:
+        await callback.message.edit_text(text, reply_markup=UserKeyboard.watchlist_menu(), parse_mode="HTML")
+    except Exception as e:
+        # Telegram rejects edits that don't change the message
+        logger.debug(f"Watchlist not updated: {e}")
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("top_movers:"))
+async def show_top_movers(callback: CallbackQuery):
+    """Show the top gainers, losers and turnover leaders of a market from MARKETS."""
+    market = int(callback.data.split(":")[1])
+    category, quote, label = MARKETS[market]
+    movers = await MarketDataService.top_movers(TOP_MOVERS_COUNT, category, quote)
+    
+    try:
+        await callback.message.edit_text(
+            render_top_movers(movers, label),
+            reply_markup=UserKeyboard.top_movers_menu(market),
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        # Telegram rejects edits that don't change the message
+        logger.debug(f"Top movers not updated: {e}")
+    await callback.answer()
+
+# Не больше стольких рынков в одном /price или inline-запросе
+PRICE_MAX_MARKETS = 20
+INLINE_COMPLETIONS = 10
+
+async def get_quotes(texts: list) -> tuple:
+    """(markets, unrecognised inputs, tickers) for /price and inline queries, priced from cached snapshots."""
+    markets, unknown = [], []
+    for text in texts[:PRICE_MAX_MARKETS]:
+        market = normalize_market(text.strip(",").upper())
+        if not market:
+            unknown.append(text)
+        elif market not in markets:
+            markets.append(market)
+    
+    # Снимок категории скачивается заново, только если он старше MARKET_SNAPSHOT_TTL
+    legs = set()
+    for market in markets:
+        pair = parse_pair(market)
+        legs.update(pair[:2] if pair else (market,))
+    tickers = await MarketDataService.get_tickers(legs)
+    return markets, unknown, tickers
+
+@router.message(Command("price"))
+async def price_command(message: Message, command: CommandObject):
+    """Quote several markets at once: /price BTC ETH SOL.P ETH/BTC."""
+    user = await UserService.get_user(message.from_user.id)
+    if not user or not user.is_approved or user.is_blocked:
+        await message.answer("You don't have access to this bot.")
+        return
+    
+    args = (command.args or "").split()
+    if not args:
+        await message.answer(f"Usage: /price BTC ETH SOL\n\n{MARKET_HINT}")
+        return
+    
+    markets, unknown, tickers = await get_quotes(args)
+    text = render_report(markets, tickers, title="💱 <b>Prices</b>") if markets else "💱 <b>Prices</b>\n"
+    if unknown:
+        text += f"\n\nNot recognised: {escape(', '.join(unknown))}"
+    await message.answer(text, parse_mode="HTML")
+
+@router.inline_query()
+async def inline_quotes(inline_query: InlineQuery):
+    """Inline mode: @bot BTC ETH returns a quote of every market and one message with all of them; @bot TR completes to TRUMP, TRX, ..."""
+    user = await UserService.get_user(inline_query.from_user.id)
+    if not user or not user.is_approved or user.is_blocked:
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+    
+    words = inline_query.query.split()
+    # Недописанное последнее слово дополняется по индексу символов спота
+    completions = []
+    if words and not inline_query.query.endswith(" "):
+        last = normalize_market(words[-1].upper())
+        if not last or not await MarketDataService.is_valid(last):
+            prefix = re.sub(r"[^A-Z0-9]", "", words.pop().upper())
+            completions = await MarketDataService.search_markets(prefix, limit=INLINE_COMPLETIONS) if prefix else []
+    
+    markets, _, tickers = await get_quotes(words)
+    suggested, _, suggested_tickers = await get_quotes(completions)
+    tickers.update(suggested_tickers)
+    results = [
+        InlineQueryResultArticle(
+            id=str(index),
+            title=format_quote(market, tickers, html=False),
+            input_message_content=InputTextMessageContent(message_text=format_quote(market, tickers), parse_mode="HTML"),
+        )
+        for index, market in enumerate(markets + [market for market in suggested if market not in markets])
+    ]
+    if len(markets) > 1:
+        results.insert(0, InlineQueryResultArticle(
+            id="all",
+            title=f"All {len(markets)} quotes",
+            description=", ".join(markets),
+            input_message_content=InputTextMessageContent(
+                message_text=render_report(markets, tickers, title="💱 <b>Prices</b>"), parse_mode="HTML"
+            ),
+        ))
+    await inline_query.answer(results, cache_time=5, is_personal=True)
+
 @router.callback_query(F.data.startswith("alerts_page:"))
 async def paginate_alerts(callback: CallbackQuery):
     """Handle pagination for alerts list."""
@@ -310,9 +1274,9 @@ async def show_alert_options(callback: CallbackQuery):
         return
     
     await callback.message.edit_text(
-        f"Alert options for {alert.symbol} (${alert.price_multiplier:g}):\n"
-        f"Status: {'Active' if alert.is_active else 'Disabled'}",
-        reply_markup=UserKeyboard.alert_options(alert.id, alert.is_active)
+        f"Alert options for {alert.market} ({alert.describe()}):\n"
+        f"Status: {alert_status(alert)}",
+        reply_markup=UserKeyboard.alert_options(alert)
     )
     await callback.answer()
 
@@ -336,9 +1300,9 @@ async def enable_alert(callback: CallbackQuery):
         
         if alert:
             await callback.message.edit_text(
-                f"Alert options for {alert.symbol} (${alert.price_multiplier:g}):\n"
-                f"Status: {'Active' if alert.is_active else 'Disabled'}",
-                reply_markup=UserKeyboard.alert_options(alert.id, alert.is_active)
+                f"Alert options for {alert.market} ({alert.describe()}):\n"
+                f"Status: {alert_status(alert)}",
+                reply_markup=UserKeyboard.alert_options(alert)
             )
     else:
         logger.error(f"Failed to enable alert {alert_id} for user {user_id}")
@@ -364,9 +1328,9 @@ async def disable_alert(callback: CallbackQuery):
         
         if alert:
             await callback.message.edit_text(
-                f"Alert options for {alert.symbol} (${alert.price_multiplier:g}):\n"
-                f"Status: {'Active' if alert.is_active else 'Disabled'}",
-                reply_markup=UserKeyboard.alert_options(alert.id, alert.is_active)
+                f"Alert options for {alert.market} ({alert.describe()}):\n"
+                f"Status: {alert_status(alert)}",
+                reply_markup=UserKeyboard.alert_options(alert)
             )
     else:
         logger.error(f"Failed to disable alert {alert_id} for user {user_id}")
@@ -417,22 +1381,20 @@ async def cancel_remove_alert(callback: CallbackQuery):
     
     if alert:
         await callback.message.edit_text(
-            f"Alert options for {alert.symbol} (${alert.price_multiplier:g}):\n"
-            f"Status: {'Active' if alert.is_active else 'Disabled'}",
-            reply_markup=UserKeyboard.alert_options(alert.id, alert.is_active)
+            f"Alert options for {alert.market} ({alert.describe()}):\n"
+            f"Status: {alert_status(alert)}",
+            reply_markup=UserKeyboard.alert_options(alert)
         )
     else:
         await show_user_alerts(callback)
     
     await callback.answer("Operation cancelled")
 
-@router.callback_query(F.data == "available_tokens")
-async def show_available_tokens(callback: CallbackQuery):
-    """Show available tokens on Bybit."""
-    await callback.answer("Fetching available tokens...", show_alert=True)
-    
-    # Get top tokens from Bybit
-    tokens = await BybitService.get_all_tokens()
+async def show_token_page(callback: CallbackQuery, page: int = 0, market: int = 0):
+    """Show one page of the tokens of a market from MARKETS."""
+    category, quote, label = MARKETS[market]
+    # Список берётся из кэшированного снимка тикеров категории, без отдельного запроса на страницу
+    tokens = await MarketDataService.list_markets(category, quote)
     
     if not tokens:
         await callback.message.edit_text(
@@ -441,42 +1403,90 @@ async def show_available_tokens(callback: CallbackQuery):
         )
         return
     
-    # Sort tokens alphabetically
-    tokens.sort()
+    await callback.message.edit_text(
+        f"Select a token to set up price alerts ({label}, {len(tokens)} available):",
+        reply_markup=UserKeyboard.token_list(tokens, page, market=market)
+    )
+
+@router.callback_query(F.data == "available_tokens")
+async def show_available_tokens(callback: CallbackQuery):
+    """Show available tokens on Bybit."""
+    await callback.answer("Fetching available tokens...", show_alert=True)
+    await show_token_page(callback)
+
+@router.callback_query(F.data.startswith("token_market:"))
+async def switch_token_market(callback: CallbackQuery, state: FSMContext):
+    """Switch the token list to another market (spot, perpetuals, quote asset)."""
+    market = int(callback.data.split(":")[1])
+    if not 0 <= market < len(MARKETS):
+        await callback.answer()
+        return
     
+    # Возврат из поиска в список
+    await state.clear()
+    await callback.answer()
+    await show_token_page(callback, market=market)
+
+# Столько найденных токенов помещается в клавиатуру результатов
+SEARCH_RESULTS_LIMIT = 20
+
+@router.callback_query(F.data.startswith("search_tokens:"))
+async def start_token_search(callback: CallbackQuery, state: FSMContext):
+    """Ask for the first letters of a token; every message narrows the list."""
+    market = int(callback.data.split(":")[1])
+    if not 0 <= market < len(MARKETS):
+        market = 0
+    
+    await state.set_state(AddAlertStates.waiting_for_search)
+    await state.update_data(search_market=market)
     await callback.message.edit_text(
-        "Select a token to set up price alerts:",
-        reply_markup=UserKeyboard.token_list(tokens)
+        f"🔎 Type the first letters of a token ({MARKETS[market][2]}), e.g. TR for TRUMP.\n"
+        "Send more letters to narrow the list.",
+        reply_markup=UserKeyboard.token_search_results([], market)
     )
+    await callback.answer()
 
-@router.callback_query(F.data.startswith("token_page:"))
-async def paginate_tokens(callback: CallbackQuery):
-    """Handle pagination for token list."""
-    page = int(callback.data.split(":")[1])
+@router.message(AddAlertStates.waiting_for_search)
+async def process_token_search(message: Message, state: FSMContext):
+    """Show the tokens whose symbol starts with the typed letters."""
+    state_data = await state.get_data()
+    market = state_data.get("search_market", 0)
+    category, quote, label = MARKETS[market]
+    prefix = re.sub(r"[^A-Z0-9]", "", message.text.upper())
     
-    # Get tokens from Bybit
-    tokens = await BybitService.get_all_tokens()
+    if not prefix:
+        await message.answer("Please type letters or digits of a token symbol.")
+        return
     
+    # Индекс символов строится один раз на снимок, поиск - два bisect
+    tokens = await MarketDataService.search_markets(prefix, category, quote, limit=SEARCH_RESULTS_LIMIT + 1)
     if not tokens:
-        await callback.message.edit_text(
-            "Failed to fetch available tokens. Please try again later.",
-            reply_markup=UserKeyboard.dashboard_menu()
-        )
-        return
+        text = f"No {label} tokens start with {prefix}. Try other letters."
+    elif len(tokens) > SEARCH_RESULTS_LIMIT:
+        text = f"First {SEARCH_RESULTS_LIMIT} {label} tokens starting with {prefix}, type more letters to narrow:"
+    else:
+        text = f"{label} tokens starting with {prefix}:"
     
-    # Sort tokens alphabetically
-    tokens.sort()
+    await message.answer(text, reply_markup=UserKeyboard.token_search_results(tokens[:SEARCH_RESULTS_LIMIT], market))
+
+@router.callback_query(F.data.startswith("token_page:"))
+async def paginate_tokens(callback: CallbackQuery):
+    """Handle pagination for token list."""
+    parts = callback.data.split(":")
+    page = int(parts[1])
+    market = int(parts[2]) if len(parts) > 2 else 0
     
-    await callback.message.edit_reply_markup(
-        reply_markup=UserKeyboard.token_list(tokens, page)
-    )
     await callback.answer()
+    await show_token_page(callback, page, market if 0 <= market < len(MARKETS) else 0)
 
 @router.callback_query(F.data.startswith("select_token:"))
-async def select_token(callback: CallbackQuery):
+async def select_token(callback: CallbackQuery, state: FSMContext):
     """Handle token selection."""
     symbol = callback.data.split(":")[1]
     
+    # Выбор из результатов поиска завершает поиск
+    await state.clear()
+    
     await callback.message.edit_text(
         f"You selected {symbol}. Now choose the price step for alerts:",
         reply_markup=UserKeyboard.price_multiplier_select(symbol)
@@ -504,9 +1514,9 @@ async def change_alert_threshold(callback: CallbackQuery):
         return
     
     await callback.message.edit_text(
-        f"Select new alert step for {alert.symbol}:\n"
+        f"Select new alert step for {alert.market}:\n"
         f"Current step: ${alert.price_multiplier:g}",
-        reply_markup=UserKeyboard.threshold_options(alert.id, alert.symbol)
+        reply_markup=UserKeyboard.threshold_options(alert.id, alert.market)
     )
     await callback.answer()
 
@@ -533,9 +1543,9 @@ async def update_alert_threshold(callback: CallbackQuery):
         # Show alert options again
         if alert:
             await callback.message.edit_text(
-                f"Alert options for {alert.symbol} (${alert.price_multiplier:g}):\n"
-                f"Status: {'Active' if alert.is_active else 'Disabled'}",
-                reply_markup=UserKeyboard.alert_options(alert.id, alert.is_active)
+                f"Alert options for {alert.market} ({alert.describe()}):\n"
+                f"Status: {alert_status(alert)}",
+                reply_markup=UserKeyboard.alert_options(alert)
             )
         else:
             await show_user_alerts(callback)
@@ -590,8 +1600,7 @@ async def process_custom_threshold(message: Message, state: FSMContext):
         if alert:
             logger.info(f"Successfully created alert for {token} with step ${new_threshold:g}")
             await message.answer(
-                f"✅ Alert set for {token} with ${new_threshold:g} step.\n\n"
-                f"You will be notified when the price crosses multiples of ${new_threshold:g}.",
+                step_alert_created(token, new_threshold),
                 reply_markup=UserKeyboard.dashboard_menu()
             )
         else:
@@ -612,12 +1621,12 @@ async def process_custom_threshold(message: Message, state: FSMContext):
             alert = next((a for a in alerts if a.id == alert_id), None)
             
             if alert:
-                logger.info(f"Successfully updated alert for {alert.symbol} with step ${new_threshold:g}")
+                logger.info(f"Successfully updated alert for {alert.market} with step ${new_threshold:g}")
                 await message.answer(
-                    f"Step for {alert.symbol} alert updated to ${new_threshold:g}.\n\n"
-                    f"Alert options for {alert.symbol} (${alert.price_multiplier:g}):\n"
-                    f"Status: {'Active' if alert.is_active else 'Disabled'}",
-                    reply_markup=UserKeyboard.alert_options(alert.id, alert.is_active)
+                    f"Step for {alert.market} alert updated to ${new_threshold:g}.\n\n"
+                    f"Alert options for {alert.market} ({alert.describe()}):\n"
+                    f"Status: {alert_status(alert)}",
+                    reply_markup=UserKeyboard.alert_options(alert)
                 )
             else:
                 await message.answer(
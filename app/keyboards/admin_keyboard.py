@@ -7,7 +7,8 @@ class AdminKeyboard:
         buttons = [
             [InlineKeyboardButton(text="👤 User List", callback_data="admin_user_list")],
             [InlineKeyboardButton(text="🔔 Pending Approvals", callback_data="admin_pending_users")],
-            [InlineKeyboardButton(text="🚫 Blocked Users", callback_data="admin_blocked_users")]
+            [InlineKeyboardButton(text="🚫 Blocked Users", callback_data="admin_blocked_users")],
+            [InlineKeyboardButton(text="📢 Broadcast", callback_data="admin_broadcast")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
@@ -100,12 +101,10 @@ class AdminKeyboard:
         # Add alert buttons
         if alerts:
             for alert in alerts[start:end]:
-                symbol = alert.symbol
-                multiplier = alert.price_multiplier
                 status = "✅" if alert.is_active else "❌"
                 
                 buttons.append([InlineKeyboardButton(
-                    text=f"{status} {symbol} - ${multiplier:g}",
+                    text=f"{status} {alert.market} - {alert.describe()}",
                     callback_data="noop"  # Admin can't modify user alerts directly
                 )])
         else:
@@ -140,4 +139,53 @@ class AdminKeyboard:
             ]
         ]
         
-        return InlineKeyboardMarkup(inline_keyboard=buttons) 
\ No newline at end of file
+        return InlineKeyboardMarkup(inline_keyboard=buttons) 
+    
+    @staticmethod
+    def broadcast_menu(broadcasts: list) -> InlineKeyboardMarkup:
+        """Broadcast panel keyboard with recent broadcasts."""
+        buttons = [[InlineKeyboardButton(text="✏️ New Broadcast", callback_data="admin_broadcast_new")]]
+        
+        for broadcast in broadcasts:
+            buttons.append([InlineKeyboardButton(
+                text=f"#{broadcast.id} {broadcast.status} ({broadcast.sent_count}/{broadcast.total_count})",
+                callback_data=f"admin_broadcast_view:{broadcast.id}"
+            )])
+        
+        # Back button
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data="admin_back_to_management")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def broadcast_confirm(broadcast_id: int) -> InlineKeyboardMarkup:
+        """Confirmation keyboard for a new broadcast."""
+        buttons = [
+            [
+                InlineKeyboardButton(text="✅ Send", callback_data=f"admin_broadcast_send:{broadcast_id}"),
+                InlineKeyboardButton(text="❌ Discard", callback_data=f"admin_broadcast_discard:{broadcast_id}")
+            ]
+        ]
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def broadcast_options(broadcast_id: int, status: str, is_running: bool) -> InlineKeyboardMarkup:
+        """Broadcast options keyboard."""
+        buttons = []
+        
+        if is_running:
+            buttons.append([InlineKeyboardButton(
+                text="⏸ Pause", 
+                callback_data=f"admin_broadcast_stop:{broadcast_id}"
+            )])
+        elif status in ("running", "paused"):
+            buttons.append([InlineKeyboardButton(
+                text="▶️ Resume", 
+                callback_data=f"admin_broadcast_send:{broadcast_id}"
+            )])
+        
+        buttons.append([InlineKeyboardButton(text="🔄 Refresh", callback_data=f"admin_broadcast_view:{broadcast_id}")])
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data="admin_broadcast")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
\ No newline at end of file
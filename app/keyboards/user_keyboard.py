@@ -1,5 +1,8 @@
+import time
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from app.settings import AVAILABLE_PRICE_MULTIPLIERS
+from app.settings import AVAILABLE_PRICE_MULTIPLIERS, AVAILABLE_PERCENT_MOVES, AVAILABLE_FUNDING_THRESHOLDS, AVAILABLE_OPEN_INTEREST_MOVES, AVAILABLE_TURNOVER_SPIKES, AVAILABLE_SPREAD_THRESHOLDS, AVAILABLE_DEPTH_THRESHOLDS, SNOOZE_OPTIONS, REPORT_INTERVALS, REPORT_DAILY_TIMES
+from app.models import TokenAlert
+from app.models.token_alert import ALERT_TYPE_STEP, ALERT_TYPE_GRID, ALERT_TYPE_LEVEL, BAND_ALERT_TYPES, CATEGORY_SPOT, MARKETS, format_duration, format_window, parse_market
 
 class UserKeyboard:
     @staticmethod
@@ -27,17 +30,76 @@ class UserKeyboard:
         buttons = [
             [InlineKeyboardButton(text="➕ Add New Alert", callback_data="add_alert")],
             [InlineKeyboardButton(text="📊 My Alerts", callback_data="my_alerts")],
-            [InlineKeyboardButton(text="🔍 Available Tokens", callback_data="available_tokens")]
+            [InlineKeyboardButton(text="📋 Watchlist", callback_data="watchlist")],
+            [InlineKeyboardButton(text="🚀 Top Movers", callback_data="top_movers:0")],
+            [InlineKeyboardButton(text="🔍 Available Tokens", callback_data="available_tokens")],
+            [InlineKeyboardButton(text="🗓 Price Reports", callback_data="price_reports")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
     @staticmethod
-    def token_list(tokens: list, page: int = 0, page_size: int = 5) -> InlineKeyboardMarkup:
-        """List of tokens keyboard."""
+    def watchlist_menu() -> InlineKeyboardMarkup:
+        """Watchlist keyboard."""
+        buttons = [
+            [InlineKeyboardButton(text="🔄 Refresh", callback_data="watchlist")],
+            [InlineKeyboardButton(text="🔙 Back", callback_data="back_to_dashboard")]
+        ]
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def top_movers_menu(market: int = 0) -> InlineKeyboardMarkup:
+        """Top movers keyboard. market is the index of the ranked market in MARKETS."""
+        market_buttons = [
+            InlineKeyboardButton(text=f"• {label}", callback_data="noop") if index == market
+            else InlineKeyboardButton(text=label, callback_data=f"top_movers:{index}")
+            for index, (_, _, label) in enumerate(MARKETS)
+        ]
+        buttons = [
+            market_buttons[:2],
+            market_buttons[2:],
+            [InlineKeyboardButton(text="🔄 Refresh", callback_data=f"top_movers:{market}")],
+            [InlineKeyboardButton(text="🔙 Back", callback_data="back_to_dashboard")]
+        ]
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def report_options(interval_seconds: int = None, daily_minute: int = None, subscribed: bool = False) -> InlineKeyboardMarkup:
+        """Price report schedules; the current one is marked."""
+        options = [
+            (f"Every {format_window(seconds)}", f"report:interval:{seconds}", subscribed and daily_minute is None and seconds == interval_seconds)
+            for seconds in REPORT_INTERVALS
+        ] + [
+            (f"Daily at {minute // 60:02d}:{minute % 60:02d}", f"report:daily:{minute}", subscribed and minute == daily_minute)
+            for minute in REPORT_DAILY_TIMES
+        ]
+        buttons = [
+            [InlineKeyboardButton(text=f"• {text}", callback_data="noop") if current else InlineKeyboardButton(text=text, callback_data=data)]
+            for text, data, current in options
+        ]
+        if subscribed:
+            buttons.append([InlineKeyboardButton(text="🔕 Stop Reports", callback_data="report:off")])
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data="back_to_dashboard")])
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def token_list(tokens: list, page: int = 0, page_size: int = 5, market: int = 0) -> InlineKeyboardMarkup:
+        """List of tokens keyboard. market is the index of the listed market in MARKETS."""
         buttons = []
         
-        # Add button for manual token input
-        buttons.append([InlineKeyboardButton(text="✏️ Enter Custom Token", callback_data="enter_custom_token")])
+        # Add buttons for manual token input and search by the first letters
+        buttons.append([
+            InlineKeyboardButton(text="✏️ Enter Custom Token", callback_data="enter_custom_token"),
+            InlineKeyboardButton(text="🔎 Search", callback_data=f"search_tokens:{market}")
+        ])
+        
+        # Переключатель рынков: спот и перпетуалы с разными котируемыми активами
+        market_buttons = [
+            InlineKeyboardButton(text=f"• {label}", callback_data="noop") if index == market
+            else InlineKeyboardButton(text=label, callback_data=f"token_market:{index}")
+            for index, (_, _, label) in enumerate(MARKETS)
+        ]
+        buttons.append(market_buttons[:2])
+        buttons.append(market_buttons[2:])
         
         # Calculate pagination
         total_pages = (len(tokens) + page_size - 1) // page_size
@@ -51,12 +113,12 @@ class UserKeyboard:
         # Add pagination controls
         pagination_row = []
         if page > 0:
-            pagination_row.append(InlineKeyboardButton(text="⬅️", callback_data=f"token_page:{page-1}"))
+            pagination_row.append(InlineKeyboardButton(text="⬅️", callback_data=f"token_page:{page-1}:{market}"))
         
         pagination_row.append(InlineKeyboardButton(text=f"{page+1}/{total_pages}", callback_data="noop"))
         
         if page < total_pages - 1:
-            pagination_row.append(InlineKeyboardButton(text="➡️", callback_data=f"token_page:{page+1}"))
+            pagination_row.append(InlineKeyboardButton(text="➡️", callback_data=f"token_page:{page+1}:{market}"))
         
         if pagination_row:
             buttons.append(pagination_row)
@@ -70,10 +132,11 @@ class UserKeyboard:
     def price_multiplier_select(symbol: str) -> InlineKeyboardMarkup:
         """Price multiplier selection keyboard."""
         buttons = []
+        parsed = parse_market(symbol)
         
         # Add price multipliers
         for multiplier in AVAILABLE_PRICE_MULTIPLIERS:
-            formatted = f"${multiplier:g}" # Remove trailing zeros
+            formatted = f"${multiplier:g}" if parsed else f"{multiplier:g}" # Remove trailing zeros
             buttons.append([InlineKeyboardButton(
                 text=formatted, 
                 callback_data=f"set_multiplier:{symbol}:{multiplier}"
@@ -85,11 +148,152 @@ class UserKeyboard:
             callback_data=f"custom_multiplier:{symbol}"
         )])
         
+        # Пары (ETH÷BTC) поддерживают только шаг и уровень
+        if not parsed:
+            buttons.append([InlineKeyboardButton(text="🎯 Level", callback_data=f"level_alert:{symbol}")])
+            buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data="available_tokens")])
+            return InlineKeyboardMarkup(inline_keyboard=buttons)
+        
+        # Alert on an absolute price level or a percent move instead of a step
+        buttons.append([
+            InlineKeyboardButton(text="🎯 Price Level", callback_data=f"level_alert:{symbol}"),
+            InlineKeyboardButton(text="📈 % Move", callback_data=f"percent_alert:{symbol}")
+        ])
+        
+        # Alerts computed from the 24h statistics of the market
+        buttons.append([
+            InlineKeyboardButton(text="🚀 24h Breakout", callback_data=f"breakout_alert:{symbol}"),
+            InlineKeyboardButton(text="🔥 Volume Spike", callback_data=f"turnover_alert:{symbol}")
+        ])
+        
+        buttons.append([InlineKeyboardButton(text="📖 Order Book", callback_data=f"book_alert:{symbol}")])
+        
+        # Перпетуалы: алерты по ставке финансирования и открытому интересу
+        if parsed[2] != CATEGORY_SPOT:
+            buttons.append([
+                InlineKeyboardButton(text="💸 Funding Rate", callback_data=f"funding_alert:{symbol}"),
+                InlineKeyboardButton(text="📊 Open Interest", callback_data=f"oi_alert:{symbol}")
+            ])
+        
         # Add back button
         buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data="available_tokens")])
         
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @staticmethod
+    def percent_move_select(symbol: str) -> InlineKeyboardMarkup:
+        """Percent move alert presets keyboard."""
+        buttons = []
+        
+        for percent, minutes in AVAILABLE_PERCENT_MOVES:
+            buttons.append([InlineKeyboardButton(
+                text=f"{percent:g}% in {format_window(minutes * 60)}", 
+                callback_data=f"set_percent:{symbol}:{percent}:{minutes}"
+            )])
+        
+        buttons.append([InlineKeyboardButton(
+            text="✏️ Enter Custom Value", 
+            callback_data=f"custom_percent:{symbol}"
+        )])
+        
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data=f"select_token:{symbol}")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def funding_select(symbol: str) -> InlineKeyboardMarkup:
+        """Funding rate threshold presets keyboard."""
+        buttons = []
+        
+        for threshold in AVAILABLE_FUNDING_THRESHOLDS:
+            buttons.append([InlineKeyboardButton(
+                text=f"±{threshold:g}%", 
+                callback_data=f"set_funding:{symbol}:{threshold}"
+            )])
+        
+        buttons.append([InlineKeyboardButton(
+            text="✏️ Enter Custom Value", 
+            callback_data=f"custom_funding:{symbol}"
+        )])
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data=f"select_token:{symbol}")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def open_interest_select(symbol: str) -> InlineKeyboardMarkup:
+        """Open interest move presets keyboard."""
+        buttons = []
+        
+        for percent, minutes in AVAILABLE_OPEN_INTEREST_MOVES:
+            buttons.append([InlineKeyboardButton(
+                text=f"{percent:g}% in {format_window(minutes * 60)}", 
+                callback_data=f"set_oi:{symbol}:{percent}:{minutes}"
+            )])
+        
+        buttons.append([InlineKeyboardButton(
+            text="✏️ Enter Custom Value", 
+            callback_data=f"custom_oi:{symbol}"
+        )])
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data=f"select_token:{symbol}")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def breakout_select(symbol: str) -> InlineKeyboardMarkup:
+        """24h breakout side selection keyboard."""
+        buttons = [
+            [InlineKeyboardButton(text="🟢 New 24h High", callback_data=f"set_breakout:{symbol}:above")],
+            [InlineKeyboardButton(text="🔴 New 24h Low", callback_data=f"set_breakout:{symbol}:below")],
+            [InlineKeyboardButton(text="↕️ Either", callback_data=f"set_breakout:{symbol}:both")],
+            [InlineKeyboardButton(text="🔙 Back", callback_data=f"select_token:{symbol}")]
+        ]
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def turnover_select(symbol: str) -> InlineKeyboardMarkup:
+        """Volume spike presets keyboard."""
+        buttons = []
+        
+        for percent, minutes in AVAILABLE_TURNOVER_SPIKES:
+            buttons.append([InlineKeyboardButton(
+                text=f"+{percent:g}% vs {format_window(minutes * 60)}", 
+                callback_data=f"set_turnover:{symbol}:{percent}:{minutes}"
+            )])
+        
+        buttons.append([InlineKeyboardButton(
+            text="✏️ Enter Custom Value", 
+            callback_data=f"custom_turnover:{symbol}"
+        )])
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data=f"select_token:{symbol}")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def book_select(symbol: str) -> InlineKeyboardMarkup:
+        """Order book alert presets keyboard: spread widening and thin top of book."""
+        spread_row = [
+            InlineKeyboardButton(text=f"≥{threshold:g}%", callback_data=f"set_book:{symbol}:spread:{threshold}")
+            for threshold in AVAILABLE_SPREAD_THRESHOLDS
+        ]
+        depth_row = [
+            InlineKeyboardButton(text=f"<${threshold / 1000:g}K", callback_data=f"set_book:{symbol}:depth:{threshold}")
+            for threshold in AVAILABLE_DEPTH_THRESHOLDS
+        ]
+        buttons = [
+            [InlineKeyboardButton(text="📖 Spread widens to", callback_data="noop")],
+            spread_row,
+            [InlineKeyboardButton(text="💧 Top of book thins below", callback_data="noop")],
+            depth_row,
+            [
+                InlineKeyboardButton(text="✏️ Custom Spread", callback_data=f"custom_book:{symbol}:spread"),
+                InlineKeyboardButton(text="✏️ Custom Depth", callback_data=f"custom_book:{symbol}:depth")
+            ],
+            [InlineKeyboardButton(text="🔙 Back", callback_data=f"select_token:{symbol}")]
+        ]
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
     @staticmethod
     def user_alerts(alerts: list, page: int = 0, page_size: int = 5) -> InlineKeyboardMarkup:
         """User alerts keyboard."""
@@ -103,12 +307,10 @@ class UserKeyboard:
         # Add alert buttons
         if alerts:
             for alert in alerts[start:end]:
-                symbol = alert.symbol
-                multiplier = alert.price_multiplier
-                status = "✅" if alert.is_active else "❌"
+                status = "😴" if alert.snoozed_until else "✅" if alert.is_active else "❌"
                 
                 buttons.append([InlineKeyboardButton(
-                    text=f"{status} {symbol} - ${multiplier:g}",
+                    text=f"{status} {alert.market} - {alert.describe()}",
                     callback_data=f"alert_options:{alert.id}"
                 )])
         else:
@@ -134,22 +336,85 @@ class UserKeyboard:
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
     @staticmethod
-    def alert_options(alert_id: int, is_active: bool) -> InlineKeyboardMarkup:
-        """Alert options keyboard."""
+    def token_search_results(tokens: list, market: int = 0) -> InlineKeyboardMarkup:
+        """Tokens found by a search, two per row."""
+        buttons = [
+            [InlineKeyboardButton(text=token, callback_data=f"select_token:{token}") for token in tokens[i:i + 2]]
+            for i in range(0, len(tokens), 2)
+        ]
+        buttons.append([InlineKeyboardButton(text="🔙 Back", callback_data=f"token_market:{market}")])
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @staticmethod
+    def token_suggestions(markets: list) -> InlineKeyboardMarkup:
+        """Listed markets close to a mistyped token, in one row."""
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=market, callback_data=f"select_token:{market}") for market in markets],
+            [InlineKeyboardButton(text="🔙 Back", callback_data="back_to_dashboard")],
+        ])
+    
+    @staticmethod
+    def alert_options(alert: TokenAlert) -> InlineKeyboardMarkup:
+        """Alert options keyboard for the alert's type and current settings."""
         buttons = []
+        alert_id = alert.id
+        is_active = alert.is_active
+        alert_type = alert.alert_type or ALERT_TYPE_STEP
         
-        # Toggle status button
+        # Toggle status button; a snoozed alert is disabled until the scheduler enables it again
         status_text = "Disable" if is_active else "Enable"
         status_action = "disable" if is_active else "enable"
         buttons.append([InlineKeyboardButton(
-            text=f"{status_text} Alert", 
+            text="⏰ Unsnooze" if alert.snoozed_until else f"{status_text} Alert", 
             callback_data=f"{status_action}_alert:{alert_id}"
         )])
         
-        # Change threshold button
+        if is_active:
+            buttons.append([
+                InlineKeyboardButton(text=f"😴 {format_window(seconds)}", callback_data=f"snooze:{alert_id}:{seconds}")
+                for seconds in SNOOZE_OPTIONS
+            ])
+        
+        if alert_type == ALERT_TYPE_LEVEL:
+            # Level alerts: change the level and choose what happens after firing
+            buttons.append([InlineKeyboardButton(
+                text="🎯 Change Level", 
+                callback_data=f"change_level:{alert_id}"
+            )])
+            buttons.append([InlineKeyboardButton(
+                text=f"🔁 Re-arm after firing: {'On' if alert.rearm else 'Off'}", 
+                callback_data=f"toggle_rearm:{alert_id}"
+            )])
+        elif alert_type in (ALERT_TYPE_STEP, ALERT_TYPE_GRID):
+            # Change threshold button
+            buttons.append([InlineKeyboardButton(
+                text="⚙️ Change Step", 
+                callback_data=f"change_threshold:{alert_id}"
+            )])
+            # Grid: multiples of the step, distance: step away from the last alert price
+            mode = "Grid lines" if alert_type == ALERT_TYPE_GRID else "Distance from last alert"
+            buttons.append([InlineKeyboardButton(
+                text=f"📐 Mode: {mode}", 
+                callback_data=f"toggle_grid:{alert_id}"
+            )])
+        
+        # Noise filters: pause after firing, and a band around grid lines and levels
+        filters = [InlineKeyboardButton(
+            text=f"⏱ Cooldown: {format_window(alert.cooldown_seconds) if alert.cooldown_seconds else 'Off'}", 
+            callback_data=f"cycle_cooldown:{alert_id}"
+        )]
+        if alert_type in BAND_ALERT_TYPES:
+            filters.append(InlineKeyboardButton(
+                text=f"〰️ Band: {f'{alert.hysteresis:g}%' if alert.hysteresis else 'Off'}", 
+                callback_data=f"cycle_band:{alert_id}"
+            ))
+        buttons.append(filters)
+        
+        # Expiry: the alert is removed automatically
+        expires_in = format_duration(max(60, alert.expires_at - time.time())) if alert.expires_at else "Never"
         buttons.append([InlineKeyboardButton(
-            text="⚙️ Change Step", 
-            callback_data=f"change_threshold:{alert_id}"
+            text=f"⌛ Expires: {expires_in}", 
+            callback_data=f"cycle_expiry:{alert_id}"
         )])
         
         # Remove button
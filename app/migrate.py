@@ -100,5 +100,73 @@ def migrate_add_last_alert_time():
         if 'conn' in locals():
             conn.close()
 
+# Колонки, добавленные к существующим таблицам после первого релиза.
+# create_all создаёт только новые таблицы, поэтому недостающие колонки добавляются здесь.
+ADDED_COLUMNS = [
+    ("token_alerts", "alert_type", "VARCHAR DEFAULT 'step'"),
+    ("token_alerts", "threshold", "FLOAT"),
+    ("token_alerts", "direction", "VARCHAR"),
+    ("token_alerts", "rearm", "BOOLEAN DEFAULT 0"),
+    ("token_alerts", "window_seconds", "INTEGER"),
+    ("token_alerts", "grid_bucket", "INTEGER"),
+    ("token_alerts", "category", "VARCHAR DEFAULT 'spot'"),
+    ("token_alerts", "quote", "VARCHAR DEFAULT 'USDT'"),
+    ("token_alerts", "pair_symbol", "VARCHAR"),
+    ("token_alerts", "pair_operation", "VARCHAR"),
+    ("token_alerts", "cooldown_seconds", "INTEGER"),
+    ("token_alerts", "hysteresis", "FLOAT"),
+    ("token_alerts", "snoozed_until", "FLOAT"),
+    ("token_alerts", "expires_at", "FLOAT"),
+    ("token_alerts", "last_value", "FLOAT"),
+    ("users", "quiet_start", "INTEGER"),
+    ("users", "quiet_end", "INTEGER"),
+    ("users", "utc_offset", "INTEGER DEFAULT 0"),
+]
+
+# Заполнение добавленной колонки из старых данных, выполняется один раз вместе с ALTER TABLE
+ADDED_COLUMN_BACKFILLS = {
+    # До last_value funding- и стаканные алерты хранили значение в last_alert_price
+    ("token_alerts", "last_value"): "UPDATE token_alerts SET last_value = last_alert_price, last_alert_price = NULL "
+                                    "WHERE alert_type IN ('funding', 'book_spread', 'book_depth')",
+}
+
+# Индексы, добавленные после первого релиза (create_all не создаёт их для существующих таблиц)
+ADDED_INDEXES = [
+    ("ix_token_alerts_symbol_step", "token_alerts", "symbol, price_multiplier"),
+]
+
+def migrate_add_columns():
+    """Add columns from ADDED_COLUMNS (filled from ADDED_COLUMN_BACKFILLS) and indexes from ADDED_INDEXES that are missing in the database."""
+    try:
+        db_path = DATABASE_URL.replace('sqlite:///', '')
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        existing = {}
+        for table, column, definition in ADDED_COLUMNS:
+            if table not in existing:
+                cursor.execute(f"PRAGMA table_info({table})")
+                existing[table] = {col[1] for col in cursor.fetchall()}
+            
+            if column not in existing[table]:
+                logger.info(f"Adding {column} column to {table} table")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                existing[table].add(column)
+                if (table, column) in ADDED_COLUMN_BACKFILLS:
+                    cursor.execute(ADDED_COLUMN_BACKFILLS[(table, column)])
+        
+        for name, table, columns in ADDED_INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Migration error: {e}")
+        return False
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
 if __name__ == "__main__":
-    migrate_add_last_alert_time() 
\ No newline at end of file
+    migrate_add_last_alert_time()
+    migrate_add_columns() 
\ No newline at end of file
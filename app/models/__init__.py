@@ -1,5 +1,7 @@
 from app.models.base import Base, init_db, get_session
 from app.models.user import User
 from app.models.token_alert import TokenAlert
+from app.models.broadcast import Broadcast
+from app.models.report_subscription import ReportSubscription
 
-__all__ = ["Base", "init_db", "get_session", "User", "TokenAlert"] 
\ No newline at end of file
+__all__ = ["Base", "init_db", "get_session", "User", "TokenAlert", "Broadcast", "ReportSubscription"] 
\ No newline at end of file
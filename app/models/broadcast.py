@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.models.base import Base
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True)
+    admin_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String, default="pending")  # pending, running, paused, completed, cancelled
+    cursor_user_id = Column(Integer, default=0)  # Last recipient user_id already processed
+    total_count = Column(Integer, default=0)
+    sent_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<Broadcast(id={self.id}, status={self.status}, sent={self.sent_count}/{self.total_count}, failed={self.failed_count})>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.models.base import Base
+from app.models.token_alert import format_window
+
+class ReportSubscription(Base):
+    __tablename__ = "report_subscriptions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), unique=True, nullable=False)
+    interval_seconds = Column(Integer, nullable=True)  # Periodic report: every interval_seconds
+    daily_minute = Column(Integer, nullable=True)  # Daily report: minute of the user's local day
+    next_run_at = Column(Float, nullable=False, index=True)  # Unix time of the next report
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def describe(self) -> str:
+        """Schedule of the report, e.g. "every 1h" or "daily at 09:00"."""
+        if self.daily_minute is not None:
+            return f"daily at {self.daily_minute // 60:02d}:{self.daily_minute % 60:02d}"
+        return f"every {format_window(self.interval_seconds)}"
+
+    def __repr__(self):
+        return f"<ReportSubscription(user_id={self.user_id}, schedule={self.describe()}, next_run_at={self.next_run_at})>"
@@ -1,19 +1,239 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+import math
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.models.base import Base
 
+# Типы алертов
+ALERT_TYPE_STEP = "step"    # Price moved by price_multiplier since the last alert
+ALERT_TYPE_GRID = "grid"    # Price crossed a multiple of price_multiplier
+ALERT_TYPE_LEVEL = "level"  # Price crossed an absolute level (threshold) in direction
+ALERT_TYPE_PERCENT = "percent"  # Price moved threshold % within window_seconds
+ALERT_TYPE_FUNDING = "funding"  # Perpetuals: absolute funding rate reached threshold %
+ALERT_TYPE_OPEN_INTEREST = "open_interest"  # Perpetuals: open interest value moved threshold % within window_seconds
+ALERT_TYPE_BREAKOUT = "breakout"  # Price broke the 24h high (direction above), low (below) or either (None)
+ALERT_TYPE_TURNOVER = "turnover"  # 24h turnover rose threshold % above its baseline averaged over window_seconds
+ALERT_TYPE_BOOK_SPREAD = "book_spread"  # Bid/ask spread widened to threshold % of the mid price
+ALERT_TYPE_BOOK_DEPTH = "book_depth"  # Smaller side of the top of book fell below threshold in quote currency
+
+# Типы, у которых есть линия для полосы гистерезиса: линии сетки и уровни
+BAND_ALERT_TYPES = (ALERT_TYPE_GRID, ALERT_TYPE_LEVEL)
+
+DIRECTION_ABOVE = "above"
+DIRECTION_BELOW = "below"
+
+# Категории рынков Bybit и котируемые активы, которые поддерживает бот
+CATEGORY_SPOT = "spot"
+CATEGORY_LINEAR = "linear"    # USDT and USDC perpetuals
+CATEGORY_INVERSE = "inverse"  # Coin-margined perpetuals quoted in USD
+CATEGORY_QUOTES = {
+    CATEGORY_SPOT: ("USDT", "USDC"),
+    CATEGORY_LINEAR: ("USDT", "USDC"),
+    CATEGORY_INVERSE: ("USD",),
+}
+DEFAULT_CATEGORY = CATEGORY_SPOT
+# Рынки, между которыми можно переключаться в списке токенов: (category, quote, label)
+MARKETS = [
+    (CATEGORY_SPOT, "USDT", "Spot USDT"),
+    (CATEGORY_SPOT, "USDC", "Spot USDC"),
+    (CATEGORY_LINEAR, "USDT", "USDT Perp"),
+    (CATEGORY_LINEAR, "USDC", "USDC Perp"),
+    (CATEGORY_INVERSE, "USD", "Inverse"),
+]
+DEFAULT_QUOTE = "USDT"
+
+PERPETUAL_SUFFIX = ".P"
+
+def market_key(symbol: str, quote: str = DEFAULT_QUOTE, category: str = DEFAULT_CATEGORY) -> str:
+    """
+    Name of a market used in user input, callbacks and price maps.
+
+    Spot USDT pairs keep the bare symbol ("BTC"), other quotes are written as
+    "BTC/USDC" and perpetuals get a ".P" suffix ("BTC/USDT.P", "BTC/USD.P").
+    """
+    key = symbol if quote == DEFAULT_QUOTE else f"{symbol}/{quote}"
+    if category != CATEGORY_SPOT:
+        key = f"{symbol}/{quote}{PERPETUAL_SUFFIX}"
+    return key
+
+def parse_market(text: str) -> tuple:
+    """(symbol, quote, category) of a market name like BTC, BTC/USDC, BTC.P or BTC/USD.P; None if invalid."""
+    text = text.strip().upper()
+    category = CATEGORY_SPOT
+    if text.endswith(PERPETUAL_SUFFIX):
+        text = text[:-len(PERPETUAL_SUFFIX)]
+        category = CATEGORY_LINEAR
+    symbol, _, quote = text.partition("/")
+    quote = quote or DEFAULT_QUOTE
+    if category == CATEGORY_LINEAR and quote in CATEGORY_QUOTES[CATEGORY_INVERSE]:
+        category = CATEGORY_INVERSE
+    if not symbol.isalnum() or quote not in CATEGORY_QUOTES[category]:
+        return None
+    return symbol, quote, category
+
+# Синтетические пары из двух рынков: отношение цен (ETH÷BTC) или разница (BTC/USDT.P-BTC)
+PAIR_RATIO = "ratio"
+PAIR_SPREAD = "spread"
+PAIR_OPERATORS = {PAIR_RATIO: "÷", PAIR_SPREAD: "-"}
+# Разделители во вводе пользователя; "/" означает отношение, только если текст не является рынком (ETH/USDC)
+PAIR_SEPARATORS = (("÷", PAIR_RATIO), (":", PAIR_RATIO), ("-", PAIR_SPREAD), ("/", PAIR_RATIO))
+
+def pair_key(market: str, other: str, operation: str = PAIR_RATIO) -> str:
+    """Name of a synthetic pair of two markets, e.g. ETH÷BTC or BTC/USDT.P-BTC."""
+    return f"{market}{PAIR_OPERATORS[operation]}{other}"
+
+def parse_pair(text: str) -> tuple:
+    """(market, other market, operation) of a pair like ETH÷BTC, ETH:BTC, ETH/BTC or BTC.P-BTC; None if not a pair."""
+    text = text.strip().upper()
+    if parse_market(text):
+        return None
+    for separator, operation in PAIR_SEPARATORS:
+        left, _, right = text.rpartition(separator)
+        legs = parse_market(left) if left else None, parse_market(right) if right else None
+        if all(legs):
+            market, other = market_key(*legs[0]), market_key(*legs[1])
+            return (market, other, operation) if market != other else None
+    return None
+
+def pair_value(operation: str, price: float, other_price: float) -> float:
+    """Value of a synthetic pair from the prices of its legs, None if undefined."""
+    if operation == PAIR_SPREAD:
+        return price - other_price
+    return price / other_price if other_price else None
+
+def format_price(market: str, price: float) -> str:
+    """$65,000.00 for a market, 0.0523412 for a pair: ratios and spreads have no currency."""
+    if PAIR_OPERATORS[PAIR_RATIO] in market or PAIR_OPERATORS[PAIR_SPREAD] in market:
+        return f"{price:,.6g}"
+    if 0 < price < 1:
+        # Цены меньше доллара (PEPE, SHIB) - четыре значащие цифры вместо $0.00
+        return f"${price:.{3 - math.floor(math.log10(price))}f}"
+    return f"${price:,.2f}"
+
+def format_window(seconds: int) -> str:
+    """Compact duration for alert windows: 15m, 1h, 1h 30m."""
+    hours, minutes = divmod(int(seconds) // 60, 60)
+    if hours and minutes:
+        return f"{hours}h {minutes}m"
+    return f"{hours}h" if hours else f"{minutes}m"
+
+def format_duration(seconds: float) -> str:
+    """Time left until a snooze end or expiry: 5m, 2h 30m, 6d 23h."""
+    days, rest = divmod(int(seconds), 86400)
+    if not days:
+        return format_window(rest)
+    hours = rest // 3600
+    return f"{days}d {hours}h" if hours else f"{days}d"
+
+def grid_bucket(price: float, step: float) -> int:
+    """Index of the grid cell containing price; the epsilon absorbs float error at exact multiples."""
+    return math.floor(price / step + 1e-9)
+
 class TokenAlert(Base):
     __tablename__ = "token_alerts"
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
-    symbol = Column(String, nullable=False)
+    symbol = Column(String, nullable=False)  # Base asset, e.g. BTC
+    category = Column(String, nullable=False, default=DEFAULT_CATEGORY, server_default=DEFAULT_CATEGORY)  # spot / linear / inverse
+    quote = Column(String, nullable=False, default=DEFAULT_QUOTE, server_default=DEFAULT_QUOTE)
     price_multiplier = Column(Float, nullable=False)
     is_active = Column(Boolean, default=True)
     last_alert_price = Column(Float, nullable=True)
     last_alert_time = Column(Float, nullable=True)  # Unix timestamp of last alert
+    alert_type = Column(String, nullable=False, default=ALERT_TYPE_STEP, server_default=ALERT_TYPE_STEP)
+    threshold = Column(Float, nullable=True)  # Price level of level alerts, % of percent, funding, open interest and spread alerts, $ of depth alerts
+    direction = Column(String, nullable=True)  # above / below for level alerts, breakout side (None = both)
+    rearm = Column(Boolean, default=False)  # Level alerts: fire again after the price returns instead of disabling
+    window_seconds = Column(Integer, nullable=True)  # Time window of percent alerts
+    grid_bucket = Column(Integer, nullable=True)  # Grid alerts: floor(price / price_multiplier) at the last alert
+    # Step, grid and level alerts on a pair: symbol/quote/category are the first leg, pair_symbol the second market
+    pair_symbol = Column(String, nullable=True)
+    pair_operation = Column(String, nullable=True)  # ratio / spread
+    # Против потока уведомлений на пилообразном рынке: пауза после срабатывания и полоса вокруг линии в % цены
+    cooldown_seconds = Column(Integer, nullable=True)  # Hold back notifications for this long after the last one
+    hysteresis = Column(Float, nullable=True)  # Grid lines count as crossed and levels re-arm only this % past the line
+    snoozed_until = Column(Float, nullable=True)  # Unix time when a snoozed (disabled) alert is enabled again
+    expires_at = Column(Float, nullable=True)  # Unix time when the alert is removed
+    last_value = Column(Float, nullable=True)  # Funding and order book alerts: rate %, spread % or depth $ when last seen crossing the threshold
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    # Поиск участников сработавших групп алертов по (symbol, price_multiplier)
+    __table_args__ = (Index("ix_token_alerts_symbol_step", "symbol", "price_multiplier"),)
+
+    @property
+    def market(self) -> str:
+        """Market name, e.g. BTC, BTC/USDC, BTC/USDT.P or the pair ETH÷BTC; key of the alert in price maps."""
+        market = market_key(self.symbol, self.quote or DEFAULT_QUOTE, self.category or DEFAULT_CATEGORY)
+        if self.pair_symbol:
+            return pair_key(market, self.pair_symbol, self.pair_operation or PAIR_RATIO)
+        return market
+
+    @property
+    def is_pair(self) -> bool:
+        return bool(self.pair_symbol)
+
+    @property
+    def legs(self) -> tuple:
+        """Markets whose prices the alert needs: its market, or both legs of a pair."""
+        market = market_key(self.symbol, self.quote or DEFAULT_QUOTE, self.category or DEFAULT_CATEGORY)
+        return (market, self.pair_symbol) if self.pair_symbol else (market,)
+
+    @property
+    def is_level(self) -> bool:
+        return self.alert_type == ALERT_TYPE_LEVEL
+
+    @property
+    def is_percent(self) -> bool:
+        return self.alert_type == ALERT_TYPE_PERCENT
+
+    @property
+    def is_grid(self) -> bool:
+        return self.alert_type == ALERT_TYPE_GRID
+
+    @property
+    def is_funding(self) -> bool:
+        return self.alert_type == ALERT_TYPE_FUNDING
+
+    @property
+    def is_open_interest(self) -> bool:
+        return self.alert_type == ALERT_TYPE_OPEN_INTEREST
+
+    @property
+    def is_breakout(self) -> bool:
+        return self.alert_type == ALERT_TYPE_BREAKOUT
+
+    @property
+    def is_turnover(self) -> bool:
+        return self.alert_type == ALERT_TYPE_TURNOVER
+
+    @property
+    def is_book(self) -> bool:
+        return self.alert_type in (ALERT_TYPE_BOOK_SPREAD, ALERT_TYPE_BOOK_DEPTH)
+
+    def describe(self) -> str:
+        """Short description of the alert condition, e.g. "$1000 step", "above $200", "5% in 1h" or "funding ±0.1%"."""
+        # Значения пар безразмерные
+        unit = "" if self.pair_symbol else "$"
+        if self.is_level:
+            return f"{self.direction} {unit}{self.threshold:g}"
+        if self.is_percent:
+            return f"{self.threshold:g}% in {format_window(self.window_seconds)}"
+        if self.is_funding:
+            return f"funding ±{self.threshold:g}%"
+        if self.is_open_interest:
+            return f"OI {self.threshold:g}% in {format_window(self.window_seconds)}"
+        if self.is_breakout:
+            return {DIRECTION_ABOVE: "new 24h high", DIRECTION_BELOW: "new 24h low"}.get(self.direction, "24h high/low breakout")
+        if self.is_turnover:
+            return f"turnover +{self.threshold:g}% vs {format_window(self.window_seconds)}"
+        if self.alert_type == ALERT_TYPE_BOOK_SPREAD:
+            return f"spread ≥ {self.threshold:g}%"
+        if self.alert_type == ALERT_TYPE_BOOK_DEPTH:
+            return f"top of book < ${self.threshold:,.0f}"
+        if self.is_grid:
+            return f"{unit}{self.price_multiplier:g} grid"
+        return f"{unit}{self.price_multiplier:g} step"
+
     def __repr__(self):
-        return f"<TokenAlert(user_id={self.user_id}, symbol={self.symbol}, price_multiplier={self.price_multiplier}, is_active={self.is_active})>" 
\ No newline at end of file
+        return f"<TokenAlert(user_id={self.user_id}, market={self.market}, type={self.alert_type}, price_multiplier={self.price_multiplier}, is_active={self.is_active})>"
@@ -13,6 +13,10 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     is_blocked = Column(Boolean, default=False)
     is_approved = Column(Boolean, default=False)
+    # Тихие часы: минуты локального дня, уведомления в это время не отправляются
+    quiet_start = Column(Integer, nullable=True)
+    quiet_end = Column(Integer, nullable=True)
+    utc_offset = Column(Integer, default=0)  # Minutes east of UTC
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
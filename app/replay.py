@@ -0,0 +1,165 @@
+"""
+Replay a recorded or CSV price series through the alert engine.
+
+Runs AlertEngine.evaluate, the same code check_price_alerts uses, over every
+snapshot of the series as fast as possible (or at --speed times real time)
+with in-memory alerts, and prints the triggered alerts as JSON lines. The
+output is deterministic, so a saved run can be used as the expected result
+of a later one with --expect.
+
+Alerts are given as SYMBOL:STEP (step alert), SYMBOL#STEP (grid alert),
+SYMBOL>PRICE or SYMBOL<PRICE
+(re-arming level alert), SYMBOL%PERCENT/MINUTES (percent move within a
+window) or loaded from the active alerts in the database with --from-db.
+SYMBOL is a market name as used by the bot: BTC, BTC/USDC, BTC/USDT.P,
+or a pair of two markets: ETH/BTC (ratio), BTC.P-BTC (spread).
+Every step alert starts from the first price it sees.
+
+Usage:
+    python -m app.replay data/prices --alert BTC:1000 --alert ETH:50 --alert "SOL>200" --alert "SOL%5/60"
+    python -m app.replay prices.csv --from-db --output run.jsonl
+    python -m app.replay prices.csv --alert BTC:500 --expect run.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from app.models import TokenAlert, get_session
+from app.models.token_alert import ALERT_TYPE_GRID, ALERT_TYPE_LEVEL, ALERT_TYPE_PERCENT, DIRECTION_ABOVE, DIRECTION_BELOW, parse_market, parse_pair
+from app.services.alert_engine import AlertEngine
+from app.utils.price_history import load_series
+
+def market_fields(market: str) -> dict:
+    pair = parse_pair(market)
+    parsed = parse_market(pair[0] if pair else market)
+    if not parsed:
+        raise ValueError(f"invalid market {market!r}")
+    symbol, quote, category = parsed
+    fields = {"symbol": symbol, "quote": quote, "category": category}
+    if pair:
+        fields.update(pair_symbol=pair[1], pair_operation=pair[2])
+    return fields
+
+def parse_alert(value: str) -> TokenAlert:
+    if "%" in value:
+        market, move = value.split("%", 1)
+        percent, minutes = move.rsplit("/", 1)
+        return TokenAlert(
+            **market_fields(market), alert_type=ALERT_TYPE_PERCENT, threshold=float(percent),
+            window_seconds=int(float(minutes) * 60), price_multiplier=0, user_id=0, is_active=True,
+        )
+    for separator, direction in ((">", DIRECTION_ABOVE), ("<", DIRECTION_BELOW)):
+        if separator in value:
+            market, level = value.split(separator, 1)
+            return TokenAlert(
+                **market_fields(market), alert_type=ALERT_TYPE_LEVEL, threshold=float(level), direction=direction,
+                rearm=True, price_multiplier=0, user_id=0, is_active=True,
+            )
+    if "#" in value:
+        market, step = value.split("#", 1)
+        return TokenAlert(**market_fields(market), alert_type=ALERT_TYPE_GRID, price_multiplier=float(step), user_id=0, is_active=True)
+    market, step = value.rsplit(":", 1)
+    return TokenAlert(**market_fields(market), price_multiplier=float(step), user_id=0, is_active=True)
+
+def load_db_alerts() -> list:
+    """Copies of the active alerts, detached from the database."""
+    session = get_session()
+    try:
+        rows = session.query(TokenAlert).filter(TokenAlert.is_active == True).order_by(TokenAlert.id).all()
+        return [
+            TokenAlert(
+                symbol=row.symbol, quote=row.quote, category=row.category, price_multiplier=row.price_multiplier, user_id=row.user_id, is_active=True,
+                alert_type=row.alert_type, threshold=row.threshold, direction=row.direction, rearm=row.rearm,
+                window_seconds=row.window_seconds, pair_symbol=row.pair_symbol, pair_operation=row.pair_operation,
+                cooldown_seconds=row.cooldown_seconds, hysteresis=row.hysteresis,
+            )
+            for row in rows
+        ]
+    finally:
+        session.close()
+
+def replay(series, alerts: list, speed: float = 0) -> tuple:
+    """Evaluate alerts over the series. Returns (events, stats)."""
+    engine = AlertEngine()
+    # Номер алерта в списке служит стабильным идентификатором событий
+    for index, alert in enumerate(alerts):
+        alert.id = index
+
+    events = []
+    suppressed = Counter()
+    ticks = 0
+    evaluate_seconds = 0.0
+    previous_timestamp = None
+    for timestamp, prices in series:
+        if speed and previous_timestamp is not None:
+            time.sleep(max(0.0, (timestamp - previous_timestamp) / speed))
+        previous_timestamp = timestamp
+
+        start = time.perf_counter()
+        # Сработавшие уровневые алерты без re-arm отключаются, как и в боте
+        triggered = engine.evaluate([alert for alert in alerts if alert.is_active], prices, timestamp)
+        evaluate_seconds += time.perf_counter() - start
+        ticks += 1
+        suppressed.update(engine.suppressed)
+
+        for item in triggered:
+            alert = item["alert"]
+            events.append({
+                "t": timestamp,
+                "alert": alert.id,
+                "symbol": alert.market,
+                "condition": alert.describe(),
+                "price": item["current_price"],
+                "previous": item["previous_price"],
+            })
+
+    evaluations = ticks * len(alerts)
+    stats = {
+        "ticks": ticks,
+        "alerts": len(alerts),
+        "events": len(events),
+        "suppressed": dict(suppressed),
+        "evaluate_seconds": evaluate_seconds,
+        "evaluations_per_second": evaluations / evaluate_seconds if evaluate_seconds else None,
+        "events_per_alert": dict(Counter(f"{event['alert']} {event['symbol']} {event['condition']}" for event in events)),
+    }
+    return events, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("series", help="Recording (.jsonl.gz), directory of recordings or CSV file")
+    parser.add_argument("--alert", action="append", default=[], help="SYMBOL:STEP, SYMBOL#STEP, SYMBOL>LEVEL, SYMBOL<LEVEL or SYMBOL%%PERCENT/MINUTES, may be repeated")
+    parser.add_argument("--from-db", action="store_true", help="Also replay the active alerts from the database")
+    parser.add_argument("--speed", type=float, default=0, help="Replay at this multiple of real time, 0 = as fast as possible")
+    parser.add_argument("--output", help="Write events as JSON lines to this file instead of stdout")
+    parser.add_argument("--expect", help="Compare events with a previous output, exit 1 on difference")
+    args = parser.parse_args()
+
+    alerts = [parse_alert(value) for value in args.alert]
+    if args.from_db:
+        alerts.extend(load_db_alerts())
+    if not alerts:
+        parser.error("no alerts given, use --alert or --from-db")
+
+    events, stats = replay(load_series(args.series), alerts, args.speed)
+    lines = [json.dumps(event, sort_keys=True) for event in events]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write("".join(line + "\n" for line in lines))
+    elif not args.expect:
+        print("\n".join(lines))
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+
+    if args.expect:
+        with open(args.expect) as f:
+            expected = [line.strip() for line in f if line.strip()]
+        if expected != lines:
+            mismatch = next((i for i, (a, b) in enumerate(zip(expected, lines)) if a != b), min(len(expected), len(lines)))
+            print(f"Replay differs from {args.expect} at event {mismatch} ({len(lines)} events, expected {len(expected)})", file=sys.stderr)
+            sys.exit(1)
+        print(f"Replay matches {args.expect}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 from app.services.bybit_service import BybitService
 from app.services.user_service import UserService
 from app.services.token_alert_service import TokenAlertService
+from app.services.message_service import MessageService
+from app.services.broadcast_service import BroadcastService
+from app.services.delivery_service import DeliveryService
+from app.services.market_data import MarketDataService
+from app.services.report_service import ReportService
 
-__all__ = ["BybitService", "UserService", "TokenAlertService"] 
\ No newline at end of file
+__all__ = ["BybitService", "UserService", "TokenAlertService", "MessageService", "BroadcastService", "DeliveryService", "MarketDataService", "ReportService"] 
\ No newline at end of file
@@ -0,0 +1,864 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from loguru import logger
+from app.models.token_alert import ALERT_TYPE_BOOK_SPREAD, ALERT_TYPE_GRID, DIRECTION_ABOVE, DIRECTION_BELOW, grid_bucket, pair_value
+
+class LevelIndex:
+    """
+    Level alerts of one market in two sorted arrays, kept between ticks.
+
+    "up" holds levels reached when the price rises to or above them, "down"
+    levels reached when it falls to or below them. One bisection per array
+    finds every crossed level, so a tick costs O(log n + crossed) per market
+    instead of a comparison per alert. Alerts are inserted and removed with
+    bisect as they are added, change level or side, or stop being active;
+    the arrays are never re-sorted.
+
+    A re-arming alert that already fired waits in the opposite array: an
+    "above" alert is re-armed (silently) once the price is back below its
+    level, and only then can fire again.
+
+    The order book index uses the same arrays for spread and depth thresholds.
+    """
+
+    __slots__ = ("up_levels", "up_ids", "down_levels", "down_ids")
+
+    def __init__(self):
+        self.up_levels = []
+        self.up_ids = []
+        self.down_levels = []
+        self.down_ids = []
+
+    def __len__(self) -> int:
+        return len(self.up_ids) + len(self.down_ids)
+
+    def _arrays(self, up: bool) -> tuple:
+        return (self.up_levels, self.up_ids) if up else (self.down_levels, self.down_ids)
+
+    def add(self, level: float, alert_id: int, up: bool):
+        levels, ids = self._arrays(up)
+        position = bisect_right(levels, level)
+        levels.insert(position, level)
+        ids.insert(position, alert_id)
+
+    def remove(self, level: float, alert_id: int, up: bool):
+        levels, ids = self._arrays(up)
+        position = bisect_left(levels, level)
+        # Одинаковые уровни стоят подряд, ищем среди них нужный алерт
+        while ids[position] != alert_id:
+            position += 1
+        del levels[position]
+        del ids[position]
+
+    def crossed(self, price: float) -> list:
+        """Ids of the alerts whose level is crossed at this price."""
+        return self.up_ids[:bisect_right(self.up_levels, price)] + self.down_ids[bisect_left(self.down_levels, price):]
+
+class SlidingWindow:
+    """
+    Lowest and highest price of one symbol over the last `seconds`.
+
+    Two monotonic deques of (timestamp, price): lows keeps increasing prices,
+    highs decreasing ones, so the window minimum and maximum are always at
+    the front. Each price is appended and removed at most once, which makes
+    push O(1) amortized and reading min/max O(1).
+    """
+
+    __slots__ = ("seconds", "lows", "highs")
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.lows = deque()
+        self.highs = deque()
+
+    def push(self, timestamp: float, price: float):
+        lows, highs = self.lows, self.highs
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+        lows.append((timestamp, price))
+        while highs and highs[-1][1] <= price:
+            highs.pop()
+        highs.append((timestamp, price))
+
+        # Текущая цена только что добавлена, поэтому деки никогда не становятся пустыми
+        cutoff = timestamp - self.seconds
+        while lows[0][0] < cutoff:
+            lows.popleft()
+        while highs[0][0] < cutoff:
+            highs.popleft()
+
+    @property
+    def low(self) -> float:
+        return self.lows[0][1]
+
+    @property
+    def high(self) -> float:
+        return self.highs[0][1]
+
+    def move(self, value: float, threshold: float) -> tuple:
+        """(reference, change in %) if value is threshold % away from the window low or high, else None."""
+        low, high = self.low, self.high
+        rise = (value - low) / low * 100 if low > 0 else 0
+        fall = (high - value) / high * 100 if high > 0 else 0
+
+        if rise >= threshold and rise >= fall:
+            return low, rise
+        if fall >= threshold:
+            return high, -fall
+        return None
+
+class RollingStats:
+    """
+    Per-market statistics kept between ticks in compact parallel arrays.
+
+    Every key (a market, or a market and a window) gets a slot number and
+    each field is an array('d') indexed by slot, so thousands of tracked
+    markets cost a few machine words each instead of a Python object per
+    market. A new slot starts with NaN in every field.
+    """
+
+    __slots__ = ("slots", "columns", "size")
+
+    def __init__(self, *fields):
+        self.slots = {}  # key -> slot index
+        self.columns = {field: array("d") for field in fields}
+        self.size = 0  # slots allocated in the arrays, including freed ones
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def slot(self, key) -> tuple:
+        """(slot index, created) for the key, adding a slot if the key is new."""
+        index = self.slots.get(key)
+        if index is not None:
+            return index, False
+        index = self.slots[key] = self.size
+        self.size += 1
+        for column in self.columns.values():
+            column.append(math.nan)
+        return index, True
+
+    def retain(self, keys):
+        """
+        Forget the keys not in keys at once, so a key that comes back starts over from NaN.
+
+        Freed slots stay in the arrays until most of them are unused, then
+        the arrays are compacted.
+        """
+        for key in self.slots.keys() - keys:
+            del self.slots[key]
+        if self.size <= 2 * len(self.slots) + 64:
+            return
+        kept = list(self.slots.items())
+        self.slots = {key: new for new, (key, _) in enumerate(kept)}
+        self.size = len(kept)
+        for field, column in self.columns.items():
+            self.columns[field] = array("d", (column[index] for _, index in kept))
+
+class PairIndex:
+    """
+    Values of synthetic pairs (ETH÷BTC, BTC/USDT.P-BTC) kept between ticks.
+
+    A dependency index maps every leg market to the pairs computed from it,
+    so a tick recomputes only the pairs with a leg whose price changed; the
+    others keep their previous value. Pairs are registered from the alerts
+    of each tick and dropped when no alert uses them anymore.
+    """
+
+    __slots__ = ("pairs", "dependents", "leg_prices", "values")
+
+    def __init__(self):
+        self.pairs = {}  # pair market -> (market, other market, operation)
+        self.dependents = defaultdict(set)  # leg market -> pair markets
+        self.leg_prices = {}  # leg market -> price the pair values were computed from
+        self.values = {}  # pair market -> value
+
+    def sync(self, alerts: list):
+        """Register the pairs of these alerts and forget pairs without alerts."""
+        needed = {alert.market: (*alert.legs, alert.pair_operation) for alert in alerts}
+        for pair in self.pairs.keys() - needed.keys():
+            for leg in self.pairs.pop(pair)[:2]:
+                self.dependents[leg].discard(pair)
+                if not self.dependents[leg]:
+                    del self.dependents[leg]
+                    self.leg_prices.pop(leg, None)
+            self.values.pop(pair, None)
+        for pair in needed.keys() - self.pairs.keys():
+            self.pairs[pair] = needed[pair]
+            for leg in needed[pair][:2]:
+                self.dependents[leg].add(pair)
+                # Новая пара пересчитывается на этом же тике
+                self.leg_prices.pop(leg, None)
+
+    def update(self, prices: dict) -> dict:
+        """Recompute the pairs whose legs changed price; returns the values of all pairs."""
+        dirty = set()
+        for leg, pairs in self.dependents.items():
+            price = prices.get(leg)
+            if price != self.leg_prices.get(leg):
+                self.leg_prices[leg] = price
+                dirty |= pairs
+
+        for pair in dirty:
+            market, other, operation = self.pairs[pair]
+            price, other_price = prices.get(market), prices.get(other)
+            value = pair_value(operation, price, other_price) if price is not None and other_price is not None else None
+            if value is None:
+                self.values.pop(pair, None)
+            else:
+                self.values[pair] = value
+        return self.values
+
+class AlertGroup:
+    """
+    Step or grid alerts with identical configuration and state.
+
+    Step alerts sharing (market, price_multiplier, last_alert_price) and grid
+    alerts sharing (market, price_multiplier, grid_bucket) always reach the
+    same decision, so check_price_alerts loads them as one group per key and
+    the engine evaluates the group like a single alert. Once a group fires,
+    all its members get the same new state and stay in one group.
+
+    Exposes the TokenAlert attributes the engine reads and updates; `key`
+    keeps the state the group was loaded with, to find its members again.
+    """
+
+    __slots__ = ("alert_type", "market", "price_multiplier", "last_alert_price", "grid_bucket", "last_alert_time", "size", "key")
+
+    # Группы бывают только у шаговых и сеточных алертов
+    is_level = False
+    is_percent = False
+    is_funding = False
+    is_open_interest = False
+    is_breakout = False
+    is_turnover = False
+    is_book = False
+    is_pair = False
+    # Алерты с cooldown или гистерезисом в группы не попадают
+    cooldown_seconds = None
+    hysteresis = None
+
+    def __init__(self, alert_type: str, market: str, price_multiplier: float, last_alert_price: float, grid_bucket: int, size: int):
+        self.alert_type = alert_type
+        self.market = market
+        self.price_multiplier = price_multiplier
+        self.last_alert_price = last_alert_price
+        self.grid_bucket = grid_bucket
+        self.last_alert_time = None
+        self.size = size
+        self.key = (alert_type, market, price_multiplier, last_alert_price, grid_bucket)
+
+    @property
+    def is_grid(self) -> bool:
+        return self.alert_type == ALERT_TYPE_GRID
+
+    @property
+    def user_id(self) -> str:
+        # Для отладочных логов движка, которые выводят владельца алерта
+        return f"group of {self.size}"
+
+    @property
+    def legs(self) -> tuple:
+        return (self.market,)
+
+    @property
+    def changed(self) -> bool:
+        """State differs from the one loaded, e.g. after the first price was seen."""
+        return (self.last_alert_price, self.grid_bucket) != self.key[3:]
+
+class AlertEngine:
+    """
+    Evaluates alerts against one price snapshot.
+
+    Pure in-memory logic shared by check_price_alerts and the replay tool:
+    no database or network access. Triggered alerts get last_alert_price and
+    last_alert_time updated in place; persisting them is up to the caller.
+    Prices are keyed by market name (TokenAlert.market), so the spot pair
+    and the perpetual of a symbol are evaluated separately.
+
+    The engine keeps state between calls (the level and order book indexes, and the sliding
+    windows of percent and open interest alerts), so evaluate must be called
+    once per price snapshot. Funding, open interest, breakout, turnover and order book
+    alerts read the other fields of the cycle's tickers and are skipped when only prices are
+    given (replay). Alerts on pairs (ETH÷BTC) see the pair value as their
+    price, computed from the prices of both legs.
+    """
+
+    def __init__(self):
+        self.levels = {}  # market -> LevelIndex
+        self.level_positions = {}  # alert id -> (market, level, up array, armed)
+        self.books = {}  # (market, spread?) -> LevelIndex of order book thresholds
+        self.book_positions = {}  # alert id -> ((market, spread?), threshold, up array, armed)
+        self.windows = {}  # (market, seconds) -> SlidingWindow
+        self.open_interest_windows = {}  # (market, seconds) -> SlidingWindow of open interest values
+        self.breakout_stats = RollingStats("price", "high", "low")  # market -> previous tick
+        self.turnover_stats = RollingStats("baseline", "updated")  # (market, seconds) -> turnover average
+        self.pairs = PairIndex()
+        self.suppressed = defaultdict(int)  # reason -> notifications held back in the last evaluate call
+
+    @staticmethod
+    def should_alert(current_price: float, last_alert_price: float, price_multiplier: float) -> bool:
+        """Determine if an alert should be triggered."""
+        if last_alert_price is None:
+            return True
+
+        # Определяем абсолютную разницу между текущей и последней ценой алерта
+        price_diff = abs(current_price - last_alert_price)
+
+        # Алерт срабатывает только если изменение цены больше или равно заданному порогу
+        return price_diff >= price_multiplier
+
+    def cooling_down(self, alert, now: float) -> bool:
+        """
+        True if the alert fired less than its cooldown_seconds ago; counts the suppressed notification.
+
+        A suppressed alert keeps its state, so it fires after the cooldown if
+        its condition still holds then, with the move since the last alert.
+        """
+        if not alert.cooldown_seconds or not alert.last_alert_time or now - alert.last_alert_time >= alert.cooldown_seconds:
+            return False
+        self.suppressed["cooldown"] += 1
+        return True
+
+    @staticmethod
+    def within_band(price: float, line: float, hysteresis: float) -> bool:
+        """True if the price is closer to the line than hysteresis % of it."""
+        return bool(hysteresis) and abs(price - line) < abs(line) * hysteresis / 100
+
+    @staticmethod
+    def _trigger(kind: str, alert, current_price: float, now: float) -> dict:
+        item = {
+            "kind": kind,
+            "alert": alert,
+            "current_price": current_price,
+            "previous_price": alert.last_alert_price,
+            "old_alert_time": alert.last_alert_time,  # Сохраняем старое время ДО обновления
+        }
+        # ВАЖНО: обновляем last_alert_price и last_alert_time ТОЛЬКО при отправке уведомления
+        alert.last_alert_price = current_price
+        alert.last_alert_time = now
+        return item
+
+    def evaluate(self, alerts: list, prices: dict, now: float, debug: bool = False, tickers: dict = None) -> list:
+        """Return trigger dicts for the alerts whose condition is met at these prices (and tickers, keyed by market)."""
+        self.suppressed = defaultdict(int)
+        pair_alerts = [alert for alert in alerts if alert.is_pair]
+        self.pairs.sync(pair_alerts)
+        if pair_alerts:
+            # Значения пар ищутся в той же карте цен, что и рынки
+            prices = {**prices, **self.pairs.update(prices)}
+
+        triggered = []
+        level_alerts = []
+        percent_alerts = []
+        grid_alerts = []
+        funding_alerts = []
+        open_interest_alerts = []
+        breakout_alerts = []
+        turnover_alerts = []
+        book_alerts = []
+        for alert in alerts:
+            current_price = prices.get(alert.market)
+            if current_price is None:
+                continue
+
+            if alert.is_grid:
+                grid_alerts.append(alert)
+                continue
+            if alert.is_level:
+                level_alerts.append(alert)
+                continue
+            if alert.is_percent:
+                percent_alerts.append(alert)
+                continue
+            if alert.is_funding:
+                funding_alerts.append(alert)
+                continue
+            if alert.is_open_interest:
+                open_interest_alerts.append(alert)
+                continue
+            if alert.is_breakout:
+                breakout_alerts.append(alert)
+                continue
+            if alert.is_turnover:
+                turnover_alerts.append(alert)
+                continue
+            if alert.is_book:
+                book_alerts.append(alert)
+                continue
+
+            previous_price = alert.last_alert_price  # Запоминаем предыдущую цену
+
+            if previous_price is None:
+                # Если предыдущей цены нет, устанавливаем текущую и пропускаем
+                alert.last_alert_price = current_price
+                continue
+
+            if debug:
+                price_diff = abs(current_price - previous_price)
+                logger.debug(f"Checking alert for {alert.market} (user: {alert.user_id}): current=${current_price:,.2f}, prev=${previous_price:,.2f}, diff=${price_diff:,.2f}, step=${alert.price_multiplier:g}")
+
+            if not self.should_alert(current_price, previous_price, alert.price_multiplier):
+                continue
+
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Alert condition triggered for {alert.market}: price change (${price_diff:,.2f}) >= step (${alert.price_multiplier:g})")
+
+            triggered.append(self._trigger("step", alert, current_price, now))
+
+        if grid_alerts:
+            triggered.extend(self.evaluate_grid(grid_alerts, prices, now, debug))
+        # Вызываем и без уровневых и процентных алертов, чтобы освободить индекс и ненужные окна
+        triggered.extend(self.evaluate_levels(level_alerts, prices, now, debug))
+        triggered.extend(self.evaluate_percent(percent_alerts, prices, now, debug))
+        if tickers is not None:
+            triggered.extend(self.evaluate_funding(funding_alerts, tickers, now, debug))
+            triggered.extend(self.evaluate_open_interest(open_interest_alerts, tickers, now, debug))
+            triggered.extend(self.evaluate_breakouts(breakout_alerts, tickers, now, debug))
+            triggered.extend(self.evaluate_turnover(turnover_alerts, tickers, now, debug))
+            triggered.extend(self.evaluate_book(book_alerts, tickers, now, debug))
+        if pair_alerts:
+            for item in triggered:
+                if item["alert"].is_pair:
+                    item["leg_prices"] = tuple(prices[leg] for leg in item["alert"].legs)
+
+        return triggered
+
+    def evaluate_grid(self, alerts: list, prices: dict, now: float, debug: bool = False) -> list:
+        """
+        Fire grid alerts whose price left the grid cell of their last alert.
+
+        The cell index floor(price / step) is computed once per (market, step)
+        and shared by all subscribers of that grid; each alert then costs a
+        single integer comparison. With a hysteresis band the price has to get
+        hysteresis % past the crossed line before the alert moves to the new
+        cell, so a price chopping around a line fires once.
+        """
+        triggered = []
+        buckets = {}
+        for alert in alerts:
+            key = (alert.market, alert.price_multiplier)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = grid_bucket(prices[alert.market], alert.price_multiplier)
+
+            if alert.grid_bucket == bucket:
+                continue
+            if alert.grid_bucket is None:
+                # Первая цена для алерта: запоминаем ячейку без уведомления
+                alert.grid_bucket = bucket
+                alert.last_alert_price = prices[alert.market]
+                continue
+
+            price = prices[alert.market]
+            # Пересечённая линия сетки: нижняя граница новой ячейки при росте, верхняя при падении
+            crossed = (bucket if bucket > alert.grid_bucket else bucket + 1) * alert.price_multiplier
+            # Гистерезис: цена, колеблющаяся у линии, не считается пересечением, пока не отойдёт на полосу
+            if self.within_band(price, crossed, alert.hysteresis):
+                self.suppressed["hysteresis"] += 1
+                continue
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Grid alert triggered for {alert.market} (user: {alert.user_id}): cell {alert.grid_bucket} -> {bucket}, crossed ${crossed:g}")
+
+            item = self._trigger("grid", alert, price, now)
+            item["crossed_level"] = crossed
+            alert.grid_bucket = bucket
+            triggered.append(item)
+
+        return triggered
+
+    @staticmethod
+    def level_position(alert) -> tuple:
+        """(market, level, up array, armed) of a level alert in the level index."""
+        above = alert.direction == DIRECTION_ABOVE
+        last = alert.last_alert_price
+        # Алерт "взведён", пока последняя цена по нужную сторону от уровня
+        armed = last is None or (last < alert.threshold if above else last > alert.threshold)
+        return (alert.market, alert.threshold, armed == above, armed)
+
+    @staticmethod
+    def _place(indexes: dict, positions: dict, alert_id: int, position: tuple = None):
+        """Move an alert to a new position in a LevelIndex per key (market), or remove it when position is None."""
+        old = positions.pop(alert_id, None)
+        if old is not None:
+            index = indexes[old[0]]
+            index.remove(old[1], alert_id, old[2])
+            if not index:
+                del indexes[old[0]]
+        if position is not None:
+            positions[alert_id] = position
+            indexes.setdefault(position[0], LevelIndex()).add(position[1], alert_id, position[2])
+
+    @classmethod
+    def _sync(cls, alerts: list, indexes: dict, positions: dict, position_of) -> dict:
+        """
+        Bring an index in line with the alerts of this tick. Returns them by id.
+
+        Only alerts new to the index are placed and only alerts gone from the
+        list (disabled, snoozed, removed) are taken out, so a tick doesn't read
+        the threshold of alerts already indexed.
+        """
+        by_id = {alert.id: alert for alert in alerts}
+        for alert_id in by_id.keys() - positions.keys():
+            cls._place(indexes, positions, alert_id, position_of(by_id[alert_id]))
+        for alert_id in positions.keys() - by_id.keys():
+            cls._place(indexes, positions, alert_id)
+        return by_id
+
+    def place_level(self, alert_id: int, position: tuple = None):
+        """Move an alert to a new position in the level index, or remove it when position is None."""
+        self._place(self.levels, self.level_positions, alert_id, position)
+
+    def forget_level(self, alert_id: int = None):
+        """
+        Drop an alert (all alerts when None) from the level and order book indexes; it is placed again from its row on the next tick.
+
+        Called when a level or last price is changed outside the engine, e.g.
+        the user moves the level or adds it again, or when the engine's
+        changes were not saved.
+        """
+        if alert_id is None:
+            self.levels.clear()
+            self.level_positions.clear()
+            self.books.clear()
+            self.book_positions.clear()
+        else:
+            self.place_level(alert_id)
+            self._place(self.books, self.book_positions, alert_id)
+
+    def sync_levels(self, alerts: list) -> dict:
+        """Bring the level index in line with the active level alerts of this tick. Returns them by id."""
+        return self._sync(alerts, self.levels, self.level_positions, self.level_position)
+
+    def evaluate_levels(self, alerts: list, prices: dict, now: float, debug: bool = False) -> list:
+        """Fire level alerts crossed at these prices; auto-disable or re-arm them."""
+        by_id = self.sync_levels(alerts)
+        triggered = []
+        for market in list(self.levels):
+            price = prices.get(market)
+            if price is None:
+                continue
+            for alert_id in self.levels[market].crossed(price):
+                alert = by_id[alert_id]
+                if not self.level_positions[alert_id][3]:
+                    # Цена вернулась за уровень: алерт снова взведён, без уведомления.
+                    # С гистерезисом - только когда цена отошла от уровня на полосу
+                    if not self.within_band(price, alert.threshold, alert.hysteresis):
+                        alert.last_alert_price = price
+                        self.place_level(alert_id, self.level_position(alert))
+                    continue
+
+                if self.cooling_down(alert, now):
+                    continue
+
+                if debug:
+                    logger.debug(f"Level alert triggered for {market} (user: {alert.user_id}): ${price:,.2f} {alert.direction} ${alert.threshold:g}")
+
+                triggered.append(self._trigger("level", alert, price, now))
+                if not alert.rearm:
+                    alert.is_active = False
+                self.place_level(alert_id, self.level_position(alert) if alert.rearm else None)
+
+        return triggered
+
+    def update_windows(self, alerts: list, prices: dict, now: float, windows: dict = None):
+        """Push this tick's values (prices by default) into the windows the alerts use and drop unused windows."""
+        if windows is None:
+            windows = self.windows
+        needed = {(alert.market, alert.window_seconds) for alert in alerts}
+        for key in windows.keys() - needed:
+            del windows[key]
+        for key in needed:
+            window = windows.get(key)
+            if window is None:
+                window = windows[key] = SlidingWindow(key[1])
+            window.push(now, prices[key[0]])
+
+    def evaluate_percent(self, alerts: list, prices: dict, now: float, debug: bool = False) -> list:
+        """Fire alerts whose symbol moved at least threshold % within their window."""
+        self.update_windows(alerts, prices, now)
+
+        triggered = []
+        for alert in alerts:
+            # После срабатывания ждём целое окно, чтобы то же движение не сработало повторно
+            if alert.last_alert_time and now - alert.last_alert_time < alert.window_seconds:
+                continue
+
+            price = prices[alert.market]
+            move = self.windows[(alert.market, alert.window_seconds)].move(price, alert.threshold)
+            if move is None:
+                continue
+            reference, change = move
+
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Percent alert triggered for {alert.market} (user: {alert.user_id}): {change:+.2f}% from ${reference:,.2f} within {alert.window_seconds}s")
+
+            item = self._trigger("percent", alert, price, now)
+            item["reference_price"] = reference
+            item["change_pct"] = change
+            triggered.append(item)
+
+        return triggered
+
+    def evaluate_funding(self, alerts: list, tickers: dict, now: float, debug: bool = False) -> list:
+        """
+        Fire funding alerts whose absolute funding rate reached the threshold.
+
+        Works like a re-arming level on |rate|: last_value keeps the rate
+        (in %) of the last crossing, so an alert fires once when the rate gets
+        extreme and again only after it has been back below the threshold.
+        """
+        triggered = []
+        for alert in alerts:
+            ticker = tickers.get(alert.market)
+            if ticker is None or ticker.funding_rate is None:
+                continue
+
+            rate = ticker.funding_rate * 100
+            last = alert.last_value
+            fired = last is not None and abs(last) >= alert.threshold
+            if abs(rate) < alert.threshold:
+                if fired:
+                    # Ставка вернулась в норму: алерт снова взведён, без уведомления
+                    alert.last_value = rate
+                continue
+            if fired:
+                continue
+
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Funding alert triggered for {alert.market} (user: {alert.user_id}): {rate:+.4f}% >= ±{alert.threshold:g}%")
+
+            item = self._trigger("funding", alert, ticker.last_price, now)
+            item["funding_rate"] = rate
+            item["next_funding_time"] = ticker.next_funding_time
+            alert.last_value = rate
+            triggered.append(item)
+
+        return triggered
+
+    def evaluate_open_interest(self, alerts: list, tickers: dict, now: float, debug: bool = False) -> list:
+        """Fire alerts whose open interest value moved at least threshold % within their window."""
+        values = {market: ticker.open_interest_value for market, ticker in tickers.items() if ticker.open_interest_value}
+        alerts = [alert for alert in alerts if alert.market in values]
+        self.update_windows(alerts, values, now, self.open_interest_windows)
+
+        triggered = []
+        for alert in alerts:
+            # Как и у процентных алертов, после срабатывания ждём целое окно
+            if alert.last_alert_time and now - alert.last_alert_time < alert.window_seconds:
+                continue
+
+            value = values[alert.market]
+            move = self.open_interest_windows[(alert.market, alert.window_seconds)].move(value, alert.threshold)
+            if move is None:
+                continue
+            reference, change = move
+
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Open interest alert triggered for {alert.market} (user: {alert.user_id}): {change:+.2f}% from ${reference:,.0f} within {alert.window_seconds}s")
+
+            item = self._trigger("open_interest", alert, tickers[alert.market].last_price, now)
+            item["open_interest_value"] = value
+            item["reference_value"] = reference
+            item["change_pct"] = change
+            triggered.append(item)
+
+        return triggered
+
+    def evaluate_breakouts(self, alerts: list, tickers: dict, now: float, debug: bool = False) -> list:
+        """
+        Fire alerts whose market broke its 24h high or low on this tick.
+
+        A breakout is a price above the 24h high (below the low) of the
+        previous tick while the previous price was still under it, so a
+        market that keeps printing new highs fires once per run instead of
+        every tick. Markets are checked once per tick in one pass over the
+        breakout statistics; the first tick of a market only records it.
+        """
+        stats = self.breakout_stats
+        # Рынок без данных на этом тике теряет статистику: иначе по возвращении он сравнится со старыми ценами
+        markets = {
+            alert.market for alert in alerts
+            if alert.market in tickers and tickers[alert.market].high_24h is not None and tickers[alert.market].low_24h is not None
+        }
+        stats.retain(markets)
+        prices, highs, lows = stats.columns["price"], stats.columns["high"], stats.columns["low"]
+
+        breakouts = {}  # market -> (direction, broken level)
+        for market in markets:
+            ticker = tickers[market]
+            index, created = stats.slot(market)
+            price, previous_price, previous_high, previous_low = ticker.last_price, prices[index], highs[index], lows[index]
+            # Сравнения с NaN ложны, поэтому новая запись ничего не пробивает
+            if not created:
+                if price > previous_high > previous_price:
+                    breakouts[market] = (DIRECTION_ABOVE, previous_high)
+                elif price < previous_low < previous_price:
+                    breakouts[market] = (DIRECTION_BELOW, previous_low)
+            prices[index], highs[index], lows[index] = price, ticker.high_24h, ticker.low_24h
+
+        triggered = []
+        if not breakouts:
+            return triggered
+        for alert in alerts:
+            breakout = breakouts.get(alert.market)
+            if breakout is None or alert.direction not in (None, breakout[0]):
+                continue
+            direction, level = breakout
+
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Breakout alert triggered for {alert.market} (user: {alert.user_id}): {direction} 24h level ${level:,.2f}")
+
+            ticker = tickers[alert.market]
+            item = self._trigger("breakout", alert, ticker.last_price, now)
+            item["direction"] = direction
+            item["level"] = level
+            item["high_24h"] = ticker.high_24h
+            item["low_24h"] = ticker.low_24h
+            triggered.append(item)
+
+        return triggered
+
+    def evaluate_turnover(self, alerts: list, tickers: dict, now: float, debug: bool = False) -> list:
+        """
+        Fire alerts whose 24h turnover rose threshold % above its baseline.
+
+        The baseline is an exponential moving average of the market's 24h
+        turnover with a time constant of the alert window, updated after the
+        comparison so a spike is measured against the turnover before it.
+        Alerts with the same market and window share one baseline; a new
+        baseline starts at the current turnover.
+        """
+        stats = self.turnover_stats
+        keys = {
+            (alert.market, alert.window_seconds) for alert in alerts
+            if alert.market in tickers and tickers[alert.market].turnover_24h is not None
+        }
+        stats.retain(keys)
+        baselines, updated = stats.columns["baseline"], stats.columns["updated"]
+
+        changes = {}  # (market, seconds) -> (baseline, change in %)
+        for key in keys:
+            turnover = tickers[key[0]].turnover_24h
+            index, created = stats.slot(key)
+            if created:
+                baselines[index], updated[index] = turnover, now
+                continue
+
+            baseline = baselines[index]
+            if baseline > 0:
+                changes[key] = (baseline, (turnover - baseline) / baseline * 100)
+            weight = 1 - math.exp(-max(0.0, now - updated[index]) / key[1])
+            baselines[index] = baseline + weight * (turnover - baseline)
+            updated[index] = now
+
+        triggered = []
+        for alert in alerts:
+            change = changes.get((alert.market, alert.window_seconds))
+            if change is None or change[1] < alert.threshold:
+                continue
+            # После срабатывания ждём целое окно, пока базовый оборот догонит всплеск
+            if alert.last_alert_time and now - alert.last_alert_time < alert.window_seconds:
+                continue
+            baseline, change_pct = change
+
+            if self.cooling_down(alert, now):
+                continue
+
+            if debug:
+                logger.debug(f"Turnover alert triggered for {alert.market} (user: {alert.user_id}): {change_pct:+.1f}% vs baseline ${baseline:,.0f}")
+
+            ticker = tickers[alert.market]
+            item = self._trigger("turnover", alert, ticker.last_price, now)
+            item["turnover_24h"] = ticker.turnover_24h
+            item["baseline"] = baseline
+            item["change_pct"] = change_pct
+            triggered.append(item)
+
+        return triggered
+
+    @staticmethod
+    def book_position(alert) -> tuple:
+        """((market, spread?), threshold, up array, armed) of an order book alert in the book index."""
+        is_spread = alert.alert_type == ALERT_TYPE_BOOK_SPREAD
+        last = alert.last_value
+        # Алерт "взведён", пока последнее значение по хорошую сторону от порога
+        armed = last is None or (last < alert.threshold if is_spread else last >= alert.threshold)
+        # Спред срабатывает при росте до порога, глубина - при падении под него
+        return ((alert.market, is_spread), alert.threshold, armed == is_spread, armed)
+
+    def evaluate_book(self, alerts: list, tickers: dict, now: float, debug: bool = False) -> list:
+        """
+        Fire spread alerts whose bid/ask spread widened to the threshold and
+        depth alerts whose top of book thinned below it.
+
+        Thresholds are kept between ticks in a LevelIndex per market and
+        metric, like the level index, so one bisection per array finds the
+        alerts whose side of the threshold changed and the other alerts of the
+        market cost nothing. Like funding alerts, last_value keeps the value
+        of the last crossing: an alert fires once when the book gets bad and
+        re-arms silently when it recovers.
+        """
+        by_id = self._sync(alerts, self.books, self.book_positions, self.book_position)
+        triggered = []
+        for key in list(self.books):
+            market, is_spread = key
+            ticker = tickers.get(market)
+            if ticker is None:
+                continue
+            value = ticker.spread_pct if is_spread else ticker.top_depth
+            if value is None:
+                continue
+
+            for alert_id in self.books[key].crossed(value):
+                alert = by_id[alert_id]
+                armed = self.book_positions[alert_id][3]
+                bad = value >= alert.threshold if is_spread else value < alert.threshold
+                if bad != armed:
+                    # Значение ровно на пороге: индекс включает границу с обеих сторон
+                    continue
+                if not armed:
+                    # Стакан восстановился: алерт снова взведён, без уведомления
+                    alert.last_value = value
+                    self._place(self.books, self.book_positions, alert_id, self.book_position(alert))
+                    continue
+
+                if self.cooling_down(alert, now):
+                    continue
+
+                if debug:
+                    logger.debug(f"Order book alert triggered for {market} (user: {alert.user_id}): {'spread' if is_spread else 'depth'} {value:g} vs {alert.threshold:g}")
+
+                item = self._trigger("book", alert, ticker.last_price, now)
+                item["spread_pct"] = ticker.spread_pct
+                item["depth"] = ticker.top_depth
+                item["bid_price"] = ticker.bid_price
+                item["ask_price"] = ticker.ask_price
+                alert.last_value = value
+                self._place(self.books, self.book_positions, alert_id, self.book_position(alert))
+                triggered.append(item)
+
+        return triggered
+
+# Экземпляр, используемый ботом; replay создаёт собственные
+alert_engine = AlertEngine()
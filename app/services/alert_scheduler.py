@@ -0,0 +1,173 @@
+"""
+Timed alert state: the end of a snooze, alert expiry, users' quiet hours and
+scheduled price reports.
+
+Instead of querying the database for due timestamps every cycle, the bot keeps
+the upcoming events in one heap ordered by due time. A tick pops only the
+events that are due, so a tick with nothing due is a single comparison with the
+top of the heap. Events are loaded from the database at startup and scheduled
+when a user snoozes an alert, sets an expiry, changes quiet hours or
+subscribes to reports.
+
+Rescheduling or cancelling doesn't search the heap: the latest due time of
+every event is kept in `due`, and a popped entry that doesn't match it is
+stale and skipped.
+"""
+import heapq
+import time
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import get_session, ReportSubscription, TokenAlert, User
+
+EVENT_UNSNOOZE = "unsnooze"  # Snooze ended: enable the alert again
+EVENT_EXPIRE = "expire"      # Alert reached its expiry: remove it
+EVENT_QUIET = "quiet"        # User's quiet hours started or ended
+EVENT_REPORT = "report"      # User's price report is due, sent by ReportService
+
+DAY_SECONDS = 86400
+
+def in_quiet_hours(now: float, start: int, end: int, utc_offset: int = 0) -> bool:
+    """Whether unix time now falls into quiet hours from start to end minute of the user's local day."""
+    minute = int((now + utc_offset * 60) % DAY_SECONDS // 60)
+    if start <= end:
+        return start <= minute < end
+    # Окно через полночь, например 23:00-07:00
+    return minute >= start or minute < end
+
+def next_local_time(now: float, minute: int, utc_offset: int = 0) -> float:
+    """Unix time of the next occurrence of a minute of the user's local day after now."""
+    second = (now + utc_offset * 60) % DAY_SECONDS
+    return now + ((minute * 60 - second) % DAY_SECONDS or DAY_SECONDS)
+
+def next_quiet_boundary(now: float, start: int, end: int, utc_offset: int = 0) -> float:
+    """Unix time of the next start or end of quiet hours after now."""
+    return min(next_local_time(now, start, utc_offset), next_local_time(now, end, utc_offset))
+
+class AlertScheduler:
+    def __init__(self):
+        self.heap = []  # (due, event, key)
+        self.due = {}  # (event, key) -> due time of the current entry
+        self.quiet_hours = {}  # user_id -> (start minute, end minute, UTC offset in minutes)
+        self.quiet_users = set()
+        self.due_reports = set()  # user_id of reports due, taken by ReportService
+
+    def schedule(self, event: str, key: int, due: float):
+        """Run event for key (alert or user id) at unix time due, replacing an earlier schedule."""
+        self.due[(event, key)] = due
+        heapq.heappush(self.heap, (due, event, key))
+
+    def cancel(self, event: str, key: int):
+        """Drop a scheduled event; its heap entry is skipped when popped."""
+        self.due.pop((event, key), None)
+
+    def pop_due(self, now: float) -> list:
+        """(event, key) of the events due at now, in due order."""
+        events = []
+        while self.heap and self.heap[0][0] <= now:
+            due, event, key = heapq.heappop(self.heap)
+            if self.due.get((event, key)) != due:
+                continue
+            del self.due[(event, key)]
+            events.append((event, key))
+        return events
+
+    def set_quiet_hours(self, user_id: int, start: int = None, end: int = None, utc_offset: int = 0, now: float = None):
+        """Start tracking quiet hours of a user, or stop it when start is None."""
+        now = time.time() if now is None else now
+        if start is None or end is None or start == end:
+            self.quiet_hours.pop(user_id, None)
+            self.quiet_users.discard(user_id)
+            self.cancel(EVENT_QUIET, user_id)
+            return
+
+        self.quiet_hours[user_id] = (start, end, utc_offset or 0)
+        self._update_quiet(user_id, now)
+
+    def _update_quiet(self, user_id: int, now: float):
+        start, end, utc_offset = self.quiet_hours[user_id]
+        if in_quiet_hours(now, start, end, utc_offset):
+            self.quiet_users.add(user_id)
+        else:
+            self.quiet_users.discard(user_id)
+        self.schedule(EVENT_QUIET, user_id, next_quiet_boundary(now, start, end, utc_offset))
+
+    def is_quiet(self, user_id: int) -> bool:
+        return user_id in self.quiet_users
+
+    def take_reports(self) -> set:
+        """User ids whose reports came due since the last call."""
+        reports, self.due_reports = self.due_reports, set()
+        return reports
+
+    def load(self, now: float = None) -> int:
+        """Schedule snooze ends, expiries, quiet hours and reports stored in the database. Returns the number of events."""
+        now = time.time() if now is None else now
+        session = get_session()
+        try:
+            alerts = session.query(TokenAlert.id, TokenAlert.snoozed_until, TokenAlert.expires_at).filter(
+                (TokenAlert.snoozed_until != None) | (TokenAlert.expires_at != None)
+            ).all()
+            users = session.query(User.user_id, User.quiet_start, User.quiet_end, User.utc_offset).filter(
+                User.quiet_start != None, User.quiet_end != None
+            ).all()
+            reports = session.query(ReportSubscription.user_id, ReportSubscription.next_run_at).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error loading scheduled alert events: {e}")
+            return 0
+        finally:
+            session.close()
+
+        # Просроченные за время простоя события выполнятся на первом тике
+        for alert_id, snoozed_until, expires_at in alerts:
+            if snoozed_until:
+                self.schedule(EVENT_UNSNOOZE, alert_id, snoozed_until)
+            if expires_at:
+                self.schedule(EVENT_EXPIRE, alert_id, expires_at)
+        for user_id, start, end, utc_offset in users:
+            self.set_quiet_hours(user_id, start, end, utc_offset, now)
+        for user_id, next_run_at in reports:
+            self.schedule(EVENT_REPORT, user_id, next_run_at)
+
+        logger.info(f"Scheduled {len(self.due)} alert events ({len(self.quiet_users)} users in quiet hours)")
+        return len(self.due)
+
+    def tick(self, now: float = None) -> int:
+        """Apply the events due at now. Returns the number applied."""
+        now = time.time() if now is None else now
+        events = self.pop_due(now)
+        if not events:
+            return 0
+
+        unsnooze = [key for event, key in events if event == EVENT_UNSNOOZE]
+        expire = [key for event, key in events if event == EVENT_EXPIRE]
+        for event, key in events:
+            if event == EVENT_QUIET and key in self.quiet_hours:
+                self._update_quiet(key, now)
+            elif event == EVENT_REPORT:
+                self.due_reports.add(key)
+
+        if unsnooze or expire:
+            self._apply(unsnooze, expire, now)
+        return len(events)
+
+    def _apply(self, unsnooze: list, expire: list, now: float):
+        session = get_session()
+        try:
+            # Условие по времени защищает от изменений, сделанных после планирования
+            if unsnooze:
+                session.query(TokenAlert).filter(TokenAlert.id.in_(unsnooze), TokenAlert.snoozed_until <= now).update(
+                    {"is_active": True, "snoozed_until": None}, synchronize_session=False
+                )
+            if expire:
+                session.query(TokenAlert).filter(TokenAlert.id.in_(expire), TokenAlert.expires_at <= now).delete(
+                    synchronize_session=False
+                )
+            session.commit()
+            logger.info(f"Scheduler re-enabled {len(unsnooze)} snoozed alerts and removed {len(expire)} expired alerts")
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error applying scheduled alert events: {e}")
+        finally:
+            session.close()
+
+alert_scheduler = AlertScheduler()
@@ -0,0 +1,211 @@
+import asyncio
+from typing import Optional, Callable, Awaitable
+from app.db import get_session, User, Broadcast
+from app.services.message_service import MessageService
+from app.settings import BROADCAST_CHUNK_SIZE
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+class BroadcastService:
+    # Рассылки, которые выполняются в этом процессе: broadcast_id -> asyncio.Task
+    _tasks = {}
+    # Рассылки, остановленные администратором: их прерывание сохраняется как пауза
+    _pausing = set()
+
+    @staticmethod
+    def _recipients_query(session):
+        return session.query(User.user_id).filter(User.is_approved == True, User.is_blocked == False)
+
+    @staticmethod
+    async def create_broadcast(admin_id: int, text: str) -> Optional[Broadcast]:
+        """Create a pending broadcast addressed to all approved users."""
+        session = get_session()
+        try:
+            total = BroadcastService._recipients_query(session).count()
+            broadcast = Broadcast(admin_id=admin_id, text=text, status="pending", total_count=total)
+            session.add(broadcast)
+            session.commit()
+            return broadcast
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error creating broadcast for admin {admin_id}: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    async def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+        """Get broadcast by ID."""
+        session = get_session()
+        try:
+            return session.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting broadcast {broadcast_id}: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    async def get_recent_broadcasts(limit: int = 5) -> list:
+        """Get the most recent broadcasts."""
+        session = get_session()
+        try:
+            return session.query(Broadcast).order_by(Broadcast.id.desc()).limit(limit).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting recent broadcasts: {e}")
+            return []
+        finally:
+            session.close()
+
+    @staticmethod
+    def _fetch_recipient_chunk(after_user_id: int, chunk_size: int) -> list:
+        """Fetch the next chunk of recipient ids using keyset pagination on user_id."""
+        session = get_session()
+        try:
+            rows = (
+                BroadcastService._recipients_query(session)
+                .filter(User.user_id > after_user_id)
+                .order_by(User.user_id)
+                .limit(chunk_size)
+                .all()
+            )
+            return [row[0] for row in rows]
+        finally:
+            session.close()
+
+    @staticmethod
+    def _save_progress(broadcast_id: int, **fields) -> Optional[Broadcast]:
+        session = get_session()
+        try:
+            broadcast = session.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+            if broadcast:
+                for key, value in fields.items():
+                    setattr(broadcast, key, value)
+                session.commit()
+            return broadcast
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error saving progress for broadcast {broadcast_id}: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    def is_running(broadcast_id: int) -> bool:
+        """Check whether the broadcast is being sent by this process."""
+        task = BroadcastService._tasks.get(broadcast_id)
+        return task is not None and not task.done()
+
+    @staticmethod
+    def start(broadcast_id: int, on_progress: Callable[[Broadcast], Awaitable] = None) -> bool:
+        """Start (or resume) sending a broadcast in the background."""
+        if BroadcastService.is_running(broadcast_id):
+            return False
+
+        task = asyncio.create_task(BroadcastService.run(broadcast_id, on_progress))
+        BroadcastService._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: BroadcastService._tasks.pop(broadcast_id, None))
+        return True
+
+    @staticmethod
+    async def stop(broadcast_id: int) -> bool:
+        """Pause a running broadcast. It can be resumed later from its cursor."""
+        task = BroadcastService._tasks.get(broadcast_id)
+        if task is None or task.done():
+            return False
+
+        BroadcastService._pausing.add(broadcast_id)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            BroadcastService._pausing.discard(broadcast_id)
+        return True
+
+    @staticmethod
+    async def cancel(broadcast_id: int) -> bool:
+        """Discard a broadcast that has not been sent yet."""
+        await BroadcastService.stop(broadcast_id)
+        return BroadcastService._save_progress(broadcast_id, status="cancelled") is not None
+
+    @staticmethod
+    async def run(broadcast_id: int, on_progress: Callable[[Broadcast], Awaitable] = None):
+        """Send a broadcast chunk by chunk, checkpointing the cursor after every chunk."""
+        broadcast = BroadcastService._save_progress(broadcast_id, status="running")
+        if not broadcast:
+            logger.error(f"Broadcast {broadcast_id} not found")
+            return
+
+        text = broadcast.text
+        cursor = broadcast.cursor_user_id or 0
+        sent = broadcast.sent_count or 0
+        failed = broadcast.failed_count or 0
+        logger.info(f"Broadcast {broadcast_id} started from user_id>{cursor} ({sent} sent, {failed} failed so far)")
+
+        try:
+            while True:
+                chunk = BroadcastService._fetch_recipient_chunk(cursor, BROADCAST_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                chunk_sent, chunk_failed = await MessageService.send_many(chunk, text)
+                sent += chunk_sent
+                failed += chunk_failed
+                cursor = chunk[-1]
+
+                # Сохраняем прогресс после каждого чанка, чтобы можно было продолжить после падения
+                broadcast = BroadcastService._save_progress(
+                    broadcast_id, cursor_user_id=cursor, sent_count=sent, failed_count=failed
+                )
+                logger.debug(f"Broadcast {broadcast_id}: {sent} sent, {failed} failed, cursor={cursor}")
+
+                if on_progress and broadcast:
+                    try:
+                        await on_progress(broadcast)
+                    except Exception as e:
+                        logger.debug(f"Broadcast {broadcast_id} progress callback failed: {e}")
+        except asyncio.CancelledError:
+            # При остановке процесса статус остаётся "running", и рассылка продолжится после перезапуска
+            if broadcast_id in BroadcastService._pausing:
+                BroadcastService._save_progress(broadcast_id, status="paused")
+                logger.info(f"Broadcast {broadcast_id} paused at user_id {cursor}")
+            else:
+                logger.info(f"Broadcast {broadcast_id} interrupted at user_id {cursor}, will resume after restart")
+            raise
+
+        broadcast = BroadcastService._save_progress(broadcast_id, status="completed")
+        logger.info(f"Broadcast {broadcast_id} completed: {sent} sent, {failed} failed")
+
+        if not broadcast:
+            return
+
+        if on_progress:
+            try:
+                await on_progress(broadcast)
+            except Exception as e:
+                logger.debug(f"Broadcast {broadcast_id} progress callback failed: {e}")
+
+        await MessageService.send(
+            broadcast.admin_id,
+            f"📢 Broadcast #{broadcast_id} finished.\nSent: {sent}\nFailed: {failed}"
+        )
+
+    @staticmethod
+    async def resume_interrupted() -> list:
+        """Resume broadcasts that were still running when the process stopped."""
+        session = get_session()
+        try:
+            ids = [row[0] for row in session.query(Broadcast.id).filter(Broadcast.status == "running").all()]
+        except SQLAlchemyError as e:
+            logger.error(f"Error looking up interrupted broadcasts: {e}")
+            return []
+        finally:
+            session.close()
+
+        for broadcast_id in ids:
+            logger.info(f"Resuming interrupted broadcast {broadcast_id}")
+            BroadcastService.start(broadcast_id)
+
+        return ids
\ No newline at end of file
@@ -1,67 +1,35 @@
 import aiohttp
 import asyncio
 from loguru import logger
+from app.utils.metrics import BYBIT_REQUEST_DURATION
 
 class BybitService:
     BASE_URL = "https://api.bybit.com"
     
     @staticmethod
-    async def is_token_valid(symbol: str) -> bool:
-        """Check if the given token symbol exists on Bybit."""
-        try:
+    async def _get_json(path: str, params: dict) -> dict:
+        """Perform a GET request to the Bybit API and record its latency."""
+        with BYBIT_REQUEST_DURATION.time(endpoint=path):
             async with aiohttp.ClientSession() as session:
-                url = f"{BybitService.BASE_URL}/v5/market/tickers"
-                params = {"category": "spot", "symbol": f"{symbol}USDT"}
-                
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
-                    
-                    if data.get("retCode") == 0 and data.get("result", {}).get("list"):
-                        return True
-                    return False
-        except Exception as e:
-            logger.error(f"Error checking token validity for {symbol}: {e}")
-            return False
+                async with session.get(f"{BybitService.BASE_URL}{path}", params=params) as response:
+                    return await response.json()
     
     @staticmethod
-    async def get_token_price(symbol: str) -> float:
-        """Get the current price of a token on Bybit."""
+    async def get_tickers(category: str) -> list:
+        """
+        Get the tickers of every instrument in a category (spot, linear, inverse) in one request.
+        
+        Returns the raw ticker dicts of the Bybit v5 API, or None when the request failed.
+        Prices and symbols are interpreted by MarketDataService.
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{BybitService.BASE_URL}/v5/market/tickers"
-                params = {"category": "spot", "symbol": f"{symbol}USDT"}
-                
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
-                    
-                    if data.get("retCode") == 0 and data.get("result", {}).get("list"):
-                        price = float(data["result"]["list"][0]["lastPrice"])
-                        return price
-                    
-                    return None
-        except Exception as e:
-            logger.error(f"Error getting price for {symbol}: {e}")
+            data = await BybitService._get_json("/v5/market/tickers", {"category": category})
+            
+            if data.get("retCode") == 0:
+                return data.get("result", {}).get("list") or []
+            
+            logger.error(f"Bybit returned an error for {category} tickers: {data.get('retMsg')}")
             return None
-    
-    @staticmethod
-    async def get_all_tokens() -> list:
-        """Get a list of all available tokens on Bybit."""
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{BybitService.BASE_URL}/v5/market/tickers"
-                params = {"category": "spot"}
-                
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
-                    
-                    tokens = []
-                    if data.get("retCode") == 0 and data.get("result", {}).get("list"):
-                        for item in data["result"]["list"]:
-                            if item["symbol"].endswith("USDT"):
-                                symbol = item["symbol"].replace("USDT", "")
-                                tokens.append(symbol)
-                    
-                    return tokens
         except Exception as e:
-            logger.error(f"Error getting all tokens: {e}")
-            return [] 
\ No newline at end of file
+            logger.error(f"Error getting {category} tickers: {e}")
+            return None
@@ -0,0 +1,67 @@
+import asyncio
+from loguru import logger
+from app.settings import DELIVERY_WORKERS
+from app.services.message_service import MessageService
+from app.utils.metrics import DELIVERY_QUEUE_SIZE
+
+class DeliveryService:
+    # Очередь сообщений и пул отправителей: проверка цен не ждёт Telegram
+    _queue = None
+    _workers = []
+
+    @staticmethod
+    def start(workers: int = DELIVERY_WORKERS):
+        """Start the sender tasks. Does nothing when they are already running."""
+        if DeliveryService._workers:
+            return
+        if DeliveryService._queue is None:
+            DeliveryService._queue = asyncio.Queue()
+        DeliveryService._workers = [
+            asyncio.create_task(DeliveryService._worker()) for _ in range(max(1, workers))
+        ]
+        logger.info(f"Delivery queue started with {len(DeliveryService._workers)} workers")
+
+    @staticmethod
+    async def stop():
+        """Cancel the sender tasks. Messages still queued are kept for the next start."""
+        for task in DeliveryService._workers:
+            task.cancel()
+        await asyncio.gather(*DeliveryService._workers, return_exceptions=True)
+        DeliveryService._workers = []
+
+    @staticmethod
+    def enqueue(chat_id: int, text: str, callback=None, **kwargs):
+        """
+        Queue a message for delivery.
+
+        callback, if given, is called with True/False once the message was sent or dropped.
+        """
+        if not DeliveryService._workers:
+            DeliveryService.start()
+        DeliveryService._queue.put_nowait((chat_id, text, kwargs, callback))
+        DELIVERY_QUEUE_SIZE.set(DeliveryService._queue.qsize())
+
+    @staticmethod
+    def pending() -> int:
+        return DeliveryService._queue.qsize() if DeliveryService._queue else 0
+
+    @staticmethod
+    async def join():
+        """Wait until every queued message was processed."""
+        if DeliveryService._queue is not None:
+            await DeliveryService._queue.join()
+
+    @staticmethod
+    async def _worker():
+        queue = DeliveryService._queue
+        while True:
+            chat_id, text, kwargs, callback = await queue.get()
+            DELIVERY_QUEUE_SIZE.set(queue.qsize())
+            try:
+                ok = await MessageService.send(chat_id, text, **kwargs)
+                if callback:
+                    callback(ok)
+            except Exception as e:
+                logger.error(f"Error delivering message to {chat_id}: {e}")
+            finally:
+                queue.task_done()
@@ -0,0 +1,362 @@
+"""
+Market data shared by the alert check, validation and token lists.
+
+Bybit returns the tickers of every instrument of a category in one request,
+so instead of one request per symbol the bot downloads a snapshot per
+category and looks markets up in it. Snapshots are cached: the alert check
+refreshes the categories it needs once per cycle, everything else (symbol
+validation, token lists, prices shown in dialogs) reuses a snapshot younger
+than MARKET_SNAPSHOT_TTL.
+"""
+import asyncio
+import bisect
+import heapq
+import time
+from typing import NamedTuple
+from loguru import logger
+from app.models.token_alert import CATEGORY_INVERSE, CATEGORY_LINEAR, CATEGORY_QUOTES, DEFAULT_CATEGORY, DEFAULT_QUOTE, market_key, pair_key, pair_value, parse_market, parse_pair
+from app.services.bybit_service import BybitService
+from app.settings import MARKET_SNAPSHOT_TTL, TOP_MOVERS_MIN_TURNOVER
+
+# Bybit называет USDC-перпетуалы BTCPERP, а не BTCUSDC
+USDC_PERPETUAL_SUFFIX = "PERP"
+
+class Ticker(NamedTuple):
+    market: str  # Market name used by the bot, e.g. BTC or BTC/USDT.P
+    symbol: str  # Base asset
+    quote: str
+    category: str
+    last_price: float
+    high_24h: float = None
+    low_24h: float = None
+    turnover_24h: float = None  # Traded value over 24h in quote currency (inverse: in the base coin)
+    volume_24h: float = None  # Traded amount over 24h in base currency (inverse: in USD)
+    change_24h: float = None  # Price change over 24h as a fraction, 0.05 = +5%
+    # Лучшие цены стакана; размер в базовой валюте (у inverse - в USD)
+    bid_price: float = None
+    bid_size: float = None
+    ask_price: float = None
+    ask_size: float = None
+    # Только у перпетуалов (linear, inverse), у спота None
+    funding_rate: float = None  # Current funding rate as a fraction, 0.0001 = 0.01%
+    next_funding_time: float = None  # Unix time of the next funding settlement
+    open_interest_value: float = None  # Open interest in quote currency
+
+    @property
+    def spread_pct(self) -> float:
+        """Bid/ask spread in % of the mid price, None without a two-sided book."""
+        if not self.bid_price or not self.ask_price:
+            return None
+        return (self.ask_price - self.bid_price) / ((self.ask_price + self.bid_price) / 2) * 100
+
+    @property
+    def quote_turnover(self) -> float:
+        """Traded value over 24h in quote currency, None if unknown."""
+        # У inverse-контрактов Bybit отдаёт оборот в монете, а объём - в USD
+        return self.volume_24h if self.category == CATEGORY_INVERSE else self.turnover_24h
+
+    @property
+    def top_depth(self) -> float:
+        """Amount at the thinner side of the best bid and ask in quote currency, None if unknown."""
+        if not self.bid_price or not self.ask_price or self.bid_size is None or self.ask_size is None:
+            return None
+        # У inverse-контрактов размер уже в USD
+        if self.category == CATEGORY_INVERSE:
+            return min(self.bid_size, self.ask_size)
+        return min(self.bid_price * self.bid_size, self.ask_price * self.ask_size)
+
+def split_exchange_symbol(exchange_symbol: str, category: str) -> tuple:
+    """(symbol, quote) of a Bybit instrument name like BTCUSDT or BTCPERP; None for unsupported instruments."""
+    if category == CATEGORY_LINEAR and exchange_symbol.endswith(USDC_PERPETUAL_SUFFIX):
+        return exchange_symbol[:-len(USDC_PERPETUAL_SUFFIX)], "USDC"
+    for quote in CATEGORY_QUOTES.get(category, ()):
+        # Фьючерсы с датой экспирации (BTC-26DEC25, BTCUSDH25) сюда не попадают
+        if exchange_symbol.endswith(quote) and len(exchange_symbol) > len(quote):
+            return exchange_symbol[:-len(quote)], quote
+    return None
+
+def _optional_float(item: dict, key: str) -> float:
+    try:
+        return float(item[key])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def parse_ticker(item: dict, category: str) -> Ticker:
+    """Ticker from a raw Bybit ticker dict, None if the instrument is unsupported or has no price."""
+    parsed = split_exchange_symbol(item.get("symbol", ""), category)
+    if not parsed:
+        return None
+    symbol, quote = parsed
+    try:
+        last_price = float(item["lastPrice"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if last_price <= 0:
+        return None
+    
+    next_funding_time = _optional_float(item, "nextFundingTime")
+    return Ticker(
+        market_key(symbol, quote, category), symbol, quote, category, last_price,
+        high_24h=_optional_float(item, "highPrice24h"),
+        low_24h=_optional_float(item, "lowPrice24h"),
+        turnover_24h=_optional_float(item, "turnover24h"),
+        volume_24h=_optional_float(item, "volume24h"),
+        change_24h=_optional_float(item, "price24hPcnt"),
+        bid_price=_optional_float(item, "bid1Price"),
+        bid_size=_optional_float(item, "bid1Size"),
+        ask_price=_optional_float(item, "ask1Price"),
+        ask_size=_optional_float(item, "ask1Size"),
+        funding_rate=_optional_float(item, "fundingRate"),
+        next_funding_time=next_funding_time / 1000 if next_funding_time else None,
+        open_interest_value=_optional_float(item, "openInterestValue"),
+    )
+
+class TopMovers(NamedTuple):
+    gainers: list  # Tickers with the largest 24h change, best first
+    losers: list   # Tickers with the smallest 24h change, worst first
+    turnover: list  # Tickers with the largest 24h turnover
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance with adjacent transpositions counted as one edit (BTC -> TBC is 1)."""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if previous2 is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, previous2[j - 2] + 1)
+            current.append(cost)
+        previous2, previous = previous, current
+    return previous[-1]
+
+def deletes(word: str, depth: int) -> set:
+    """The word and every string made from it by removing up to depth characters."""
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        result |= frontier
+    return result
+
+class SymbolIndex:
+    """Markets of one category and quote asset sorted by base symbol, searched by prefix with bisect."""
+    FUZZY_DISTANCE = 2
+    # Короткие тикеры допускают одну ошибку: иначе к BTC подходит половина каталога
+    SHORT_SYMBOL = 4
+
+    def __init__(self, tickers: dict, quote: str):
+        entries = sorted((ticker.symbol, ticker.market) for ticker in tickers.values() if ticker.quote == quote)
+        self.symbols = [symbol for symbol, _ in entries]
+        self.markets = [market for _, market in entries]
+        self._deletes = None  # Строится при первом нечётком поиске
+
+    def search(self, prefix: str, limit: int = None) -> list:
+        """Markets whose base symbol starts with prefix, an exact match first."""
+        start = bisect.bisect_left(self.symbols, prefix)
+        # Все строки с этим префиксом лежат до prefix + максимальный символ
+        end = bisect.bisect_left(self.symbols, prefix + "\uffff", start)
+        return self.markets[start:end if limit is None else min(end, start + limit)]
+
+    def similar(self, symbol: str, limit: int = 3) -> list:
+        """
+        Markets whose base symbol is within FUZZY_DISTANCE edits of symbol, closest first;
+        symbols of up to SHORT_SYMBOL characters allow a single edit.
+
+        Symmetric delete lookup: every symbol is stored under the strings left
+        after deleting up to FUZZY_DISTANCE of its characters, so candidates are
+        found with a few dict lookups for the deletes of the query and only they
+        are compared character by character.
+        """
+        if self._deletes is None:
+            self._deletes = {}
+            for position, indexed in enumerate(self.symbols):
+                for variant in deletes(indexed, self.FUZZY_DISTANCE):
+                    self._deletes.setdefault(variant, []).append(position)
+
+        max_distance = 1 if len(symbol) <= self.SHORT_SYMBOL else self.FUZZY_DISTANCE
+        candidates = set()
+        for variant in deletes(symbol, max_distance):
+            candidates.update(self._deletes.get(variant, ()))
+
+        ranked = []
+        for position in candidates:
+            distance = edit_distance(symbol, self.symbols[position])
+            if 0 < distance <= max_distance:
+                ranked.append((distance, abs(len(self.symbols[position]) - len(symbol)), self.symbols[position], position))
+        return [self.markets[position] for *_, position in heapq.nsmallest(limit, ranked)]
+
+class MarketDataService:
+    _snapshots = {}  # category -> (fetched_at, {market: Ticker})
+    _locks = {}  # category -> asyncio.Lock, one download per category at a time
+    _movers = {}  # (category, quote, count) -> (tickers dict the ranking was built from, TopMovers)
+    _indexes = {}  # (category, quote) -> (tickers dict the index was built from, SymbolIndex)
+
+    @staticmethod
+    def clear():
+        """Forget all cached snapshots."""
+        MarketDataService._snapshots.clear()
+        MarketDataService._movers.clear()
+        MarketDataService._indexes.clear()
+
+    @staticmethod
+    async def get_snapshot(category: str = DEFAULT_CATEGORY, max_age: float = None) -> dict:
+        """
+        Tickers of a category keyed by market, downloaded if the cached snapshot is older than max_age.
+
+        max_age defaults to MARKET_SNAPSHOT_TTL; 0 forces a download. When the download
+        fails the previous snapshot is returned, or an empty dict if there is none.
+        """
+        if max_age is None:
+            max_age = MARKET_SNAPSHOT_TTL
+
+        cached = MarketDataService._snapshots.get(category)
+        if cached and time.monotonic() - cached[0] <= max_age and max_age > 0:
+            return cached[1]
+
+        lock = MarketDataService._locks.setdefault(category, asyncio.Lock())
+        requested = time.monotonic()
+        async with lock:
+            # Пока ждали блокировку, снимок мог скачать другой запрос
+            cached = MarketDataService._snapshots.get(category)
+            if cached and cached[0] >= requested:
+                return cached[1]
+
+            items = await BybitService.get_tickers(category)
+            if items is None:
+                return cached[1] if cached else {}
+
+            tickers = {}
+            for item in items:
+                ticker = parse_ticker(item, category)
+                if ticker:
+                    tickers[ticker.market] = ticker
+
+            MarketDataService._snapshots[category] = (time.monotonic(), tickers)
+            logger.debug(f"Fetched {len(tickers)} {category} tickers")
+            return tickers
+
+    @staticmethod
+    async def get_tickers(markets, max_age: float = None) -> dict:
+        """Tickers of the given markets keyed by market, one snapshot per category involved."""
+        by_category = {}
+        for market in markets:
+            parsed = parse_market(market)
+            if parsed:
+                by_category.setdefault(parsed[2], []).append(market)
+
+        result = {}
+        for category, names in by_category.items():
+            tickers = await MarketDataService.get_snapshot(category, max_age)
+            for market in names:
+                ticker = tickers.get(market)
+                if ticker:
+                    result[market] = ticker
+        return result
+
+    @staticmethod
+    async def get_prices(markets, max_age: float = None) -> dict:
+        """Last prices of the given markets, one snapshot per category involved."""
+        tickers = await MarketDataService.get_tickers(markets, max_age)
+        return {market: ticker.last_price for market, ticker in tickers.items()}
+
+    @staticmethod
+    async def get_ticker(market: str, max_age: float = None) -> Ticker:
+        """Ticker of one market from its category snapshot, None if Bybit doesn't list it."""
+        parsed = parse_market(market)
+        if not parsed:
+            return None
+        tickers = await MarketDataService.get_snapshot(parsed[2], max_age)
+        return tickers.get(market_key(*parsed))
+
+    @staticmethod
+    async def get_price(market: str, max_age: float = None) -> float:
+        """Last price of one market or value of a pair (ETH÷BTC), None if unknown."""
+        pair = parse_pair(market)
+        if pair:
+            prices = await MarketDataService.get_prices(pair[:2], max_age)
+            if len(prices) < 2:
+                return None
+            return pair_value(pair[2], prices[pair[0]], prices[pair[1]])
+
+        ticker = await MarketDataService.get_ticker(market, max_age)
+        return ticker.last_price if ticker else None
+
+    @staticmethod
+    async def is_valid(market: str) -> bool:
+        """Check if the market (BTC, BTC/USDC, BTC.P, ...) or both legs of a pair are listed on Bybit."""
+        pair = parse_pair(market)
+        if pair:
+            return await MarketDataService.get_price(market) is not None
+        return await MarketDataService.get_ticker(market) is not None
+
+    @staticmethod
+    async def get_index(category: str = DEFAULT_CATEGORY, quote: str = DEFAULT_QUOTE) -> SymbolIndex:
+        """Symbol index of one category and quote asset, rebuilt only when the listed markets change."""
+        tickers = await MarketDataService.get_snapshot(category)
+        cached = MarketDataService._indexes.get((category, quote))
+        if cached and cached[0] is tickers:
+            return cached[1]
+        # Новый снимок с теми же инструментами - индекс остаётся прежним
+        if cached and cached[0].keys() == tickers.keys():
+            MarketDataService._indexes[(category, quote)] = (tickers, cached[1])
+            return cached[1]
+
+        index = SymbolIndex(tickers, quote)
+        MarketDataService._indexes[(category, quote)] = (tickers, index)
+        return index
+
+    @staticmethod
+    async def list_markets(category: str = DEFAULT_CATEGORY, quote: str = DEFAULT_QUOTE) -> list:
+        """Market names of one category and quote asset sorted by base symbol."""
+        return (await MarketDataService.get_index(category, quote)).markets
+
+    @staticmethod
+    async def search_markets(prefix: str, category: str = DEFAULT_CATEGORY, quote: str = DEFAULT_QUOTE, limit: int = None) -> list:
+        """Markets of one category and quote asset whose base symbol starts with prefix."""
+        return (await MarketDataService.get_index(category, quote)).search(prefix.upper(), limit)
+
+    @staticmethod
+    async def top_movers(count: int, category: str = DEFAULT_CATEGORY, quote: str = DEFAULT_QUOTE) -> TopMovers:
+        """
+        Top gainers, losers and turnover leaders of one category and quote asset over 24h.
+
+        Markets with less than TOP_MOVERS_MIN_TURNOVER traded are left out. The
+        ranking is a partial selection (heapq) over the snapshot and is kept
+        until a new snapshot replaces it, so repeated requests cost nothing.
+        """
+        tickers = await MarketDataService.get_snapshot(category)
+        key = (category, quote, count)
+        cached = MarketDataService._movers.get(key)
+        if cached and cached[0] is tickers:
+            return cached[1]
+
+        candidates = [
+            ticker for ticker in tickers.values()
+            if ticker.quote == quote and ticker.change_24h is not None
+            and (ticker.quote_turnover or 0) >= TOP_MOVERS_MIN_TURNOVER
+        ]
+        movers = TopMovers(
+            # На рынке с малым числом инструментов в лидерах роста не должно оказаться падающих
+            gainers=[ticker for ticker in heapq.nlargest(count, candidates, key=lambda ticker: ticker.change_24h) if ticker.change_24h > 0],
+            losers=[ticker for ticker in heapq.nsmallest(count, candidates, key=lambda ticker: ticker.change_24h) if ticker.change_24h < 0],
+            turnover=heapq.nlargest(count, candidates, key=lambda ticker: ticker.quote_turnover),
+        )
+        MarketDataService._movers[key] = (tickers, movers)
+        return movers
+
+    @staticmethod
+    async def suggest_markets(text: str, limit: int = 3) -> list:
+        """Listed markets close to a mistyped one (BTCC -> BTC), from the cached catalog of its category and quote."""
+        parsed = parse_market(text)
+        if not parsed:
+            return []
+        symbol, quote, category = parsed
+        return (await MarketDataService.get_index(category, quote)).similar(symbol, limit)
+
+def normalize_market(text: str) -> str:
+    """Canonical market or pair name of user input (btc.p -> BTC/USDT.P, eth/btc -> ETH÷BTC), None if it can't be one."""
+    parsed = parse_market(text)
+    if parsed:
+        return market_key(*parsed)
+    pair = parse_pair(text)
+    return pair_key(*pair) if pair else None
@@ -0,0 +1,48 @@
+import asyncio
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from loguru import logger
+from app.settings import TELEGRAM_RATE_LIMIT, TELEGRAM_SEND_RETRIES, BROADCAST_CONCURRENCY
+from app.utils.rate_limiter import AsyncRateLimiter
+from app.utils.metrics import TELEGRAM_SEND_DURATION
+
+class MessageService:
+    # Один лимитер на весь процесс: алерты, рассылки и уведомления админам делят общий лимит Telegram
+    limiter = AsyncRateLimiter(TELEGRAM_RATE_LIMIT)
+
+    @staticmethod
+    async def send(chat_id: int, text: str, **kwargs) -> bool:
+        """Send a message under the global rate limit, honouring flood-control waits."""
+        from app.bot import bot
+
+        for attempt in range(TELEGRAM_SEND_RETRIES):
+            await MessageService.limiter.acquire()
+            try:
+                with TELEGRAM_SEND_DURATION.time():
+                    await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return True
+            except TelegramRetryAfter as e:
+                # Flood control applies to the whole bot, so pause every sender
+                logger.warning(f"Flood control while sending to {chat_id}, retrying in {e.retry_after}s")
+                MessageService.limiter.pause(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.info(f"Message to {chat_id} rejected: {e}")
+                return False
+            except Exception as e:
+                logger.error(f"Failed to send message to {chat_id}: {e}")
+                return False
+
+        logger.error(f"Giving up on message to {chat_id} after {TELEGRAM_SEND_RETRIES} attempts")
+        return False
+
+    @staticmethod
+    async def send_many(chat_ids: list, text: str, concurrency: int = BROADCAST_CONCURRENCY, **kwargs) -> tuple:
+        """Send the same message to many chats concurrently. Returns (sent, failed)."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _send(chat_id):
+            async with semaphore:
+                return await MessageService.send(chat_id, text, **kwargs)
+
+        results = await asyncio.gather(*(_send(chat_id) for chat_id in chat_ids))
+        sent = sum(1 for ok in results if ok)
+        return sent, len(results) - sent
\ No newline at end of file
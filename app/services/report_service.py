@@ -0,0 +1,261 @@
+import time
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import get_session, ReportSubscription, TokenAlert, User
+from app.models.token_alert import ALERT_TYPE_BOOK_SPREAD, ALERT_TYPE_STEP, DIRECTION_ABOVE, DIRECTION_BELOW, format_price, grid_bucket, pair_value, parse_pair
+from app.services.alert_scheduler import EVENT_REPORT, alert_scheduler, next_local_time
+from app.services.delivery_service import DeliveryService
+from app.services.market_data import MarketDataService
+
+def next_report_time(now: float, interval_seconds: int = None, daily_minute: int = None, utc_offset: int = 0) -> float:
+    """Unix time of the next report: the next multiple of the interval, or the next daily time in the user's timezone."""
+    if daily_minute is not None:
+        return next_local_time(now, daily_minute, utc_offset or 0)
+    return (now // interval_seconds + 1) * interval_seconds
+
+def market_value(market: str, tickers: dict) -> float:
+    """Last price of a market or value of a pair from a set of tickers, None if a price is missing."""
+    pair = parse_pair(market)
+    if pair:
+        legs = [tickers.get(leg) for leg in pair[:2]]
+        return pair_value(pair[2], legs[0].last_price, legs[1].last_price) if all(legs) else None
+    ticker = tickers.get(market)
+    return ticker.last_price if ticker else None
+
+def format_quote(market: str, tickers: dict, html: bool = True) -> str:
+    """BTC: $65,000.00 (+1.23% 24h), n/a if a price is missing."""
+    name = f"<b>{market}</b>" if html else market
+    price = market_value(market, tickers)
+    if price is None:
+        return f"{name}: n/a"
+    ticker = tickers.get(market)
+    change = f" ({ticker.change_24h * 100:+.2f}% 24h)" if ticker and ticker.change_24h is not None else ""
+    return f"{name}: {format_price(market, price)}{change}"
+
+def render_report(markets: list, tickers: dict, title: str = "📊 <b>Price report</b>") -> str:
+    """Price report of the markets from one set of tickers; pairs are computed from their legs."""
+    return f"{title}\n\n" + "\n".join(format_quote(market, tickers) for market in markets)
+
+def format_amount(value: float) -> str:
+    """Compact amount: 950, 12.3K, 4.56M, 1.2B."""
+    for limit, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if value >= limit:
+            return f"{value / limit:.3g}{suffix}"
+    return f"{value:.0f}"
+
+def render_top_movers(movers, label: str) -> str:
+    """Gainers, losers and turnover leaders with their price and 24h change."""
+    sections = (
+        ("📈 <b>Gainers</b>", movers.gainers),
+        ("📉 <b>Losers</b>", movers.losers),
+        ("💰 <b>Turnover</b>", movers.turnover),
+    )
+    text = f"🚀 <b>Top Movers</b> · {label} · 24h\n"
+    for title, tickers in sections:
+        text += f"\n{title}\n"
+        if not tickers:
+            text += "No data\n"
+        for place, ticker in enumerate(tickers, 1):
+            text += (
+                f"{place}. <b>{ticker.market}</b> {format_price(ticker.market, ticker.last_price)} "
+                f"{ticker.change_24h * 100:+.2f}% · {format_amount(ticker.quote_turnover)} {ticker.quote}\n"
+            )
+    return text
+
+# Ограничение Telegram - 4096 символов, остаток списка обрезается
+WATCHLIST_MAX_LENGTH = 3800
+
+def next_trigger(alert: TokenAlert, price: float, ticker=None) -> float:
+    """Price (or pair value) at which the alert fires next, None for alerts without a price target."""
+    if alert.is_level:
+        return alert.threshold
+    if alert.is_grid:
+        # Ближайшая линия сетки снизу или сверху
+        bucket = grid_bucket(price, alert.price_multiplier)
+        lines = (bucket * alert.price_multiplier, (bucket + 1) * alert.price_multiplier)
+        return min(lines, key=lambda line: abs(line - price))
+    if alert.alert_type in (None, ALERT_TYPE_STEP):
+        base = alert.last_alert_price or price
+        return min((base - alert.price_multiplier, base + alert.price_multiplier), key=lambda line: abs(line - price))
+    if alert.is_breakout and ticker and ticker.high_24h and ticker.low_24h:
+        if alert.direction == DIRECTION_ABOVE:
+            return ticker.high_24h
+        if alert.direction == DIRECTION_BELOW:
+            return ticker.low_24h
+        return min((ticker.low_24h, ticker.high_24h), key=lambda line: abs(line - price))
+    return None
+
+def describe_progress(alert: TokenAlert, price: float, ticker=None) -> str:
+    """How far the alert is from firing: distance to its next price, or the watched value for the others."""
+    target = next_trigger(alert, price, ticker)
+    if target is not None:
+        distance = f" ({(target - price) / abs(price) * 100:+.2f}%)" if price else ""
+        return f"next {format_price(alert.market, target)}{distance}"
+    if alert.is_funding and ticker and ticker.funding_rate is not None:
+        return f"now {ticker.funding_rate * 100:+.4f}%"
+    if alert.is_book and ticker:
+        value = ticker.spread_pct if alert.alert_type == ALERT_TYPE_BOOK_SPREAD else ticker.top_depth
+        if value is not None:
+            return f"now {value:.3f}%" if alert.alert_type == ALERT_TYPE_BOOK_SPREAD else f"now ${value:,.0f}"
+    return ""
+
+def render_watchlist(alerts: list, tickers: dict) -> str:
+    """Every market of the alerts with its price and 24h change, and the distance of each alert to its trigger."""
+    by_market = {}
+    for alert in alerts:
+        by_market.setdefault(alert.market, []).append(alert)
+
+    lines = []
+    for market, market_alerts in by_market.items():
+        lines.append("\n" + format_quote(market, tickers))
+        price = market_value(market, tickers)
+        if price is None:
+            continue
+
+        ticker = tickers.get(market)
+        for alert in market_alerts:
+            state = " 😴" if alert.snoozed_until else "" if alert.is_active else " ⏸"
+            progress = describe_progress(alert, price, ticker)
+            lines.append(f"  • {alert.describe()}{state}" + (f": {progress}" if progress else ""))
+
+    text = "📋 <b>Watchlist</b>\n"
+    for line in lines:
+        if len(text) + len(line) > WATCHLIST_MAX_LENGTH:
+            return text + "\n…"
+        text += line + "\n"
+    return text
+
+class ReportService:
+    @staticmethod
+    async def get_subscription(user_id: int) -> ReportSubscription:
+        """Report subscription of a user, None if not subscribed."""
+        session = get_session()
+        try:
+            return session.query(ReportSubscription).filter(ReportSubscription.user_id == user_id).first()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting report subscription of user {user_id}: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    async def subscribe(user_id: int, interval_seconds: int = None, daily_minute: int = None, utc_offset: int = None) -> ReportSubscription:
+        """
+        Send the user a report every interval_seconds or daily at daily_minute of their local day.
+
+        utc_offset, if given, becomes the user's timezone, shared with quiet hours.
+        """
+        session = get_session()
+        try:
+            user = session.query(User).filter(User.user_id == user_id).first()
+            if not user:
+                return None
+
+            if utc_offset is not None and utc_offset != user.utc_offset:
+                user.utc_offset = utc_offset
+                if user.quiet_start is not None:
+                    alert_scheduler.set_quiet_hours(user_id, user.quiet_start, user.quiet_end, utc_offset)
+
+            subscription = session.query(ReportSubscription).filter(ReportSubscription.user_id == user_id).first()
+            if not subscription:
+                subscription = ReportSubscription(user_id=user_id)
+                session.add(subscription)
+
+            subscription.interval_seconds = None if daily_minute is not None else interval_seconds
+            subscription.daily_minute = daily_minute
+            subscription.next_run_at = next_report_time(time.time(), interval_seconds, daily_minute, user.utc_offset)
+            session.commit()
+
+            alert_scheduler.schedule(EVENT_REPORT, user_id, subscription.next_run_at)
+            logger.info(f"User {user_id} subscribed to price reports {subscription.describe()}")
+            return subscription
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error subscribing user {user_id} to reports: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    async def unsubscribe(user_id: int) -> bool:
+        """Stop sending reports to the user."""
+        session = get_session()
+        try:
+            session.query(ReportSubscription).filter(ReportSubscription.user_id == user_id).delete()
+            session.commit()
+            alert_scheduler.cancel(EVENT_REPORT, user_id)
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error unsubscribing user {user_id} from reports: {e}")
+            return False
+        finally:
+            session.close()
+
+    @staticmethod
+    async def get_watchlist(user_id: int) -> str:
+        """Watchlist of all alerts of the user, priced from the cached snapshots in one pass."""
+        session = get_session()
+        try:
+            alerts = session.query(TokenAlert).filter(TokenAlert.user_id == user_id).order_by(TokenAlert.id).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting watchlist of user {user_id}: {e}")
+            return None
+        finally:
+            session.close()
+
+        if not alerts:
+            return "📋 <b>Watchlist</b>\n\nYou don't have any alerts set up yet."
+        tickers = await MarketDataService.get_tickers({leg for alert in alerts for leg in alert.legs})
+        return render_watchlist(alerts, tickers)
+
+    @staticmethod
+    async def send_due_reports(now: float = None) -> int:
+        """
+        Queue the reports that came due in the scheduler. Returns the number queued.
+
+        All due reports are rendered from one set of tickers fetched for the
+        markets of every due user together, so a report costs no requests of
+        its own; usually the snapshots are already fresh from the alert check.
+        """
+        user_ids = alert_scheduler.take_reports()
+        if not user_ids:
+            return 0
+
+        now = time.time() if now is None else now
+        session = get_session()
+        try:
+            subscriptions = session.query(ReportSubscription).filter(ReportSubscription.user_id.in_(user_ids)).all()
+            offsets = dict(session.query(User.user_id, User.utc_offset).filter(User.user_id.in_(user_ids)).all())
+            alerts = session.query(TokenAlert).filter(TokenAlert.user_id.in_(user_ids)).order_by(TokenAlert.id).all()
+
+            # Рынки каждого пользователя в порядке добавления алертов, без повторов
+            markets = {}
+            legs = set()
+            for alert in alerts:
+                markets.setdefault(alert.user_id, {})[alert.market] = None
+                legs.update(alert.legs)
+            tickers = await MarketDataService.get_tickers(legs)
+
+            queued = 0
+            for subscription in subscriptions:
+                user_markets = list(markets.get(subscription.user_id, ()))
+                # В тихие часы и без отслеживаемых токенов отчёт пропускается
+                if user_markets and not alert_scheduler.is_quiet(subscription.user_id):
+                    DeliveryService.enqueue(subscription.user_id, render_report(user_markets, tickers), parse_mode="HTML")
+                    queued += 1
+
+                subscription.next_run_at = next_report_time(
+                    now, subscription.interval_seconds, subscription.daily_minute, offsets.get(subscription.user_id)
+                )
+                alert_scheduler.schedule(EVENT_REPORT, subscription.user_id, subscription.next_run_at)
+
+            session.commit()
+            logger.info(f"Queued {queued} price reports for {len(subscriptions)} due subscriptions")
+            return queued
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error sending price reports: {e}")
+            return 0
+        finally:
+            session.close()
@@ -1,12 +1,46 @@
 from app.db import get_session, TokenAlert
-from app.services.bybit_service import BybitService
+from app.models.token_alert import (
+    ALERT_TYPE_STEP, ALERT_TYPE_GRID, ALERT_TYPE_LEVEL, ALERT_TYPE_PERCENT, ALERT_TYPE_FUNDING, ALERT_TYPE_OPEN_INTEREST, ALERT_TYPE_BREAKOUT, ALERT_TYPE_TURNOVER, ALERT_TYPE_BOOK_SPREAD, ALERT_TYPE_BOOK_DEPTH, BAND_ALERT_TYPES, DIRECTION_ABOVE, DIRECTION_BELOW, grid_bucket, market_key, parse_market, parse_pair
+)
+from app.services.market_data import MarketDataService
 from loguru import logger
+from sqlalchemy import and_, func, not_, or_
 from sqlalchemy.exc import SQLAlchemyError
 import math
 import time
-from app.settings import POLLING_INTERVAL
+from app.settings import POLLING_INTERVAL, PRICE_RECORD_DIR
+from app.services.alert_engine import AlertEngine, AlertGroup, alert_engine
+from app.services.alert_scheduler import EVENT_EXPIRE, EVENT_UNSNOOZE, alert_scheduler
+from app.utils.price_history import price_recorder
+from app.utils.metrics import ALERT_CHECK_DURATION, ALERTS_TRIGGERED, ALERTS_SUPPRESSED, ACTIVE_ALERTS, ACTIVE_SYMBOLS, ALERT_GROUPS
+from app.utils.logger import debug_enabled
+
+# Группы в одном запросе при загрузке сработавших алертов: ~8 параметров на группу, не больше 999 для старых SQLite
+GROUPS_PER_QUERY = 120
 
 class TokenAlertService:
+    @staticmethod
+    def _market_columns(market: str) -> dict:
+        """TokenAlert column values of a market or pair name (ETH÷BTC: first leg plus pair_symbol), None if invalid."""
+        pair = parse_pair(market)
+        parsed = parse_market(pair[0] if pair else market)
+        if not parsed:
+            return None
+        symbol, quote, category = parsed
+        return {
+            "symbol": symbol,
+            "quote": quote,
+            "category": category,
+            "pair_symbol": pair[1] if pair else None,
+            "pair_operation": pair[2] if pair else None,
+        }
+    
+    @staticmethod
+    def _column_conditions(columns: dict) -> list:
+        """SQL conditions matching alerts with exactly these column values, e.g. the columns of a market or pair."""
+        # Сравнение с None в SQLAlchemy превращается в IS NULL
+        return [getattr(TokenAlert, name) == value for name, value in columns.items()]
+    
     @staticmethod
     async def get_user_alerts(user_id: int) -> list:
         """Get all alerts for a user."""
@@ -30,18 +64,20 @@ class TokenAlertService:
     
     @staticmethod
     async def add_alert(user_id: int, symbol: str, price_multiplier: float) -> TokenAlert:
-        """Add a new token alert."""
+        """Add a new token alert. symbol is a market name: BTC, BTC/USDC, BTC/USDT.P, ..."""
         # First check if the token is valid
-        is_valid = await BybitService.is_token_valid(symbol)
+        is_valid = await MarketDataService.is_valid(symbol)
         if not is_valid:
             return None
         
+        columns = TokenAlertService._market_columns(symbol)
         session = get_session()
         try:
             # Check if alert already exists
             existing = session.query(TokenAlert).filter(
                 TokenAlert.user_id == user_id,
-                TokenAlert.symbol == symbol,
+                *TokenAlertService._column_conditions(columns),
+                TokenAlert.alert_type.in_((ALERT_TYPE_STEP, ALERT_TYPE_GRID)),
                 TokenAlert.price_multiplier == price_multiplier
             ).first()
             
@@ -60,13 +96,14 @@ class TokenAlertService:
                 return existing
             
             # Get current price
-            current_price = await BybitService.get_token_price(symbol)
+            current_price = await MarketDataService.get_price(symbol)
             
-            # Create new alert without last_alert_time parameter
+            # Новые алерты считают шаг от цены последнего алерта; сетка включается кнопкой в настройках алерта
             alert = TokenAlert(
                 user_id=user_id,
-                symbol=symbol,
+                **columns,
                 price_multiplier=price_multiplier,
+                alert_type=ALERT_TYPE_STEP,
                 last_alert_price=current_price
             )
             
@@ -96,6 +133,218 @@ class TokenAlertService:
         finally:
             session.close()
     
+    @staticmethod
+    def _create_alert(user_id: int, market: str, alert_type: str, state: dict = None, **fields) -> TokenAlert:
+        """
+        Add an alert of alert_type on a market, or enable the user's alert with the same fields again.
+
+        fields identify the alert (threshold, window_seconds, direction, ...);
+        state is written to the new or existing alert, e.g. the current price;
+        an existing alert is then placed again in the engine's indexes.
+        Alerts without a price step get price_multiplier 0.
+        """
+        columns = TokenAlertService._market_columns(market)
+        session = get_session()
+        try:
+            existing = session.query(TokenAlert).filter(
+                TokenAlert.user_id == user_id,
+                *TokenAlertService._column_conditions(columns),
+                TokenAlert.alert_type == alert_type,
+                *TokenAlertService._column_conditions(fields)
+            ).first()
+            
+            alert = existing or TokenAlert(
+                user_id=user_id, **columns, alert_type=alert_type, price_multiplier=0, **fields
+            )
+            for name, value in (state or {}).items():
+                setattr(alert, name, value)
+            alert.is_active = True
+            
+            if not existing:
+                session.add(alert)
+            session.commit()
+            if existing:
+                # Индексы уровней и стакана помнят сторону и взвод старой записи
+                alert_engine.forget_level(alert.id)
+            return alert
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error adding {alert_type} alert for user {user_id}, symbol {market}: {e}")
+            return None
+        finally:
+            session.close()
+    
+    @staticmethod
+    async def add_level_alert(user_id: int, symbol: str, level: float, rearm: bool = False) -> TokenAlert:
+        """Add an alert for the price crossing an absolute level. Direction is taken from the current price."""
+        current_price = await MarketDataService.get_price(symbol)
+        if current_price is None or level <= 0 or level == current_price:
+            return None
+        
+        # Повторное добавление того же уровня заново взводит существующий алерт
+        return TokenAlertService._create_alert(user_id, symbol, ALERT_TYPE_LEVEL, threshold=level, state={
+            "direction": DIRECTION_ABOVE if level > current_price else DIRECTION_BELOW,
+            "rearm": rearm,
+            "last_alert_price": current_price,
+            "last_alert_time": time.time(),
+        })
+    
+    @staticmethod
+    async def add_percent_alert(user_id: int, symbol: str, percent: float, window_minutes: int) -> TokenAlert:
+        """Add an alert for the price moving percent % (up or down) within window_minutes."""
+        # Процентные окна только у рынков: у разницы цен (спреда) процент не определён
+        current_price = await MarketDataService.get_price(symbol) if parse_market(symbol) else None
+        if not current_price or percent <= 0 or window_minutes <= 0:
+            return None
+        
+        return TokenAlertService._create_alert(
+            user_id, symbol, ALERT_TYPE_PERCENT, threshold=percent, window_seconds=int(window_minutes * 60),
+            state={"last_alert_price": current_price}
+        )
+    
+    @staticmethod
+    async def add_funding_alert(user_id: int, symbol: str, threshold: float) -> TokenAlert:
+        """Add an alert for the funding rate of a perpetual reaching ±threshold %."""
+        ticker = await MarketDataService.get_ticker(symbol)
+        if not ticker or ticker.funding_rate is None or threshold <= 0:
+            return None
+        
+        # last_value пуст: если ставка уже за порогом, уведомление придёт в ближайшей проверке
+        return TokenAlertService._create_alert(user_id, symbol, ALERT_TYPE_FUNDING, threshold=threshold, state={"last_value": None})
+    
+    @staticmethod
+    async def add_open_interest_alert(user_id: int, symbol: str, percent: float, window_minutes: int) -> TokenAlert:
+        """Add an alert for the open interest of a perpetual moving percent % within window_minutes."""
+        ticker = await MarketDataService.get_ticker(symbol)
+        if not ticker or not ticker.open_interest_value or percent <= 0 or window_minutes <= 0:
+            return None
+        
+        return TokenAlertService._create_alert(
+            user_id, symbol, ALERT_TYPE_OPEN_INTEREST, threshold=percent, window_seconds=int(window_minutes * 60),
+            state={"last_alert_price": ticker.last_price}
+        )
+    
+    @staticmethod
+    async def add_breakout_alert(user_id: int, symbol: str, direction: str = None) -> TokenAlert:
+        """Add an alert for the price breaking the 24h high (above), low (below) or either (None)."""
+        ticker = await MarketDataService.get_ticker(symbol)
+        if not ticker or ticker.high_24h is None or direction not in (None, DIRECTION_ABOVE, DIRECTION_BELOW):
+            return None
+        
+        return TokenAlertService._create_alert(
+            user_id, symbol, ALERT_TYPE_BREAKOUT, direction=direction, state={"last_alert_price": ticker.last_price}
+        )
+    
+    @staticmethod
+    async def add_turnover_alert(user_id: int, symbol: str, percent: float, window_minutes: int) -> TokenAlert:
+        """Add an alert for the 24h turnover rising percent % above its window_minutes baseline."""
+        ticker = await MarketDataService.get_ticker(symbol)
+        if not ticker or not ticker.turnover_24h or percent <= 0 or window_minutes <= 0:
+            return None
+        
+        return TokenAlertService._create_alert(
+            user_id, symbol, ALERT_TYPE_TURNOVER, threshold=percent, window_seconds=int(window_minutes * 60),
+            state={"last_alert_price": ticker.last_price}
+        )
+    
+    @staticmethod
+    async def add_book_alert(user_id: int, symbol: str, alert_type: str, threshold: float) -> TokenAlert:
+        """Add an alert for the bid/ask spread reaching threshold % (book_spread) or the top of book thinning below threshold $ (book_depth)."""
+        ticker = await MarketDataService.get_ticker(symbol)
+        if not ticker or not ticker.bid_price or alert_type not in (ALERT_TYPE_BOOK_SPREAD, ALERT_TYPE_BOOK_DEPTH) or threshold <= 0:
+            return None
+        
+        # Как и у funding-алертов: если стакан уже плохой, уведомление придёт в ближайшей проверке
+        return TokenAlertService._create_alert(user_id, symbol, alert_type, threshold=threshold, state={"last_value": None})
+    
+    @staticmethod
+    async def update_level(alert_id: int, level: float) -> bool:
+        """Move a level alert to a new level and arm it again."""
+        session = get_session()
+        try:
+            alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+            if not alert or not alert.is_level:
+                return False
+            
+            current_price = await MarketDataService.get_price(alert.market)
+            if current_price is None or level <= 0 or level == current_price:
+                return False
+            
+            alert.threshold = level
+            alert.direction = DIRECTION_ABOVE if level > current_price else DIRECTION_BELOW
+            alert.last_alert_price = current_price
+            alert.is_active = True
+            session.commit()
+            alert_engine.forget_level(alert_id)
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error updating level for alert {alert_id}: {e}")
+            return False
+        finally:
+            session.close()
+    
+    @staticmethod
+    async def set_rearm(alert_id: int, rearm: bool) -> bool:
+        """Choose whether a level alert re-arms or disables itself after firing."""
+        session = get_session()
+        try:
+            alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+            if alert:
+                alert.rearm = rearm
+                session.commit()
+                return True
+            return False
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error updating rearm for alert {alert_id}: {e}")
+            return False
+        finally:
+            session.close()
+    
+    @staticmethod
+    async def set_noise_filter(alert_id: int, cooldown_seconds: int = None, hysteresis: float = None) -> bool:
+        """Set the cooldown and hysteresis band of an alert; None or 0 turns a filter off."""
+        session = get_session()
+        try:
+            alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+            if alert:
+                alert.cooldown_seconds = cooldown_seconds or None
+                alert.hysteresis = (hysteresis or None) if alert.alert_type in BAND_ALERT_TYPES else None
+                session.commit()
+                return True
+            return False
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error updating noise filter for alert {alert_id}: {e}")
+            return False
+        finally:
+            session.close()
+    
+    @staticmethod
+    async def set_step_mode(alert_id: int, grid: bool) -> bool:
+        """Switch a step alert between grid lines and distance from the last alert price."""
+        session = get_session()
+        try:
+            alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+            if not alert or alert.alert_type not in (ALERT_TYPE_STEP, ALERT_TYPE_GRID):
+                return False
+            
+            alert.alert_type = ALERT_TYPE_GRID if grid else ALERT_TYPE_STEP
+            # Ячейка определится по первой цене следующей проверки
+            alert.grid_bucket = None
+            # Без линий сетки полосе не к чему относиться
+            if not grid:
+                alert.hysteresis = None
+            session.commit()
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error changing mode of alert {alert_id}: {e}")
+            return False
+        finally:
+            session.close()
+    
     @staticmethod
     async def toggle_alert(alert_id: int, active: bool) -> bool:
         """Toggle an alert on or off."""
@@ -104,7 +353,10 @@ class TokenAlertService:
             alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
             if alert:
                 alert.is_active = active
+                # Ручное включение или выключение отменяет snooze
+                alert.snoozed_until = None
                 session.commit()
+                alert_scheduler.cancel(EVENT_UNSNOOZE, alert_id)
                 return True
             return False
         except SQLAlchemyError as e:
@@ -114,6 +366,51 @@ class TokenAlertService:
         finally:
             session.close()
     
+    @staticmethod
+    async def snooze_alert(alert_id: int, seconds: int) -> float:
+        """Disable an alert for seconds; the scheduler enables it again. Returns the snooze end or None."""
+        session = get_session()
+        try:
+            alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+            if not alert:
+                return None
+            
+            snoozed_until = time.time() + seconds
+            alert.is_active = False
+            alert.snoozed_until = snoozed_until
+            session.commit()
+            alert_scheduler.schedule(EVENT_UNSNOOZE, alert_id, snoozed_until)
+            return snoozed_until
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error snoozing alert {alert_id}: {e}")
+            return None
+        finally:
+            session.close()
+    
+    @staticmethod
+    async def set_expiry(alert_id: int, seconds: int = None) -> bool:
+        """Remove the alert seconds from now; None or 0 keeps it until removed by the user."""
+        session = get_session()
+        try:
+            alert = session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+            if not alert:
+                return False
+            
+            alert.expires_at = time.time() + seconds if seconds else None
+            session.commit()
+            if alert.expires_at:
+                alert_scheduler.schedule(EVENT_EXPIRE, alert_id, alert.expires_at)
+            else:
+                alert_scheduler.cancel(EVENT_EXPIRE, alert_id)
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error setting expiry of alert {alert_id}: {e}")
+            return False
+        finally:
+            session.close()
+    
     @staticmethod
     async def remove_alert(alert_id: int) -> bool:
         """Remove an alert."""
@@ -135,14 +432,7 @@ class TokenAlertService:
     @staticmethod
     def should_alert(current_price: float, last_alert_price: float, price_multiplier: float) -> bool:
         """Determine if an alert should be triggered."""
-        if last_alert_price is None:
-            return True
-        
-        # Определяем абсолютную разницу между текущей и последней ценой алерта
-        price_diff = abs(current_price - last_alert_price)
-        
-        # Алерт срабатывает только если изменение цены больше или равно заданному порогу
-        return price_diff >= price_multiplier
+        return AlertEngine.should_alert(current_price, last_alert_price, price_multiplier)
     
     @staticmethod
     async def update_last_alert_price(alert_id: int, new_price: float) -> bool:
@@ -153,6 +443,7 @@ class TokenAlertService:
             if alert:
                 alert.last_alert_price = new_price
                 session.commit()
+                alert_engine.forget_level(alert_id)
                 return True
             return False
         except SQLAlchemyError as e:
@@ -163,105 +454,201 @@ class TokenAlertService:
             session.close()
     
     @staticmethod
-    async def check_price_alerts() -> list:
-        """Check all active alerts for price changes that trigger notifications."""
+    def _load_alert_groups(session, skip_users=None) -> list:
+        """Active step and grid alerts aggregated into AlertGroups by market, configuration and state."""
+        market = (TokenAlert.symbol, TokenAlert.quote, TokenAlert.category)
+        skipped = TokenAlertService._skip(skip_users)
+        step_rows = session.query(
+            *market, TokenAlert.price_multiplier, TokenAlert.last_alert_price, func.count()
+        ).filter(
+            TokenAlert.is_active == True, TokenAlert.alert_type == ALERT_TYPE_STEP, *TokenAlertService._groupable(), *skipped
+        ).group_by(*market, TokenAlert.price_multiplier, TokenAlert.last_alert_price).all()
+        
+        # Сеточные алерты различаются только ячейкой, цена последнего алерта на решение не влияет
+        grid_rows = session.query(
+            *market, TokenAlert.price_multiplier, TokenAlert.grid_bucket, func.count()
+        ).filter(
+            TokenAlert.is_active == True, TokenAlert.alert_type == ALERT_TYPE_GRID, *TokenAlertService._groupable(), *skipped
+        ).group_by(*market, TokenAlert.price_multiplier, TokenAlert.grid_bucket).all()
+        
+        groups = [
+            AlertGroup(ALERT_TYPE_STEP, market_key(symbol, quote, category), step, last_price, None, size)
+            for symbol, quote, category, step, last_price, size in step_rows
+        ]
+        groups += [
+            AlertGroup(ALERT_TYPE_GRID, market_key(symbol, quote, category), step, None, bucket, size)
+            for symbol, quote, category, step, bucket, size in grid_rows
+        ]
+        return groups
+    
+    @staticmethod
+    def _groupable() -> list:
+        """
+        SQL conditions of step and grid alerts that can share a group.
+        
+        Pairs need both legs, and a cooldown depends on each alert's own
+        last_alert_time, so such alerts are evaluated one by one.
+        """
+        return [TokenAlert.pair_symbol.is_(None), TokenAlert.cooldown_seconds.is_(None), TokenAlert.hysteresis.is_(None)]
+    
+    @staticmethod
+    def _skip(skip_users) -> list:
+        """SQL conditions leaving out the alerts of skip_users."""
+        return [TokenAlert.user_id.notin_(skip_users)] if skip_users else []
+    
+    @staticmethod
+    def _group_filter(key: tuple, skip_users=None):
+        """SQL condition matching the active members of a group loaded with this key."""
+        alert_type, market, step, last_price, bucket = key
+        symbol, quote, category = parse_market(market)
+        conditions = [
+            TokenAlert.is_active == True,
+            TokenAlert.alert_type == alert_type,
+            TokenAlert.symbol == symbol,
+            TokenAlert.quote == quote,
+            TokenAlert.category == category,
+            TokenAlert.price_multiplier == step,
+            *TokenAlertService._groupable(),
+            *TokenAlertService._skip(skip_users),
+        ]
+        if alert_type == ALERT_TYPE_STEP:
+            conditions.append(TokenAlert.last_alert_price.is_(None) if last_price is None else TokenAlert.last_alert_price == last_price)
+        else:
+            conditions.append(TokenAlert.grid_bucket.is_(None) if bucket is None else TokenAlert.grid_bucket == bucket)
+        return and_(*conditions)
+    
+    @staticmethod
+    def _member_key(alert: TokenAlert) -> tuple:
+        if alert.is_grid:
+            return (ALERT_TYPE_GRID, alert.market, alert.price_multiplier, None, alert.grid_bucket)
+        return (ALERT_TYPE_STEP, alert.market, alert.price_multiplier, alert.last_alert_price, None)
+    
+    @staticmethod
+    def _fan_out_groups(session, groups: list, triggered: list, now: float, skip_users=None) -> list:
+        """
+        Replace group triggers with one trigger per member alert and persist group state.
+        
+        Only members of triggered groups are loaded as TokenAlert rows; groups that
+        changed state silently (first price seen) are updated with one UPDATE each.
+        """
+        alerts_to_send = []
+        group_items = {}
+        for item in triggered:
+            if isinstance(item["alert"], AlertGroup):
+                group_items[item["alert"].key] = item
+            else:
+                alerts_to_send.append(item)
+        
+        for group in groups:
+            if group.key in group_items or not group.changed:
+                continue
+            session.query(TokenAlert).filter(TokenAlertService._group_filter(group.key, skip_users)).update(
+                {"last_alert_price": group.last_alert_price, "grid_bucket": group.grid_bucket},
+                synchronize_session=False,
+            )
+        
+        keys = list(group_items)
+        for start in range(0, len(keys), GROUPS_PER_QUERY):
+            chunk = keys[start:start + GROUPS_PER_QUERY]
+            members = session.query(TokenAlert).filter(
+                or_(*(TokenAlertService._group_filter(key, skip_users) for key in chunk))
+            ).order_by(TokenAlert.id).all()
+            
+            for alert in members:
+                item = group_items.get(TokenAlertService._member_key(alert))
+                if item is None:
+                    continue
+                group = item["alert"]
+                member_item = dict(item)
+                member_item["alert"] = alert
+                member_item["previous_price"] = alert.last_alert_price
+                member_item["old_alert_time"] = alert.last_alert_time
+                # Состояние участника совпадает с новым состоянием группы
+                alert.last_alert_price = group.last_alert_price
+                alert.last_alert_time = now
+                alert.grid_bucket = group.grid_bucket
+                alerts_to_send.append(member_item)
+        
+        return alerts_to_send
+    
+    @staticmethod
+    async def check_price_alerts(skip_users=None) -> list:
+        """
+        Check all active alerts for price changes that trigger notifications.
+        
+        Alerts of skip_users (users in quiet hours) are left out entirely: they
+        keep their state and are evaluated against the price once the user is
+        back, instead of firing silently in the meantime.
+        """
+        check_started = time.perf_counter()
         session = get_session()
         alerts_to_send = []
         current_time = time.time()  # Текущее время в секундах
+        # Логи по каждому алерту форматируем только если DEBUG действительно включен
+        debug = debug_enabled()
         
         try:
-            # Get all active alerts
-            active_alerts = session.query(TokenAlert).filter(TokenAlert.is_active == True).all()
+            # Step and grid alerts with the same configuration and state are loaded as shared groups
+            groups = TokenAlertService._load_alert_groups(session, skip_users)
+            # Pair alerts (ETH÷BTC) and alerts with noise filters are evaluated individually
+            other_alerts = session.query(TokenAlert).filter(
+                TokenAlert.is_active == True,
+                or_(TokenAlert.alert_type.notin_((ALERT_TYPE_STEP, ALERT_TYPE_GRID)), not_(and_(*TokenAlertService._groupable()))),
+                *TokenAlertService._skip(skip_users),
+            ).all()
+            active_count = sum(group.size for group in groups) + len(other_alerts)
             
-            if not active_alerts:
+            ACTIVE_ALERTS.set(active_count)
+            ALERT_GROUPS.set(len(groups))
+            
+            if not active_count:
+                ACTIVE_SYMBOLS.set(0)
                 logger.debug("No active alerts found to check")
                 return []
                 
-            logger.debug(f"Checking {len(active_alerts)} active alerts")
+            logger.debug("Checking {} active alerts in {} step/grid groups and {} other alerts", active_count, len(groups), len(other_alerts))
             
-            # Group alerts by symbol to minimize API calls
-            symbols = set(alert.symbol for alert in active_alerts)
-            logger.debug(f"Fetching prices for {len(symbols)} symbols: {', '.join(symbols)}")
+            # One bulk ticker request per category in use instead of one request per symbol
+            markets = set(group.market for group in groups) | set(leg for alert in other_alerts for leg in alert.legs)
+            ACTIVE_SYMBOLS.set(len(markets))
+            if debug:
+                logger.debug(f"Fetching prices for {len(markets)} markets: {', '.join(markets)}")
             
-            # Get prices for all symbols
-            prices = {}
-            for symbol in symbols:
-                price = await BybitService.get_token_price(symbol)
-                if price:
-                    prices[symbol] = price
-                    logger.debug(f"Fetched price for {symbol}: ${price:,.2f}")
-                else:
-                    logger.warning(f"Failed to fetch price for {symbol}")
+            # Снимок обновляется каждый цикл, кэш используется только вне проверки алертов
+            tickers = await MarketDataService.get_tickers(markets, max_age=0)
+            prices = {market: ticker.last_price for market, ticker in tickers.items()}
+            for market in markets - prices.keys():
+                logger.warning(f"Failed to fetch price for {market}")
             
-            # First, find all alerts that should be triggered
-            alerts_to_trigger = []
-            for alert in active_alerts:
-                if alert.symbol not in prices:
-                    continue
-                
-                current_price = prices[alert.symbol]
-                previous_price = alert.last_alert_price  # Запоминаем предыдущую цену
-                
-                if previous_price is None:
-                    # Если предыдущей цены нет, устанавливаем текущую и пропускаем
-                    alert.last_alert_price = current_price
-                    continue
-                
-                price_diff = abs(current_price - previous_price)
-                
-                logger.debug(f"Checking alert for {alert.symbol} (user: {alert.user_id}): current=${current_price:,.2f}, prev=${previous_price:,.2f}, diff=${price_diff:,.2f}, step=${alert.price_multiplier:g}")
-                
-                # Проверяем, нужно ли отправлять уведомление
-                should_send = TokenAlertService.should_alert(current_price, previous_price, alert.price_multiplier)
-                
-                if should_send:
-                    logger.debug(f"Alert condition triggered for {alert.symbol}: price change (${price_diff:,.2f}) >= step (${alert.price_multiplier:g})")
-                    
-                    # Сохраняем старое время ДО обновления
-                    old_alert_time = getattr(alert, 'last_alert_time', None)
-                    
-                    alerts_to_trigger.append({
-                        "alert": alert,
-                        "current_price": current_price,
-                        "previous_price": previous_price,
-                        "old_alert_time": old_alert_time  # Добавляем старое время
-                    })
+            if PRICE_RECORD_DIR and prices:
+                await price_recorder.record(current_time, prices)
             
-            # Now update last_alert_price for all alerts that need to be triggered
-            # and prepare them for sending
-            for alert_data in alerts_to_trigger:
-                alert = alert_data["alert"]
-                current_price = alert_data["current_price"]
-                
-                # ВАЖНО: обновляем last_alert_price и last_alert_time ТОЛЬКО при отправке уведомления
-                alert.last_alert_price = current_price
-                # Пробуем обновить last_alert_time, если он есть
-                try:
-                    if hasattr(alert, 'last_alert_time'):
-                        alert.last_alert_time = current_time
-                        logger.debug(f"Updated last_alert_time for {alert.symbol} to {current_time}")
-                except Exception as e:
-                    logger.warning(f"Could not update last_alert_time for alert {alert.id}: {e}")
-                
-                logger.debug(f"Updated last_alert_price for {alert.symbol} to ${current_price:,.2f}")
-                alerts_to_send.append(alert_data)
+            # Evaluate groups and the remaining alerts; each group once, then fanned out to its members
+            triggered = alert_engine.evaluate(groups + other_alerts, prices, current_time, debug, tickers)
+            alerts_to_send = TokenAlertService._fan_out_groups(session, groups, triggered, current_time, skip_users)
+            for reason, count in alert_engine.suppressed.items():
+                ALERTS_SUPPRESSED.inc(count, reason=reason)
             
             # Выполняем явный коммит для сохранения изменений
             session.commit()
-            logger.debug(f"Committed changes for {len(active_alerts)} alerts")
+            logger.debug("Committed changes for {} alerts", active_count)
+            ALERTS_TRIGGERED.inc(len(alerts_to_send))
             
             if alerts_to_send:
-                logger.debug(f"Found {len(alerts_to_send)} alerts to send")
+                logger.debug("Found {} alerts to send", len(alerts_to_send))
             else:
                 logger.debug("No alerts triggered")
                 
             return alerts_to_send
         except SQLAlchemyError as e:
             session.rollback()
+            # Индекс уровней уже учёл несохранённые срабатывания, строится заново из базы
+            alert_engine.forget_level()
             logger.error(f"Error checking price alerts: {e}")
             return []
         finally:
             session.close()
+            ALERT_CHECK_DURATION.observe(time.perf_counter() - check_started)
     
     @staticmethod
     async def update_threshold(alert_id: int, new_threshold: float) -> bool:
@@ -275,11 +662,14 @@ class TokenAlertService:
             if alert:
                 # Обновляем threshold
                 alert.price_multiplier = new_threshold
+                alert.grid_bucket = None
                 # Получаем текущую цену для нового расчета алертов
-                current_price = await BybitService.get_token_price(alert.symbol)
+                current_price = await MarketDataService.get_price(alert.market)
                 # Обновляем last_alert_price, чтобы расчет начался с новой точки
-                if current_price:
+                if current_price is not None:
                     alert.last_alert_price = current_price
+                    if alert.is_grid:
+                        alert.grid_bucket = grid_bucket(current_price, new_threshold)
                     # Пробуем обновить время последнего алерта, если оно есть
                     try:
                         if hasattr(alert, 'last_alert_time'):
@@ -3,6 +3,7 @@ from app.settings import BOT_ADMINS
 from loguru import logger
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional, List
+from app.services.alert_scheduler import alert_scheduler
 
 class UserService:
     @staticmethod
@@ -11,7 +12,7 @@ class UserService:
         session = get_session()
         try:
             user = session.query(User).filter(User.user_id == user_id).first()
-            logger.debug(f"Retrieved user from DB: {user_id} (exists: {user is not None})")
+            logger.debug("Retrieved user from DB: {} (exists: {})", user_id, user is not None)
             return user
         except SQLAlchemyError as e:
             logger.error(f"Error getting user {user_id}: {e}")
@@ -199,4 +200,26 @@ class UserService:
             logger.error(f"Error getting pending users: {e}")
             return []
         finally:
-            session.close() 
\ No newline at end of file
+            session.close() 
+    
+    @staticmethod
+    async def set_quiet_hours(user_id: int, start: int = None, end: int = None, utc_offset: int = 0) -> bool:
+        """Set quiet hours as minutes of the user's local day (UTC offset in minutes); None turns them off."""
+        session = get_session()
+        try:
+            user = session.query(User).filter(User.user_id == user_id).first()
+            if not user:
+                return False
+            
+            user.quiet_start = start
+            user.quiet_end = end
+            user.utc_offset = utc_offset
+            session.commit()
+            alert_scheduler.set_quiet_hours(user_id, start, end, utc_offset)
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error setting quiet hours for user {user_id}: {e}")
+            return False
+        finally:
+            session.close()
\ No newline at end of file
@@ -8,13 +8,36 @@ load_dotenv()
 # Bot settings
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 BOT_ADMINS = list(map(int, os.getenv("BOT_ADMINS", "").split(",")))
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")  # Custom Bot API server (local server or a test stand-in), empty = api.telegram.org
+
+# Telegram delivery settings
+TELEGRAM_RATE_LIMIT = float(os.getenv("TELEGRAM_RATE_LIMIT", 25))  # Messages per second across the whole bot
+TELEGRAM_SEND_RETRIES = int(os.getenv("TELEGRAM_SEND_RETRIES", 3))
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", 10))  # Concurrent senders draining the alert delivery queue
+
+# Broadcast settings
+BROADCAST_CHUNK_SIZE = int(os.getenv("BROADCAST_CHUNK_SIZE", 200))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 10))
 
 # Bybit API settings
 POLLING_INTERVAL = int(os.getenv("POLLING_INTERVAL", 60))
+MARKET_SNAPSHOT_TTL = float(os.getenv("MARKET_SNAPSHOT_TTL", 10))  # Seconds a bulk ticker snapshot serves validation, quotes and lists
+PRICE_RECORD_DIR = os.getenv("PRICE_RECORD_DIR", "")  # Record every price snapshot for replay, empty disables
+
+# Metrics
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # 0 disables the /metrics endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+
+# Profiling
+PROFILE_DEFAULT_SECONDS = int(os.getenv("PROFILE_DEFAULT_SECONDS", 30))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))  # Seconds between stack samples
+SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", 0))  # Log event loop callbacks slower than this, 0 disables
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = Path("logs/bot.log")
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() in ("1", "true", "yes")  # Write the log file as JSON lines
+LOG_ENQUEUE = os.getenv("LOG_ENQUEUE", "")  # true/false: write logs from a background thread, empty = only in the bot itself
 
 # Database
 DATABASE_URL = f"sqlite:///{Path('data/database.sqlite3')}"
@@ -29,4 +52,35 @@ DEFAULT_PRICE_THRESHOLDS = {
 }
 
 # Default available price multipliers
-AVAILABLE_PRICE_MULTIPLIERS = [0.001, 0.01, 0.1, 0.2, 0.5, 1, 10, 100, 1000, 10000] 
\ No newline at end of file
+AVAILABLE_PRICE_MULTIPLIERS = [0.001, 0.01, 0.1, 0.2, 0.5, 1, 10, 100, 1000, 10000]
+
+# Percent move alerts: (move in %, window in minutes) offered as buttons
+AVAILABLE_PERCENT_MOVES = [(2, 15), (3, 60), (5, 60), (10, 240), (10, 1440)]
+MAX_PERCENT_WINDOW_MINUTES = 1440
+
+# Perpetuals: funding rate thresholds in % per funding interval and open interest moves (%, minutes)
+AVAILABLE_FUNDING_THRESHOLDS = [0.02, 0.05, 0.1, 0.2]
+AVAILABLE_OPEN_INTEREST_MOVES = [(5, 60), (10, 240), (20, 1440)]
+
+# Volume spike alerts: (turnover % above baseline, baseline window in minutes) offered as buttons
+AVAILABLE_TURNOVER_SPIKES = [(25, 60), (50, 60), (100, 240)]
+
+# Order book alerts offered as buttons: bid/ask spread in % of the mid price, top of book depth in quote currency
+AVAILABLE_SPREAD_THRESHOLDS = [0.05, 0.1, 0.5, 1]
+AVAILABLE_DEPTH_THRESHOLDS = [10000, 50000, 250000]
+
+# Alert noise filters offered in alert options, cycled by a button: cooldown in seconds, hysteresis band in % (0 = off)
+COOLDOWN_OPTIONS = [0, 300, 900, 3600]
+HYSTERESIS_OPTIONS = [0, 0.1, 0.25, 0.5]
+
+# Snooze durations offered in alert options and expiry options cycled by a button, in seconds (0 = never)
+SNOOZE_OPTIONS = [3600, 7200, 28800]
+EXPIRY_OPTIONS = [0, 86400, 604800]
+
+# Scheduled price reports offered as buttons: intervals in seconds and daily times as minutes of the user's local day
+REPORT_INTERVALS = [3600, 14400]
+REPORT_DAILY_TIMES = [540, 1260]
+
+# Top movers view: markets per list and the minimum 24h turnover in quote currency to be ranked
+TOP_MOVERS_COUNT = 5
+TOP_MOVERS_MIN_TURNOVER = 100000
\ No newline at end of file
@@ -1,3 +1,4 @@
 from app.utils.logger import setup_logger
+from app.utils.rate_limiter import AsyncRateLimiter
 
-__all__ = ["setup_logger"] 
\ No newline at end of file
+__all__ = ["setup_logger", "AsyncRateLimiter"]
\ No newline at end of file
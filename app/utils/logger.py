@@ -1,9 +1,30 @@
 import sys
 from loguru import logger
-from app.settings import LOG_LEVEL, LOG_FILE
+from app.settings import LOG_LEVEL, LOG_FILE, LOG_JSON, LOG_ENQUEUE
 
-def setup_logger():
-    """Configure logger."""
+_debug_enabled = True
+
+def debug_enabled() -> bool:
+    """
+    Check whether DEBUG records reach any sink.
+    
+    Hot paths call this once per cycle and skip building per-item debug
+    messages entirely when it returns False.
+    """
+    return _debug_enabled
+
+def setup_logger(enqueue: bool = False):
+    """
+    Configure logger.
+    
+    enqueue writes records from a background thread; the bot turns it on,
+    tools and benchmarks keep synchronous sinks. LOG_ENQUEUE overrides it.
+    """
+    global _debug_enabled
+    
+    if LOG_ENQUEUE:
+        enqueue = LOG_ENQUEUE.lower() in ("1", "true", "yes")
+    
     # Remove default handlers
     logger.remove()
     
@@ -11,18 +32,24 @@ def setup_logger():
     logger.add(
         sys.stderr,
         level=LOG_LEVEL,
+        enqueue=enqueue,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
     )
     
-    # Add file handler
+    # Add file handler. With enqueue records are written by a background thread,
+    # so slow disk I/O and log rotation never block the event loop
     logger.add(
         LOG_FILE,
         rotation="10 MB",
         retention="1 week",
         level=LOG_LEVEL,
+        enqueue=enqueue,
+        serialize=LOG_JSON,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
     )
     
+    _debug_enabled = logger.level(LOG_LEVEL).no <= logger.level("DEBUG").no
+    
     logger.info(f"Logger initialized with level {LOG_LEVEL}")
     
     return logger 
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Minimal Prometheus-compatible metrics.
+
+Metrics live in process memory and are exposed in the Prometheus text
+format by a small aiohttp server started from app.bot.main.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from aiohttp import web
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        if not self.labelnames:
+            # Unlabelled series are exported as zero before the first update
+            self._values[()] = self._empty()
+        _registry.append(self)
+
+    def _empty(self):
+        return 0
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _empty(self):
+        # [bucket counts..., +Inf count, sum]
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = self._empty()
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the wrapped block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+def render_metrics() -> str:
+    """Render all registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Hot path metrics
+ALERT_CHECK_DURATION = Histogram(
+    "bot_alert_check_duration_seconds", "Duration of one check_price_alerts cycle"
+)
+BYBIT_REQUEST_DURATION = Histogram(
+    "bot_bybit_request_duration_seconds", "Latency of Bybit API requests", ("endpoint",)
+)
+TELEGRAM_SEND_DURATION = Histogram(
+    "bot_telegram_send_duration_seconds", "Latency of Telegram send_message calls"
+)
+ALERTS_TRIGGERED = Counter("bot_alerts_triggered_total", "Alerts whose condition was met")
+ALERTS_SUPPRESSED = Counter("bot_alerts_suppressed_total", "Alert notifications held back by cooldown or hysteresis", ("reason",))
+ALERTS_SENT = Counter("bot_alerts_sent_total", "Alert messages delivered to Telegram")
+ALERTS_FAILED = Counter("bot_alerts_failed_total", "Alert messages that could not be delivered")
+DELIVERY_QUEUE_SIZE = Gauge("bot_delivery_queue_size", "Messages waiting in the delivery queue")
+ACTIVE_ALERTS = Gauge("bot_active_alerts", "Active alerts checked in the last cycle")
+ALERT_GROUPS = Gauge("bot_alert_groups", "Shared step/grid alert groups evaluated in the last cycle")
+ACTIVE_SYMBOLS = Gauge("bot_active_symbols", "Distinct symbols checked in the last cycle")
+EVENT_LOOP_LAG = Gauge("bot_event_loop_lag_seconds", "Delay of a scheduled wake-up on the event loop")
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """Measure how late the event loop wakes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - start - interval))
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Start the /metrics HTTP endpoint on the running event loop."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    logger.info(f"Metrics server listening on http://{host}:{port}/metrics")
+    return runner
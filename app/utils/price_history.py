@@ -0,0 +1,114 @@
+"""
+Recording and reading of price snapshots.
+
+Snapshots are stored as gzip-compressed JSON lines, one line per alert
+check cycle: {"t": <unix time>, "p": {"BTC": 65000.5, ...}}. A new file is
+started every UTC day (prices-YYYYMMDD.jsonl.gz). The file stays open and
+is sync-flushed after every cycle, so compression keeps its dictionary
+across lines while a file cut short by a crash stays readable up to the
+last flushed cycle.
+
+CSV series are accepted for replay in two layouts:
+  * long: timestamp,symbol,price (one row per symbol and time);
+  * wide: timestamp,BTC,ETH,... (one row per time).
+Timestamps are unix seconds or ISO 8601.
+"""
+import asyncio
+import csv
+import gzip
+import json
+import time
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from loguru import logger
+from app.settings import PRICE_RECORD_DIR
+
+class PriceRecorder:
+    def __init__(self, directory: str):
+        self.directory = Path(directory) if directory else None
+        self._path = None
+        self._file = None
+
+    def path_for(self, timestamp: float) -> Path:
+        return self.directory / f"prices-{time.strftime('%Y%m%d', time.gmtime(timestamp))}.jsonl.gz"
+
+    def _write(self, timestamp: float, prices: dict):
+        path = self.path_for(timestamp)
+        if path != self._path:
+            self.close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(path, "at", encoding="utf-8")
+            self._path = path
+        line = json.dumps({"t": round(timestamp, 3), "p": prices}, separators=(",", ":"))
+        self._file.write(line + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+        self._path = None
+
+    async def record(self, timestamp: float, prices: dict):
+        """Append one snapshot. File I/O runs in a thread so the event loop is not blocked."""
+        if not self.directory:
+            return
+        try:
+            await asyncio.to_thread(self._write, timestamp, dict(prices))
+        except OSError as e:
+            logger.error(f"Failed to record price snapshot: {e}")
+
+def _parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.strip()).timestamp()
+
+def read_snapshots(path) -> iter:
+    """Yield (timestamp, prices) from a recorded .jsonl or .jsonl.gz file."""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield float(record["t"]), record["p"]
+        except EOFError:
+            # Файл текущего дня ещё пишется или бот был остановлен аварийно
+            pass
+
+def read_csv(path) -> iter:
+    """Yield (timestamp, prices) from a long or wide CSV file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader)]
+
+        if "symbol" in header and "price" in header:
+            t = header.index("timestamp") if "timestamp" in header else 0
+            s, p = header.index("symbol"), header.index("price")
+            rows = (row for row in reader if row)
+            for timestamp, group in groupby(rows, key=lambda row: row[t]):
+                yield _parse_timestamp(timestamp), {row[s].strip().upper(): float(row[p]) for row in group}
+        else:
+            symbols = [column.upper() for column in header[1:]]
+            for row in reader:
+                if not row:
+                    continue
+                prices = {symbol: float(value) for symbol, value in zip(symbols, row[1:]) if value.strip()}
+                yield _parse_timestamp(row[0]), prices
+
+def load_series(path) -> iter:
+    """Yield (timestamp, prices) from a recording, a CSV file or a directory of recordings."""
+    path = Path(path)
+    if path.is_dir():
+        for file in sorted(path.glob("prices-*.jsonl*")):
+            yield from read_snapshots(file)
+    elif path.suffix.lower() == ".csv":
+        yield from read_csv(path)
+    else:
+        yield from read_snapshots(path)
+
+# Recorder used by check_price_alerts when PRICE_RECORD_DIR is set
+price_recorder = PriceRecorder(PRICE_RECORD_DIR)
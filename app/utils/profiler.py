@@ -0,0 +1,148 @@
+"""
+On-demand profiling of the running bot.
+
+A background thread samples the event loop thread's call stack and writes
+the result in collapsed-stack format (one ``frame;frame;frame count`` line
+per unique stack), which flamegraph.pl and speedscope can read directly.
+Everything the bot does - alert worker, handlers and synchronous DB calls -
+runs on the event loop thread, so it all shows up in the samples.
+Alternatively cProfile can be switched on for the loop thread and dumped
+as a pstats file.
+"""
+import asyncio
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from loguru import logger
+from app.settings import LOG_FILE, PROFILE_DEFAULT_SECONDS, PROFILE_SAMPLE_INTERVAL
+
+PROFILE_DIR = LOG_FILE.parent
+
+_profile_running = False
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _sample_stacks(thread_id: int, duration: float, interval: float) -> Counter:
+    """Sample the stack of another thread. Runs in a worker thread."""
+    stacks = Counter()
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+
+    return stacks
+
+def _top_functions(stacks: Counter, limit: int = 10) -> list:
+    """Functions with the most samples on top of the stack (self time)."""
+    own = Counter()
+    for stack, count in stacks.items():
+        own[stack.rsplit(";", 1)[-1]] += count
+    return own.most_common(limit)
+
+def is_profiling() -> bool:
+    return _profile_running
+
+async def capture_profile(seconds: float = PROFILE_DEFAULT_SECONDS, mode: str = "sampling") -> tuple:
+    """
+    Profile the event loop for the given number of seconds.
+
+    Returns (artifact path, summary text). Mode is "sampling" for a
+    collapsed-stack file or "pstats" for a cProfile dump.
+    """
+    global _profile_running
+    if _profile_running:
+        raise RuntimeError("Profiling is already in progress")
+
+    _profile_running = True
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+
+    try:
+        logger.info(f"Profiling event loop for {seconds}s ({mode})")
+
+        if mode == "pstats":
+            path = PROFILE_DIR / f"profile-{timestamp}.pstats"
+            # cProfile hooks the current thread, which is the event loop thread
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+            profiler.dump_stats(path)
+            summary = f"cProfile stats written to {path}"
+        else:
+            path = PROFILE_DIR / f"profile-{timestamp}.collapsed"
+            # This coroutine runs on the event loop thread, so sample the current thread
+            stacks = await asyncio.to_thread(
+                _sample_stacks, threading.get_ident(), seconds, PROFILE_SAMPLE_INTERVAL
+            )
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            total = sum(stacks.values())
+            lines = [f"{total} samples written to {path}", "Top functions (self samples):"]
+            for label, count in _top_functions(stacks):
+                lines.append(f"{count / total * 100:5.1f}% {label}" if total else label)
+            summary = "\n".join(lines)
+
+        logger.info(summary)
+        return path, summary
+    finally:
+        _profile_running = False
+
+def install_profile_signal_handler(loop: asyncio.AbstractEventLoop):
+    """Start a sampling profile on SIGUSR1 (`kill -USR1 <pid>`)."""
+    if not hasattr(signal, "SIGUSR1"):
+        return
+
+    def _on_signal():
+        if _profile_running:
+            logger.warning("SIGUSR1 received but profiling is already in progress")
+            return
+        loop.create_task(capture_profile())
+
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, _on_signal)
+        logger.info("Send SIGUSR1 to capture a profile of the running bot")
+    except (NotImplementedError, RuntimeError) as e:
+        logger.debug(f"Could not install SIGUSR1 profiling handler: {e}")
+
+class _LoguruHandler(logging.Handler):
+    """Forward records from the stdlib logging module to loguru."""
+
+    def emit(self, record: logging.LogRecord):
+        logger.opt(exception=record.exc_info).log(record.levelname, f"[{record.name}] {record.getMessage()}")
+
+def enable_slow_callback_logging(loop: asyncio.AbstractEventLoop, threshold: float):
+    """
+    Log every event loop callback that blocks longer than threshold seconds.
+
+    Uses asyncio debug mode, which adds noticeable overhead, so it is only
+    enabled through the SLOW_CALLBACK_MS setting.
+    """
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
+
+    asyncio_logger = logging.getLogger("asyncio")
+    asyncio_logger.setLevel(logging.WARNING)
+    asyncio_logger.addHandler(_LoguruHandler())
+    asyncio_logger.propagate = False
+
+    logger.info(f"Slow callback logging enabled (threshold {threshold * 1000:g} ms)")
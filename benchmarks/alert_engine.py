@@ -0,0 +1,196 @@
+"""
+Synthetic load benchmark for the alert engine.
+
+For every scale USERSxALERTSxSYMBOLS (users, alerts per user, distinct
+symbols) a fresh temporary SQLite database is seeded, BybitService is
+replaced by a deterministic price generator and check_price_alerts is run
+for a number of cycles. Reported per scale:
+
+  * cycle time (median / p95) and throughput in alerts per second;
+  * time spent in session.commit (flush + COMMIT);
+  * peak Python memory allocated during one cycle (tracemalloc) and the
+    process max RSS;
+  * alerts triggered per cycle;
+  * shared alert groups evaluated instead of individual alerts and the
+    share of per-alert evaluations this saves. Seeded step alerts start
+    from different last alert prices, so groups form only as alerts fire
+    together over the cycles; alert_groups_per_cycle shows how.
+
+Results are JSON. Pass --compare with a previous results file to print the
+change per scale and exit with status 1 when a cycle got slower than
+--max-regression percent.
+
+Usage:
+    python -m benchmarks.alert_engine --scale 100x5x20 --scale 1000x10x200 --cycles 5 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database, write_results, environment_info, INVOCATION_DIR, REPO_ROOT
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import app
+from app.services.token_alert_service import TokenAlertService
+from app.utils.metrics import ALERT_GROUPS
+
+DEFAULT_SCALES = ["100x5x20", "1000x10x100", "5000x10x200"]
+
+class CommitTimer:
+    """Accumulates time spent between before_commit and after_commit of every session."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self._started = None
+        event.listen(Session, "before_commit", self._before)
+        event.listen(Session, "after_commit", self._after)
+
+    def _before(self, session):
+        self._started = time.perf_counter()
+
+    def _after(self, session):
+        if self._started is not None:
+            self.total += time.perf_counter() - self._started
+            self.count += 1
+            self._started = None
+
+    def reset(self):
+        self.total = 0.0
+        self.count = 0
+
+def parse_scale(value: str) -> tuple:
+    users, alerts, symbols = (int(part) for part in value.lower().split("x"))
+    return users, alerts, symbols
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+async def run_scale(users: int, alerts_per_user: int, symbols: int, cycles: int, commit_timer: CommitTimer, alert_type: str = "step") -> dict:
+    generator = PriceGenerator(symbols)
+    stub_bybit(generator)
+
+    seed_started = time.perf_counter()
+    total_alerts = seed_database(users, alerts_per_user, generator, alert_type=alert_type)
+    seed_seconds = time.perf_counter() - seed_started
+
+    # Warm-up cycle: first query compiles statements and fills caches
+    await TokenAlertService.check_price_alerts()
+
+    cycle_times = []
+    commit_times = []
+    triggered = []
+    groups_per_cycle = []
+    for _ in range(cycles):
+        generator.advance()
+        commit_timer.reset()
+        start = time.perf_counter()
+        alerts = await TokenAlertService.check_price_alerts()
+        cycle_times.append(time.perf_counter() - start)
+        commit_times.append(commit_timer.total)
+        triggered.append(len(alerts))
+        groups_per_cycle.append(ALERT_GROUPS.get())
+
+    # Memory is measured on a separate cycle because tracing slows everything down
+    generator.advance()
+    tracemalloc.start()
+    await TokenAlertService.check_price_alerts()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(cycle_times)
+    groups = ALERT_GROUPS.get()
+    return {
+        "scale": f"{users}x{alerts_per_user}x{symbols}",
+        "alert_type": alert_type,
+        "users": users,
+        "alerts_per_user": alerts_per_user,
+        "symbols": symbols,
+        "alerts": total_alerts,
+        "cycles": cycles,
+        "seed_seconds": seed_seconds,
+        "cycle_seconds_median": median,
+        "cycle_seconds_p95": percentile(cycle_times, 95),
+        "alerts_per_second": total_alerts / median if median else None,
+        "commit_seconds_median": statistics.median(commit_times),
+        "triggered_per_cycle_median": statistics.median(triggered),
+        "alert_groups": groups,
+        "alert_groups_per_cycle": groups_per_cycle,
+        "alerts_per_group": total_alerts / groups if groups else None,
+        "evaluations_saved_pct": (1 - groups / total_alerts) * 100 if total_alerts else None,
+        "peak_traced_memory_mb": peak / 2 ** 20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def compare(results: dict, baseline_path: str, max_regression: float) -> bool:
+    """Print per-scale changes against a baseline. Returns False on regression."""
+    with open(INVOCATION_DIR / baseline_path) as f:
+        baseline = {item["scale"]: item for item in json.load(f)["results"]}
+
+    ok = True
+    for item in results["results"]:
+        previous = baseline.get(item["scale"])
+        if not previous:
+            continue
+        change = (item["cycle_seconds_median"] / previous["cycle_seconds_median"] - 1) * 100
+        memory = item["peak_traced_memory_mb"] - previous["peak_traced_memory_mb"]
+        status = "REGRESSION" if change > max_regression else "ok"
+        print(f"{item['scale']:>16}: cycle {change:+6.1f}%  memory {memory:+8.2f} MB  {status}", file=sys.stderr)
+        if change > max_regression:
+            ok = False
+    return ok
+
+async def run(args) -> dict:
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    commit_timer = CommitTimer()
+    results = []
+    for scale in args.scale or DEFAULT_SCALES:
+        users, alerts_per_user, symbols = parse_scale(scale)
+        print(f"Running {scale}...", file=sys.stderr)
+        results.append(await run_scale(users, alerts_per_user, symbols, args.cycles, commit_timer, args.alert_type))
+
+    return {
+        "benchmark": "alert_engine",
+        "version": app.__version__,
+        "revision": git_revision(),
+        "environment": environment_info(),
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", action="append", help="USERSxALERTSxSYMBOLS, may be repeated")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--alert-type", choices=["step", "grid"], default="step", help="Kind of alerts to seed")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="Allowed cycle slowdown in percent")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    write_results(results, args.output)
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Importing this module points the bot at a throw-away working directory
+with its own SQLite database, so benchmarks never touch data/ or logs/
+of a real deployment. It must be imported before any `app` module.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+INVOCATION_DIR = Path.cwd()
+WORK_DIR = Path(tempfile.mkdtemp(prefix="bybit-alert-bench-"))
+
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+os.environ.setdefault("BOT_ADMINS", "1")
+os.environ.setdefault("LOG_LEVEL", "INFO")
+
+# app/__init__.py creates data/ and logs/ relative to the working directory,
+# and the database lives in data/, so the bot's files land in WORK_DIR
+sys.path.insert(0, str(REPO_ROOT))
+os.chdir(WORK_DIR)
+
+from app.models.base import Base, engine, get_session  # noqa: E402
+from app.models import User, TokenAlert  # noqa: E402
+from app.models.token_alert import grid_bucket  # noqa: E402
+from app.services.bybit_service import BybitService  # noqa: E402
+from app.services.market_data import MarketDataService  # noqa: E402
+
+# Alert steps relative to the symbol price, so every scale triggers a similar share of alerts
+STEP_FRACTIONS = (0.002, 0.005, 0.01, 0.02, 0.05)
+
+class PriceGenerator:
+    """Deterministic per-symbol random walk used instead of the Bybit API."""
+
+    def __init__(self, symbols: int, seed: int = 42, volatility: float = 0.004):
+        self.random = random.Random(seed)
+        self.volatility = volatility
+        self.symbols = [f"TK{i:04d}" for i in range(symbols)]
+        # Spread prices over several orders of magnitude like real spot pairs
+        self.prices = {
+            symbol: round(10 ** self.random.uniform(-3, 5), 6)
+            for symbol in self.symbols
+        }
+        self.cycle = 0
+
+    def advance(self):
+        """Move every price one step of the walk."""
+        self.cycle += 1
+        for symbol, price in self.prices.items():
+            self.prices[symbol] = price * (1 + self.random.gauss(0, self.volatility))
+
+    def price(self, symbol: str):
+        return self.prices.get(symbol)
+
+def stub_bybit(generator: PriceGenerator):
+    """Replace the network calls of BybitService with the generator (spot USDT tickers)."""
+
+    async def get_tickers(category: str) -> list:
+        if category != "spot":
+            return []
+        return [{"symbol": f"{symbol}USDT", "lastPrice": str(price)} for symbol, price in generator.prices.items()]
+
+    BybitService.get_tickers = staticmethod(get_tickers)
+    MarketDataService.clear()
+
+def reset_database():
+    """Drop and recreate all tables."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+def seed_database(users: int, alerts_per_user: int, generator: PriceGenerator, seed: int = 7, alert_type: str = "step") -> int:
+    """Insert users with step or grid alerts spread over the generator's symbols. Returns the alert count."""
+    rnd = random.Random(seed)
+    reset_database()
+    now = time.time()
+
+    user_rows = [
+        {"user_id": 1_000_000 + i, "username": f"user{i}", "is_approved": True, "is_blocked": False, "is_admin": False}
+        for i in range(users)
+    ]
+    alert_rows = []
+    for user in user_rows:
+        for symbol in rnd.sample(generator.symbols, min(alerts_per_user, len(generator.symbols))):
+            price = generator.price(symbol)
+            step = float(f"{price * rnd.choice(STEP_FRACTIONS):.6g}")
+            # Алерты созданы или сработали в разное время: цена последнего алерта где-то в пределах шага
+            # от текущей (дальше алерт бы уже сработал), так что общие группы складываются только по ходу циклов
+            last_price = float(f"{price + step * rnd.uniform(-1, 1):.6g}")
+            alert_rows.append({
+                "user_id": user["user_id"],
+                "symbol": symbol,
+                "price_multiplier": step,
+                "alert_type": alert_type,
+                "grid_bucket": grid_bucket(price, step) if alert_type == "grid" else None,
+                "is_active": True,
+                "last_alert_price": last_price,
+                "last_alert_time": now,
+            })
+
+    session = get_session()
+    try:
+        session.execute(User.__table__.insert(), user_rows)
+        if alert_rows:
+            session.execute(TokenAlert.__table__.insert(), alert_rows)
+        session.commit()
+    finally:
+        session.close()
+
+    return len(alert_rows)
+
+def write_results(results: dict, output: str = None):
+    """Print results as JSON and optionally save them to a file."""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    print(text)
+    if output:
+        (INVOCATION_DIR / output).write_text(text + "\n")
+
+def environment_info() -> dict:
+    import platform
+    import sqlalchemy
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
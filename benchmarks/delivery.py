@@ -0,0 +1,121 @@
+"""
+End-to-end alert delivery benchmark against the fake Telegram Bot API.
+
+Starts benchmarks.fake_telegram in-process, points the bot at it through
+TELEGRAM_API_URL and runs the real alert cycle (run_alert_cycle from
+app.bot): check_price_alerts over a seeded database, message formatting,
+the delivery queue, MessageService rate limiting and retries, and HTTP
+requests through aiogram's aiohttp session. Prices are moved far enough
+that most alerts trigger.
+
+For every --workers value reported: time to check and queue, time until
+the queue is drained, delivered messages per second and how often the
+server answered 429 or 403.
+
+Usage:
+    python -m benchmarks.delivery --alerts 500 --workers 1 --workers 10 --latency 50 --rate-limit 30
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# The bot instance reads TELEGRAM_API_URL when app.bot is imported
+PORT = _free_port()
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{PORT}"
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database, write_results, environment_info  # noqa: E402
+from benchmarks.fake_telegram import add_server_arguments, server_from_arguments  # noqa: E402
+
+from loguru import logger  # noqa: E402
+import app.bot  # noqa: E402
+from app.services.delivery_service import DeliveryService  # noqa: E402
+from app.services.message_service import MessageService  # noqa: E402
+from app.utils.rate_limiter import AsyncRateLimiter  # noqa: E402
+
+async def run_once(args, server, workers: int) -> dict:
+    generator = PriceGenerator(args.symbols)
+    stub_bybit(generator)
+    seed_database(args.alerts, 1, generator)
+
+    # Large moves so that nearly every alert fires in the measured cycle
+    generator.volatility = 0.1
+    generator.advance()
+
+    server.stats.clear()
+    MessageService.limiter = AsyncRateLimiter(args.bot_rate_limit)
+    DeliveryService.start(workers)
+
+    start = time.perf_counter()
+    queued = await app.bot.run_alert_cycle()
+    checked = time.perf_counter() - start
+    await DeliveryService.join()
+    elapsed = time.perf_counter() - start
+    await DeliveryService.stop()
+
+    delivered = server.stats["delivered"]
+    return {
+        "workers": workers,
+        "queued": queued,
+        "check_and_queue_seconds": checked,
+        "drain_seconds": elapsed,
+        "delivered": delivered,
+        "blocked": server.stats["blocked"],
+        "rate_limited": server.stats["rate_limited"],
+        "flood_injected": server.stats["flood_injected"],
+        "undelivered": queued - delivered,
+        "delivered_per_second": delivered / elapsed if elapsed else None,
+    }
+
+async def run(args) -> dict:
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    server = server_from_arguments(args)
+    await server.start("127.0.0.1", PORT)
+    results = []
+    try:
+        for workers in args.workers or [1, 10, 50]:
+            print(f"Running with {workers} workers...", file=sys.stderr)
+            results.append(await run_once(args, server, workers))
+    finally:
+        await app.bot.bot.session.close()
+        await server.stop()
+
+    return {
+        "benchmark": "delivery",
+        "environment": environment_info(),
+        "alerts": args.alerts,
+        "bot_rate_limit": args.bot_rate_limit,
+        "server": {
+            "latency_ms": args.latency,
+            "jitter_ms": args.jitter,
+            "rate_limit": args.rate_limit,
+            "retry_after": args.retry_after,
+            "blocked_ratio": args.blocked_ratio,
+            "flood_probability": args.flood_probability,
+        },
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=300, help="Alerts (one per user), most trigger in the cycle")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--workers", type=int, action="append", help="Delivery workers, may be repeated")
+    parser.add_argument("--bot-rate-limit", type=float, default=25, help="TELEGRAM_RATE_LIMIT used by the bot")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    write_results(asyncio.run(run(args)), args.output)
+
+if __name__ == "__main__":
+    main()
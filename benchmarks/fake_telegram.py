@@ -0,0 +1,160 @@
+"""
+Local stand-in for the Telegram Bot API.
+
+Implements the methods the bot uses (sendMessage, sendDocument,
+editMessageText, editMessageReplyMarkup, answerCallbackQuery, getMe,
+getUpdates, deleteWebhook) with configurable latency, a global rate limit
+that answers 429 with retry_after like Telegram's flood control, and error
+injection: users who blocked the bot (403) and random flood waits.
+
+Point the bot at it with TELEGRAM_API_URL=http://127.0.0.1:8081 or run it
+in-process from a benchmark. Counters are available at GET /stats.
+
+Usage:
+    python -m benchmarks.fake_telegram --port 8081 --latency 40 --rate-limit 30 --blocked-ratio 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from collections import Counter
+
+from aiohttp import web
+
+class FakeTelegramServer:
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, rate_limit: float = 30,
+                 retry_after: int = 1, blocked_ratio: float = 0.0, flood_probability: float = 0.0, seed: int = 1):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.blocked_ratio = blocked_ratio
+        self.flood_probability = flood_probability
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._message_id = 0
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self._handle_method)
+        self.app.router.add_get("/bot{token}/{method}", self._handle_method)
+        self.app.router.add_get("/stats", self._handle_stats)
+
+    def _is_blocked(self, chat_id: int) -> bool:
+        # Deterministic per chat, so retries of a blocked user keep failing
+        return (zlib.crc32(str(chat_id).encode()) % 10_000) < self.blocked_ratio * 10_000
+
+    def _rate_limited(self) -> bool:
+        """Fixed one-second window shared by all chats, like the global bot limit."""
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit
+
+    @staticmethod
+    def _error(code: int, description: str, retry_after: int = None) -> web.Response:
+        payload = {"ok": False, "error_code": code, "description": description}
+        if retry_after is not None:
+            payload["parameters"] = {"retry_after": retry_after}
+        return web.json_response(payload)
+
+    def _message(self, chat_id: int, text: str = None) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 123456, "is_bot": True, "first_name": "FakeBot"},
+            "text": text or "",
+        }
+
+    async def _handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post()) if request.method == "POST" else dict(request.query)
+        self.stats[f"{method}_requests"] += 1
+
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {"id": 123456, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}})
+        if method == "getUpdates":
+            await asyncio.sleep(min(float(params.get("timeout", 0) or 0), 1))
+            return web.json_response({"ok": True, "result": []})
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+        if self._rate_limited():
+            self.stats["rate_limited"] += 1
+            return self._error(429, f"Too Many Requests: retry after {self.retry_after}", self.retry_after)
+        if self.flood_probability and self.random.random() < self.flood_probability:
+            self.stats["flood_injected"] += 1
+            return self._error(429, f"Too Many Requests: retry after {self.retry_after}", self.retry_after)
+
+        chat_id = int(params.get("chat_id", 0) or 0)
+        if method in ("sendMessage", "sendDocument"):
+            if self._is_blocked(chat_id):
+                self.stats["blocked"] += 1
+                return self._error(403, "Forbidden: bot was blocked by the user")
+            self.stats["delivered"] += 1
+            return web.json_response({"ok": True, "result": self._message(chat_id, params.get("text"))})
+        if method in ("editMessageText", "editMessageReplyMarkup"):
+            return web.json_response({"ok": True, "result": self._message(chat_id, params.get("text"))})
+
+        return web.json_response({"ok": True, "result": True})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=30, help="Response latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="Random extra latency in ms")
+    parser.add_argument("--rate-limit", type=float, default=30, help="Accepted messages per second, 0 = unlimited")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after returned with 429 responses")
+    parser.add_argument("--blocked-ratio", type=float, default=0.0, help="Share of chats that blocked the bot")
+    parser.add_argument("--flood-probability", type=float, default=0.0, help="Chance of an injected 429 per request")
+
+def server_from_arguments(args) -> FakeTelegramServer:
+    return FakeTelegramServer(
+        latency_ms=args.latency, jitter_ms=args.jitter, rate_limit=args.rate_limit, retry_after=args.retry_after,
+        blocked_ratio=args.blocked_ratio, flood_probability=args.flood_probability,
+    )
+
+async def serve(args):
+    server = server_from_arguments(args)
+    await server.start(args.host, args.port)
+    print(f"Fake Telegram Bot API listening on http://{args.host}:{args.port}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        print(json.dumps(dict(server.stats)))
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_server_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
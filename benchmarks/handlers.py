@@ -0,0 +1,249 @@
+"""
+Load test for the Telegram handlers.
+
+Builds the real Dispatcher with the routers from app.handlers and feeds it
+synthetic updates for many concurrent users walking through the alert
+creation flow:
+
+    add_alert (callback) -> process_symbol_input (message)
+        -> set_price_multiplier (callback) -> show_user_alerts (callback)
+
+Bybit is replaced by the deterministic price generator and the Telegram
+API by an in-process session that answers every method instantly (or
+after --telegram-latency ms). New users start the flow at --rate users
+per second. Reported per handler: latency distribution and DB queries per
+update.
+
+Usage:
+    python -m benchmarks.handlers --users 2000 --rate 200 --output handlers.json
+"""
+import argparse
+import asyncio
+import contextvars
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database, write_results, environment_info
+
+from aiogram import Bot, Dispatcher, BaseMiddleware
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText, SendMessage, SendDocument
+from aiogram.types import Update, Message, Chat
+from loguru import logger
+from sqlalchemy import event
+
+import app.bot
+from app.handlers import routers
+from app.models.base import engine
+
+BOT_TOKEN = "123456:LOADTEST"
+
+# Количество SQL запросов текущего обрабатываемого апдейта
+_query_counter = contextvars.ContextVar("query_counter", default=None)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+class StubSession(BaseSession):
+    """Answers Bot API calls locally instead of calling Telegram."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = defaultdict(int)
+        self.last_text = None  # Text of the last message sent or edited, for tests
+        self._message_id = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, (SendMessage, EditMessageText)):
+            self.last_text = method.text
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, (SendMessage, SendDocument)):
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=getattr(method, "text", None),
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+class HandlerStats(BaseMiddleware):
+    """Inner middleware recording latency and DB queries per handler."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+
+    async def __call__(self, handler, event, data):
+        counter = [0]
+        token = _query_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - start
+            _query_counter.reset(token)
+            name = data["handler"].callback.__name__
+            self.latencies[name].append(elapsed)
+            self.queries[name].append(counter[0])
+
+class UpdateFactory:
+    """Builds synthetic updates already mounted to the bot."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.update_id = 0
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def _message(self, user_id: int, text: str, from_bot: bool = False) -> dict:
+        sender = {"id": self.bot.id, "is_bot": True, "first_name": "Bot"} if from_bot else self._user(user_id)
+        return {
+            "message_id": self.update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": sender,
+            "text": text,
+        }
+
+    def message(self, user_id: int, text: str) -> Update:
+        self.update_id += 1
+        return Update.model_validate(
+            {"update_id": self.update_id, "message": self._message(user_id, text)},
+            context={"bot": self.bot},
+        )
+
+    def callback(self, user_id: int, data: str) -> Update:
+        self.update_id += 1
+        return Update.model_validate(
+            {
+                "update_id": self.update_id,
+                "callback_query": {
+                    "id": str(self.update_id),
+                    "from": self._user(user_id),
+                    "chat_instance": str(user_id),
+                    "message": self._message(user_id, "Welcome to your dashboard!", from_bot=True),
+                    "data": data,
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+def summarize(values: list) -> dict:
+    ordered = sorted(values)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(50) * 1000,
+        "p95_ms": pick(95) * 1000,
+        "p99_ms": pick(99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+async def run_flow(dp: Dispatcher, bot: Bot, factory: UpdateFactory, user_id: int, symbol: str, think: float, failures: list):
+    steps = [
+        factory.callback(user_id, "add_alert"),
+        factory.message(user_id, symbol),
+        factory.callback(user_id, f"set_multiplier:{symbol}:10"),
+        factory.callback(user_id, "my_alerts"),
+    ]
+    for update in steps:
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+        if think:
+            await asyncio.sleep(think)
+
+async def run(args) -> dict:
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    generator = PriceGenerator(args.symbols)
+    stub_bybit(generator)
+    seed_database(args.users, args.existing_alerts, generator)
+
+    session = StubSession(args.telegram_latency / 1000)
+    bot = Bot(BOT_TOKEN, session=session)
+    # Handlers and services reach the bot through app.bot
+    app.bot.bot = bot
+
+    stats = HandlerStats()
+    dp = Dispatcher(storage=MemoryStorage())
+    for router in routers:
+        router.message.middleware(stats)
+        router.callback_query.middleware(stats)
+        dp.include_router(router)
+
+    factory = UpdateFactory(bot)
+    failures = []
+    tasks = []
+    started = time.perf_counter()
+    for i in range(args.users):
+        user_id = 1_000_000 + i
+        symbol = generator.symbols[i % len(generator.symbols)]
+        tasks.append(asyncio.create_task(
+            run_flow(dp, bot, factory, user_id, symbol, args.think_ms / 1000, failures)
+        ))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in stats.latencies.values() for value in values]
+    return {
+        "benchmark": "handlers",
+        "environment": environment_info(),
+        "users": args.users,
+        "target_rate_users_per_second": args.rate,
+        "telegram_latency_ms": args.telegram_latency,
+        "updates": factory.update_id,
+        "wall_seconds": elapsed,
+        "updates_per_second": factory.update_id / elapsed,
+        "failures": len(failures),
+        "failure_examples": sorted(set(failures))[:5],
+        "telegram_calls": dict(session.calls),
+        "overall": summarize(all_latencies) if all_latencies else None,
+        "handlers": {
+            name: {
+                **summarize(values),
+                "db_queries_mean": statistics.fmean(stats.queries[name]),
+                "db_queries_max": max(stats.queries[name]),
+            }
+            for name, values in sorted(stats.latencies.items())
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Virtual users, each runs the flow once")
+    parser.add_argument("--rate", type=float, default=100, help="New users starting the flow per second")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--existing-alerts", type=int, default=3, help="Alerts each user already has")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between steps of a flow")
+    parser.add_argument("--telegram-latency", type=float, default=0, help="Simulated Bot API latency in ms")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    write_results(asyncio.run(run(args)), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Cost of logging in the alert hot path.
+
+Measures, at LOG_LEVEL=INFO:
+  * the check_price_alerts cycle time with level-gated debug logging;
+  * what the previous eager f-string debug calls cost per cycle for the
+    same alerts (the time the gating saves);
+  * how long the event loop thread spends per record with a synchronous
+    rotating file sink versus an enqueued (background thread) sink. The
+    enqueued sink pays for pickling and a pipe write on every record, but
+    file writes and rotation happen on its worker thread, so a slow or
+    stalled disk can't block the loop. On fast local disks the synchronous
+    sink is usually cheaper; use LOG_ENQUEUE to pick per deployment.
+
+Usage:
+    python -m benchmarks.logging_overhead [--alerts 50000] [--symbols 200] [--cycles 5] [--output results.json]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database, write_results, environment_info, WORK_DIR
+
+from loguru import logger
+from app.utils.logger import setup_logger, debug_enabled
+from app.services.token_alert_service import TokenAlertService
+from app.models import TokenAlert, get_session
+
+def eager_debug_logging(alerts: list, prices: dict):
+    """The per-alert debug calls check_price_alerts made before they were level-gated."""
+    for alert in alerts:
+        current_price = prices[alert.symbol]
+        previous_price = alert.last_alert_price
+        price_diff = abs(current_price - previous_price)
+        logger.debug(f"Checking alert for {alert.symbol} (user: {alert.user_id}): current=${current_price:,.2f}, prev=${previous_price:,.2f}, diff=${price_diff:,.2f}, step=${alert.price_multiplier:g}")
+        if price_diff >= alert.price_multiplier:
+            logger.debug(f"Alert condition triggered for {alert.symbol}: price change (${price_diff:,.2f}) >= step (${alert.price_multiplier:g})")
+
+def gated_debug_logging(alerts: list, prices: dict):
+    """The same loop with the gate used in check_price_alerts."""
+    debug = debug_enabled()
+    for alert in alerts:
+        current_price = prices[alert.symbol]
+        previous_price = alert.last_alert_price
+        if debug:
+            price_diff = abs(current_price - previous_price)
+            logger.debug(f"Checking alert for {alert.symbol} (user: {alert.user_id}): current=${current_price:,.2f}, prev=${previous_price:,.2f}, diff=${price_diff:,.2f}, step=${alert.price_multiplier:g}")
+
+def time_call(func, *args, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def sink_emit_latency(records: int, enqueue: bool) -> dict:
+    """Time spent on the calling thread per INFO record written to a rotating file sink."""
+    logger.remove()
+    path = WORK_DIR / f"sink-{'enqueue' if enqueue else 'sync'}.log"
+    sink_id = logger.add(path, level="INFO", rotation="1 MB", enqueue=enqueue)
+
+    latencies = []
+    for i in range(records):
+        start = time.perf_counter()
+        logger.info("Sent price alert to user {} for {} (${:,.2f})", 1_000_000 + i, "TK0001", 12345.678)
+        latencies.append(time.perf_counter() - start)
+
+    logger.remove(sink_id)  # Waits for the queue to drain, outside of the measured section
+    latencies.sort()
+    return {
+        "total_seconds": sum(latencies),
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "max_us": latencies[-1] * 1e6,
+    }
+
+async def run(args) -> dict:
+    generator = PriceGenerator(args.symbols)
+    stub_bybit(generator)
+    total_alerts = seed_database(args.alerts // args.alerts_per_user, args.alerts_per_user, generator)
+
+    setup_logger()
+    logger.remove()  # Keep benchmark output clean; records below INFO are still filtered by the gate
+    logger.add(WORK_DIR / "bot.log", level="INFO", enqueue=True)
+
+    cycle_times = []
+    for _ in range(args.cycles):
+        generator.advance()
+        start = time.perf_counter()
+        await TokenAlertService.check_price_alerts()
+        cycle_times.append(time.perf_counter() - start)
+
+    session = get_session()
+    try:
+        alerts = session.query(TokenAlert).filter(TokenAlert.is_active == True).all()
+    finally:
+        session.close()
+    prices = dict(generator.prices)
+
+    eager = time_call(eager_debug_logging, alerts, prices)
+    gated = time_call(gated_debug_logging, alerts, prices)
+    cycle = statistics.median(cycle_times)
+
+    return {
+        "benchmark": "logging_overhead",
+        "environment": environment_info(),
+        "alerts": total_alerts,
+        "symbols": args.symbols,
+        "log_level": "INFO",
+        "debug_gate_enabled": debug_enabled(),
+        "cycle_seconds_median": cycle,
+        "eager_debug_logging_seconds": eager,
+        "gated_debug_logging_seconds": gated,
+        "saved_seconds_per_cycle": eager - gated,
+        "saved_percent_of_cycle": (eager - gated) / (cycle + eager - gated) * 100,
+        "sink_records": args.records,
+        "sync_sink": sink_emit_latency(args.records, enqueue=False),
+        "enqueued_sink": sink_emit_latency(args.records, enqueue=True),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=50_000)
+    parser.add_argument("--alerts-per-user", type=int, default=10)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--records", type=int, default=20_000, help="Records written in the sink comparison")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    write_results(asyncio.run(run(args)), args.output)
+
+if __name__ == "__main__":
+    main()
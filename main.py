@@ -6,7 +6,7 @@ from app.utils import setup_logger
 
 if __name__ == "__main__":
     # Initialize logger
-    setup_logger()
+    setup_logger(enqueue=True)
     
     try:
         logger.info("Starting Bybit Alert Bot")
@@ -0,0 +1,2 @@
+# Тесты используют временную рабочую папку и окружение бенчмарков: импорт должен идти до любого модуля app
+import benchmarks.common  # noqa: F401
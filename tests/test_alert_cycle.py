@@ -0,0 +1,49 @@
+"""
+Alert check tests against the benchmark price generator and a temporary database.
+"""
+import asyncio
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database, get_session
+
+from app.models import TokenAlert
+from app.services.token_alert_service import TokenAlertService
+
+QUIET_USER = 1_000_000
+OTHER_USER = 1_000_001
+
+def seed_shared_group() -> PriceGenerator:
+    """Two users with the same step alert on one symbol, so both fall into one group."""
+    generator = PriceGenerator(1)
+    stub_bybit(generator)
+    seed_database(2, 1, generator)
+    price = generator.price(generator.symbols[0])
+    session = get_session()
+    try:
+        session.query(TokenAlert).update({"price_multiplier": price / 10, "last_alert_price": price})
+        session.commit()
+    finally:
+        session.close()
+    return generator
+
+def baselines() -> dict:
+    session = get_session()
+    try:
+        return dict(session.query(TokenAlert.user_id, TokenAlert.last_alert_price).all())
+    finally:
+        session.close()
+
+def test_quiet_users_are_not_evaluated():
+    generator = seed_shared_group()
+    before = baselines()
+    generator.prices[generator.symbols[0]] *= 1.5
+
+    triggered = asyncio.run(TokenAlertService.check_price_alerts(skip_users={QUIET_USER}))
+    assert [item["alert"].user_id for item in triggered] == [OTHER_USER]
+
+    after = baselines()
+    assert after[QUIET_USER] == before[QUIET_USER]
+    assert after[OTHER_USER] != before[OTHER_USER]
+
+    # Когда тихие часы заканчиваются, алерт проверяется по текущей цене
+    triggered = asyncio.run(TokenAlertService.check_price_alerts())
+    assert [item["alert"].user_id for item in triggered] == [QUIET_USER]
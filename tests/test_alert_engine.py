@@ -0,0 +1,99 @@
+"""
+AlertEngine tests with in-memory alerts, no database or network.
+"""
+import random
+from types import SimpleNamespace
+
+from app.models import TokenAlert
+from app.models.token_alert import ALERT_TYPE_BOOK_SPREAD, ALERT_TYPE_BOOK_DEPTH, ALERT_TYPE_BREAKOUT, ALERT_TYPE_LEVEL, DIRECTION_ABOVE, DIRECTION_BELOW
+from app.services.alert_engine import AlertEngine
+from app.services.market_data import Ticker
+
+def level_alert(alert_id: int, level: float, direction: str, rearm: bool = False) -> TokenAlert:
+    alert = TokenAlert(
+        symbol="BTC", quote="USDT", category="spot", alert_type=ALERT_TYPE_LEVEL, threshold=level,
+        direction=direction, rearm=rearm, price_multiplier=0, user_id=0, is_active=True,
+    )
+    alert.id = alert_id
+    return alert
+
+def run(engine: AlertEngine, alerts: list, prices: list) -> list:
+    """Ids of the alerts fired at each price."""
+    fired = []
+    for now, price in enumerate(prices):
+        active = [alert for alert in alerts if alert.is_active]
+        fired.append(sorted(item["alert"].id for item in engine.evaluate(active, {"BTC": price}, now)))
+    return fired
+
+def test_levels_fire_once_and_rearm():
+    alerts = [
+        level_alert(1, 100, DIRECTION_ABOVE),
+        level_alert(2, 100, DIRECTION_ABOVE, rearm=True),
+        level_alert(3, 90, DIRECTION_BELOW, rearm=True),
+    ]
+    engine = AlertEngine()
+    assert run(engine, alerts, [95, 101, 102, 95, 101, 89]) == [[], [1, 2], [], [], [2], [3]]
+    assert not alerts[0].is_active
+    assert sum(len(index) for index in engine.levels.values()) == 2
+
+def test_moved_level_is_placed_again():
+    alert = level_alert(1, 100, DIRECTION_ABOVE, rearm=True)
+    engine = AlertEngine()
+    assert run(engine, [alert], [95]) == [[]]
+
+    alert.threshold = 120
+    engine.forget_level(alert.id)
+    assert run(engine, [alert], [110, 121]) == [[], [1]]
+
+def test_removed_alerts_leave_the_index():
+    alerts = [level_alert(1, 100, DIRECTION_ABOVE), level_alert(2, 100, DIRECTION_ABOVE)]
+    engine = AlertEngine()
+    run(engine, alerts, [95])
+    run(engine, alerts[1:], [96])
+    assert list(engine.level_positions) == [2]
+
+def test_breakout_stats_restart_after_a_gap():
+    alert = TokenAlert(symbol="BTC", quote="USDT", category="spot", alert_type=ALERT_TYPE_BREAKOUT, price_multiplier=0, user_id=0, is_active=True)
+    ticker = lambda price, high: {"BTC": Ticker("BTC", "BTC", "USDT", "spot", price, high_24h=high, low_24h=50)}
+    engine = AlertEngine()
+    assert not engine.evaluate([alert], {"BTC": 90}, 0, tickers=ticker(90, 100))
+
+    # Без алертов рынок не отслеживается; вернувшийся алерт не сравнивается с ценой до перерыва
+    engine.evaluate([], {"BTC": 150}, 1, tickers=ticker(150, 160))
+    assert not engine.evaluate([alert], {"BTC": 170}, 2, tickers=ticker(170, 175))
+    assert engine.evaluate([alert], {"BTC": 180}, 3, tickers=ticker(180, 180))
+
+def book_alert(alert_id: int, alert_type: str, threshold: float) -> TokenAlert:
+    alert = TokenAlert(symbol="BTC", quote="USDT", category="spot", alert_type=alert_type, threshold=threshold, price_multiplier=0, user_id=0, is_active=True)
+    alert.id = alert_id
+    return alert
+
+def naive_book(alerts: list, last: dict, spread: float, depth: float) -> list:
+    """Order book evaluation by comparing every alert, as the index must behave."""
+    fired = []
+    for alert in alerts:
+        is_spread = alert.alert_type == ALERT_TYPE_BOOK_SPREAD
+        value = spread if is_spread else depth
+        bad = value >= alert.threshold if is_spread else value < alert.threshold
+        previous = last.get(alert.id)
+        was_bad = previous is not None and (previous >= alert.threshold if is_spread else previous < alert.threshold)
+        if bad != was_bad:
+            last[alert.id] = value
+            if bad:
+                fired.append(alert.id)
+    return sorted(fired)
+
+def test_book_index_matches_naive_evaluation():
+    rnd = random.Random(3)
+    alerts = [book_alert(i, ALERT_TYPE_BOOK_SPREAD, rnd.choice([0.1, 0.2, 0.5])) for i in range(20)]
+    alerts += [book_alert(i, ALERT_TYPE_BOOK_DEPTH, rnd.choice([1000, 5000, 20000])) for i in range(20, 40)]
+    engine = AlertEngine()
+    last = {}
+    for now in range(300):
+        # Значения ровно на порогах проверяют границы индекса
+        spread, depth = rnd.choice([0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.7]), rnd.choice([500, 1000, 3000, 5000, 10000, 20000, 50000])
+        ticker = SimpleNamespace(spread_pct=spread, top_depth=depth, last_price=100.0, bid_price=99.9, ask_price=100.1)
+        fired = engine.evaluate_book(alerts, {"BTC": ticker}, now)
+        assert sorted(item["alert"].id for item in fired) == naive_book(alerts, last, spread, depth)
+    assert all(alert.last_value == last.get(alert.id) for alert in alerts)
+    assert len(engine.books) == 2 and len(engine.book_positions) == 40
@@ -0,0 +1,67 @@
+"""
+TokenAlertService tests against the benchmark price generator and a temporary database.
+"""
+import asyncio
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database
+
+from app.models.token_alert import DIRECTION_ABOVE, DIRECTION_BELOW
+from app.services.alert_engine import alert_engine
+from app.services.token_alert_service import TokenAlertService
+
+USER_ID = 1_000_000
+
+def test_adding_the_same_alert_again_enables_it():
+    generator = PriceGenerator(1)
+    stub_bybit(generator)
+    seed_database(1, 0, generator)
+    symbol = generator.symbols[0]
+    price = generator.price(symbol)
+
+    async def scenario():
+        level = await TokenAlertService.add_level_alert(USER_ID, symbol, price * 2)
+        percent = await TokenAlertService.add_percent_alert(USER_ID, symbol, 5, 60)
+        assert level.direction == DIRECTION_ABOVE and level.price_multiplier == 0
+        assert (percent.threshold, percent.window_seconds, percent.last_alert_price) == (5, 3600, price)
+
+        await TokenAlertService.toggle_alert(level.id, False)
+        await TokenAlertService.toggle_alert(percent.id, False)
+        # Цена ушла за уровень: тот же уровень взводится заново с другой стороны
+        generator.prices[symbol] = price * 3
+        stub_bybit(generator)
+        again = await TokenAlertService.add_level_alert(USER_ID, symbol, price * 2, rearm=True)
+        assert (again.id, again.is_active, again.direction, again.rearm) == (level.id, True, DIRECTION_BELOW, True)
+        assert (await TokenAlertService.add_percent_alert(USER_ID, symbol, 5, 60)).id == percent.id
+        assert (await TokenAlertService.add_percent_alert(USER_ID, symbol, 5, 30)).id != percent.id
+        return await TokenAlertService.get_user_alerts(USER_ID)
+
+    alerts = asyncio.run(scenario())
+    assert len(alerts) == 3 and all(alert.is_active for alert in alerts)
+
+def test_level_added_again_fires_on_its_new_side():
+    generator = PriceGenerator(1)
+    stub_bybit(generator)
+    seed_database(1, 0, generator)
+    alert_engine.forget_level()
+    symbol = generator.symbols[0]
+    price = generator.price(symbol)
+
+    def move(factor: float):
+        generator.prices[symbol] = price * factor
+        stub_bybit(generator)
+
+    async def scenario():
+        level = await TokenAlertService.add_level_alert(USER_ID, symbol, price * 1.1, rearm=True)
+        assert not await TokenAlertService.check_price_alerts()
+        move(1.2)
+        fired = await TokenAlertService.check_price_alerts()
+        assert [item["alert"].direction for item in fired] == [DIRECTION_ABOVE]
+
+        # Тот же уровень, добавленный над ценой, теперь ждёт падения под него
+        again = await TokenAlertService.add_level_alert(USER_ID, symbol, price * 1.1, rearm=True)
+        assert (again.id, again.direction) == (level.id, DIRECTION_BELOW)
+        move(1.0)
+        return await TokenAlertService.check_price_alerts()
+
+    fired = asyncio.run(scenario())
+    assert [item["alert"].direction for item in fired] == [DIRECTION_BELOW]
@@ -0,0 +1,36 @@
+"""
+Broadcast interruption tests with Telegram sends replaced by a slow stub.
+"""
+import asyncio
+
+from benchmarks.common import PriceGenerator, seed_database
+
+from app.services.broadcast_service import BroadcastService
+from app.services.message_service import MessageService
+
+async def slow_send_many(chat_ids, text):
+    await asyncio.sleep(10)
+    return len(chat_ids), 0
+
+async def interrupt(pause: bool) -> str:
+    seed_database(3, 0, PriceGenerator(1))
+    broadcast = await BroadcastService.create_broadcast(1, "hello")
+    BroadcastService.start(broadcast.id)
+    await asyncio.sleep(0.05)
+
+    if pause:
+        await BroadcastService.stop(broadcast.id)
+    else:
+        # Так задачу отменяет остановка процесса
+        task = BroadcastService._tasks[broadcast.id]
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return (await BroadcastService.get_broadcast(broadcast.id)).status
+
+def test_shutdown_keeps_broadcast_resumable(monkeypatch):
+    monkeypatch.setattr(MessageService, "send_many", staticmethod(slow_send_many))
+    assert asyncio.run(interrupt(pause=False)) == "running"
+
+def test_admin_stop_pauses_broadcast(monkeypatch):
+    monkeypatch.setattr(MessageService, "send_many", staticmethod(slow_send_many))
+    assert asyncio.run(interrupt(pause=True)) == "paused"
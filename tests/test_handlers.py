@@ -0,0 +1,90 @@
+"""
+Handler tests: synthetic updates fed through the real Dispatcher, with Bybit
+replaced by the benchmark price generator and Telegram by a local stub.
+"""
+import asyncio
+
+from benchmarks.common import PriceGenerator, stub_bybit, seed_database, get_session
+from benchmarks.handlers import BOT_TOKEN, StubSession, UpdateFactory
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import app.bot
+from app.handlers import routers
+from app.models import TokenAlert
+from app.models.token_alert import ALERT_TYPE_STEP
+from app.settings import COOLDOWN_OPTIONS, HYSTERESIS_OPTIONS
+
+USER_ID = 1_000_000
+
+@pytest.fixture(scope="module")
+def dispatcher():
+    # Роутер подключается к диспетчеру только один раз за процесс
+    session = StubSession()
+    bot = Bot(BOT_TOKEN, session=session)
+    app.bot.bot = bot
+    dp = Dispatcher(storage=MemoryStorage())
+    for router in routers:
+        dp.include_router(router)
+    return dp, bot, session, UpdateFactory(bot)
+
+@pytest.fixture
+def alert_id():
+    generator = PriceGenerator(5)
+    stub_bybit(generator)
+    seed_database(1, 1, generator)
+    session = get_session()
+    try:
+        return session.query(TokenAlert.id).filter(TokenAlert.user_id == USER_ID).scalar()
+    finally:
+        session.close()
+
+def get_alert(alert_id: int) -> TokenAlert:
+    session = get_session()
+    try:
+        return session.query(TokenAlert).filter(TokenAlert.id == alert_id).first()
+    finally:
+        session.close()
+
+def press(dispatcher, data: str):
+    dp, bot, session, factory = dispatcher
+    asyncio.run(dp.feed_update(bot, factory.callback(USER_ID, data)))
+
+def test_cycle_cooldown(dispatcher, alert_id):
+    press(dispatcher, f"cycle_cooldown:{alert_id}")
+    assert get_alert(alert_id).cooldown_seconds == COOLDOWN_OPTIONS[1]
+
+    for _ in COOLDOWN_OPTIONS[1:]:
+        press(dispatcher, f"cycle_cooldown:{alert_id}")
+    assert get_alert(alert_id).cooldown_seconds is None
+
+def test_cycle_band(dispatcher, alert_id):
+    # Полоса есть только у сетки и уровней, шаговый алерт её не принимает
+    press(dispatcher, f"cycle_band:{alert_id}")
+    assert get_alert(alert_id).hysteresis is None
+
+    press(dispatcher, f"toggle_grid:{alert_id}")
+    press(dispatcher, f"cycle_band:{alert_id}")
+    press(dispatcher, f"cycle_band:{alert_id}")
+    alert = get_alert(alert_id)
+    assert alert.hysteresis == HYSTERESIS_OPTIONS[2]
+    assert alert.cooldown_seconds is None
+
+    press(dispatcher, f"toggle_grid:{alert_id}")
+    assert get_alert(alert_id).hysteresis is None
+
+def test_set_step_creates_step_alert(dispatcher, alert_id):
+    symbol = get_alert(alert_id).symbol
+    press(dispatcher, f"set_multiplier:{symbol}:0.001")
+    # Подтверждение описывает шаг от последнего алерта, а не линии сетки
+    text = dispatcher[2].last_text
+    assert "moves $0.001 from the last alert" in text and "crosses multiples" not in text
+    session = get_session()
+    try:
+        alert = session.query(TokenAlert).filter(TokenAlert.user_id == USER_ID, TokenAlert.price_multiplier == 0.001).one()
+    finally:
+        session.close()
+    assert alert.alert_type == ALERT_TYPE_STEP
+    assert alert.grid_bucket is None
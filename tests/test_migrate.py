@@ -0,0 +1,27 @@
+"""
+Column migration tests on a scratch SQLite database with an older schema.
+"""
+import sqlite3
+
+import app.migrate
+from app.migrate import migrate_add_columns
+
+def test_last_value_is_moved_out_of_last_alert_price(tmp_path, monkeypatch):
+    path = tmp_path / "old.sqlite3"
+    monkeypatch.setattr(app.migrate, "DATABASE_URL", f"sqlite:///{path}")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, user_id INTEGER)")
+    conn.execute("CREATE TABLE token_alerts (id INTEGER PRIMARY KEY, user_id INTEGER, symbol VARCHAR, price_multiplier FLOAT, last_alert_price FLOAT, alert_type VARCHAR, threshold FLOAT)")
+    conn.executemany("INSERT INTO token_alerts VALUES (?, 1, 'BTC', ?, ?, ?, ?)", [
+        (1, 1000, 65000.0, "step", None),
+        (2, 0, 0.12, "funding", 0.1),
+        (3, 0, 800.0, "book_depth", 1000),
+    ])
+    conn.commit()
+
+    assert migrate_add_columns()
+    # Повторный запуск не трогает уже перенесённые значения
+    assert migrate_add_columns()
+    rows = conn.execute("SELECT id, last_alert_price, last_value FROM token_alerts ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [(1, 65000.0, None), (2, None, 0.12), (3, None, 800.0)]
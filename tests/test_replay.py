@@ -0,0 +1,32 @@
+"""
+Replay regression test: a recorded hour of prices run through the alert engine
+must trigger exactly the events saved in tests/data/replay-expected.jsonl.
+
+After an intended change in alert behaviour regenerate the expected file with
+    python -m app.replay tests/data/prices-20260101.jsonl --alert BTC:1000 --alert "ETH#50" --alert "SOL>150" --alert "BTC%2/10" --alert "BTC/USDT.P-BTC:20" --output tests/data/replay-expected.jsonl
+"""
+import json
+from pathlib import Path
+
+from app.replay import parse_alert, replay
+from app.utils.price_history import load_series
+
+DATA = Path(__file__).parent / "data"
+ALERTS = ["BTC:1000", "ETH#50", "SOL>150", "BTC%2/10", "BTC/USDT.P-BTC:20"]
+
+def run() -> list:
+    events, stats = replay(load_series(str(DATA / "prices-20260101.jsonl")), [parse_alert(value) for value in ALERTS])
+    assert stats["ticks"] == 60
+    return events
+
+def test_replay_matches_recorded_events():
+    with open(DATA / "replay-expected.jsonl") as f:
+        expected = [json.loads(line) for line in f if line.strip()]
+    assert run() == expected
+
+def test_replay_trigger_sequence():
+    # Порядок срабатываний без цен: при расхождении сразу видно, какой алерт сместился
+    sequence = [(event["t"] - 1767225600, event["alert"]) for event in run()]
+    assert sequence[:10] == [(60, 4), (60, 1), (240, 4), (300, 4), (480, 1), (540, 4), (540, 1), (600, 4), (660, 0), (720, 3)]
+    # Уровень срабатывает снова только после возврата цены под него
+    assert [t for t, alert in sequence if alert == 2] == [1140, 1620]